@@ -2,6 +2,7 @@
 # -*- encoding: utf-8 -*-
 
 import io
+import sys
 from glob import glob
 from os.path import basename
 from os.path import dirname
@@ -10,6 +11,7 @@ from os.path import splitext
 
 from setuptools import find_packages
 from setuptools import setup
+from setuptools.command.build_py import build_py
 
 
 def read(*names, **kwargs):
@@ -19,6 +21,27 @@ def read(*names, **kwargs):
     ).read()
 
 
+class build_py_with_compiled_templates(build_py):
+    """
+    Build the package and compile its built-in templates to Python modules
+    such that the default attribution templates are not parsed at runtime.
+    """
+
+    def run(self):
+        build_py.run(self)
+        sys.path.insert(0, join(dirname(__file__), 'src'))
+        try:
+            from attributecode.attrib_util import compile_builtin_templates
+        except ImportError as e:
+            self.warn('Skipping the compilation of the built-in templates: %s' % e)
+            return
+        finally:
+            sys.path.pop(0)
+        target = join(self.build_lib, 'attributecode', 'templates', 'compiled')
+        names = compile_builtin_templates(target)
+        self.announce('Compiled %d built-in templates to %s' % (len(names), target), level=2)
+
+
 setup(
     name='aboutcode-toolkit',
     version='6.0.0',
@@ -41,6 +64,7 @@ setup(
     package_dir={'': 'src'},
     py_modules=[splitext(basename(path))[0] for path in glob('src/*.py')],
     include_package_data=True,
+    cmdclass={'build_py': build_py_with_compiled_templates},
     zip_safe=False,
     platforms='any',
     classifiers=[
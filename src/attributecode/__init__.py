@@ -18,8 +18,6 @@ from collections import namedtuple
 import logging
 import os
 
-import saneyaml
-
 __version__ = '6.0.0'
 
 __about_spec_version__ = '3.2.1'
@@ -114,3 +112,12 @@ severities = {
     DEBUG : 'DEBUG',
     NOTSET : 'NOTSET'
 }
+
+# Defaults of the DejaCode API options defined here rather than in the api
+# module such that the command line can use them without importing it.
+
+# default maximum number of concurrent API requests
+DEFAULT_MAX_WORKERS = 8
+
+# default time to live in seconds of the cached license data: one week
+DEFAULT_CACHE_TTL = 7 * 24 * 60 * 60
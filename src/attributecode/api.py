@@ -14,31 +14,403 @@
 #  limitations under the License.
 # ============================================================================
 
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha1
+import http.client
+import io
 import json
+import os
+import threading
+import time
 
 from urllib.parse import quote
 from urllib.parse import urlencode
+from urllib.parse import urljoin
+from urllib.parse import urlparse
+from urllib.parse import urlsplit
 from urllib.request import Request
 from urllib.request import urlopen
 from urllib.error import HTTPError
 
+from attributecode import DEFAULT_CACHE_TTL
+from attributecode import DEFAULT_MAX_WORKERS
 from attributecode import ERROR
 from attributecode import Error
+from attributecode.util import get_cache_dir
 
 """
 API call helpers
 """
 
+# default timeouts in seconds to connect to the API and to read a response
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 30
+
+# default number of retries of a failed API request
+DEFAULT_RETRIES = 3
+
+# default base delay in seconds between retries, doubled at each retry
+DEFAULT_BACKOFF_FACTOR = 0.5
+
+# default number of consecutive failed requests after which the API is
+# considered unreachable and requests fail fast, and the delay in seconds
+# before trying again
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30
+
+# default number of license keys requested at once with a list filter
+DEFAULT_BATCH_SIZE = 50
+
+# HTTP redirection status codes followed by the HttpClient
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+# HTTP status codes of transient server problems retried by the HttpClient
+RETRY_CODES = (429, 500, 502, 503, 504)
+
+AUTH_DENIED_MESSAGE = (
+    u"Authorization denied. Invalid '--api_key'. License generation is skipped.")
+
+INVALID_API_URL_MESSAGE = (
+    u"URL not reachable. Invalid '--api_url'. License generation is skipped.")
+
+NETWORK_PROBLEM_MESSAGE = (
+    u'Network problem. Please check your Internet connection. License generation is skipped.')
+
+OFFLINE_MISSING_MESSAGE = u"License not found in the offline license cache: %s"
+
+# errors after which no other request to the same API can succeed
+FATAL_MESSAGES = (AUTH_DENIED_MESSAGE, INVALID_API_URL_MESSAGE, NETWORK_PROBLEM_MESSAGE)
+
+
+class CircuitOpenError(ConnectionError):
+    """
+    Raised when a request is not sent because the API is deemed unreachable.
+    """
+
+
+class CircuitBreaker(object):
+    """
+    Track the consecutive failed requests to an API. After
+    `failure_threshold` consecutive failures the circuit is open and requests
+    fail fast without being sent. After `reset_timeout` seconds a single
+    trial request is allowed again: its success closes the circuit.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        """
+        Return True if a request can be sent.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # let a single trial request through and keep failing fast
+                # the others until its outcome is known
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class HttpClient(object):
+    """
+    A thread-safe HTTP client that keeps one persistent keep-alive
+    `http.client` connection per thread and per host such that successive
+    requests to the same API reuse an already established (TLS) connection.
+
+    Requests time out after `connect_timeout` seconds to connect and
+    `read_timeout` seconds to read a response. Connection errors, timeouts
+    and transient server errors are retried up to `retries` times with an
+    exponential backoff starting at `backoff_factor` seconds. The
+    `circuit_breaker` CircuitBreaker makes requests fail fast once the API
+    is deemed unreachable.
+    """
+
+    def __init__(self, connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                 circuit_breaker=None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def get_connection(self, scheme, netloc):
+        """
+        Return a connection to `netloc` for the current thread, creating a new
+        one if needed.
+        """
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+
+        connection = connections.get((scheme, netloc))
+        if connection is None:
+            if scheme == 'https':
+                connection = http.client.HTTPSConnection(netloc, timeout=self.connect_timeout)
+            else:
+                connection = http.client.HTTPConnection(netloc, timeout=self.connect_timeout)
+            connections[(scheme, netloc)] = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def get(self, url, headers=None, max_redirects=5):
+        """
+        Send a GET request to `url` with optional `headers` dict and return a
+        tuple of (status code, response headers, response content bytes).
+        Follow up to `max_redirects` redirections.
+        Raise an HTTPError for any other non-2xx status code, including a 304
+        "Not Modified" status for conditional requests. Raise an OSError if
+        the request cannot be sent or if no response is received, including a
+        CircuitOpenError if the API is deemed unreachable.
+        """
+        parsed = urlsplit(url)
+        path = parsed.path or '/'
+        if parsed.query:
+            path = path + '?' + parsed.query
+
+        attempt = 0
+        while True:
+            if not self.circuit_breaker.allow():
+                raise CircuitOpenError('Too many failed requests to: %s' % parsed.netloc)
+            try:
+                status, reason, response_headers, content = self.send(
+                    parsed.scheme, parsed.netloc, path, headers)
+            except (OSError, http.client.HTTPException):
+                self.circuit_breaker.record_failure()
+                if attempt >= self.retries:
+                    raise
+            else:
+                if status not in RETRY_CODES:
+                    # the API is reachable even if the request is invalid
+                    self.circuit_breaker.record_success()
+                    break
+                self.circuit_breaker.record_failure()
+                if attempt >= self.retries:
+                    break
+            time.sleep(self.backoff_factor * (2 ** attempt))
+            attempt += 1
+
+        location = response_headers.get('Location')
+        if status in REDIRECT_CODES and location and max_redirects:
+            return self.get(urljoin(url, location), headers, max_redirects - 1)
+        if status >= 300:
+            raise HTTPError(url, status, reason, response_headers, None)
+        return status, response_headers, content
+
+    def send(self, scheme, netloc, path, headers=None):
+        """
+        Send a single GET request for `path` to `netloc` and return a tuple of
+        (status code, reason, response headers, response content bytes).
+        """
+        connection = self.get_connection(scheme, netloc)
+        reused = connection.sock is not None
+        try:
+            return self._send(connection, path, headers)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            if not reused:
+                raise
+            # The server closed an idle kept-alive connection: reconnect once.
+            return self._send(connection, path, headers)
+
+    def _send(self, connection, path, headers):
+        try:
+            if connection.sock is None:
+                connection.connect()
+                connection.sock.settimeout(self.read_timeout)
+            connection.request('GET', path, headers=headers or {})
+            response = connection.getresponse()
+            content = response.read()
+        except Exception:
+            # never reuse a connection left in an unknown state
+            connection.close()
+            raise
+        return response.status, response.reason, response.headers, content
+
+    def close(self):
+        """
+        Close all the connections opened by this client.
+        """
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+
+
+def get_url_content(url, headers, client=None):
+    """
+    Return a tuple of (content bytes, response headers) fetched from `url`
+    sending `headers`. Use the `client` HttpClient if provided or a new
+    one-off connection otherwise.
+    """
+    if client:
+        _status, response_headers, content = client.get(url, headers=headers)
+        return content, response_headers
+    request = Request(url, headers=headers)
+    response = urlopen(request, timeout=DEFAULT_READ_TIMEOUT)
+    return response.read(), response.headers
+
+
+def get_default_cache_dir():
+    """
+    Return the default directory location of the license cache.
+    """
+    return get_cache_dir('licenses')
+
+
+class LicenseCache(object):
+    """
+    A persistent on-disk cache of the license data fetched from a DejaCode
+    API. There is one JSON file per cached license, keyed by API URL and
+    license key.
+
+    A cached entry is fresh for `ttl` seconds. Once stale, it is revalidated
+    with a conditional request using its ETag and Last-Modified validators.
+    """
+
+    def __init__(self, location=None, ttl=DEFAULT_CACHE_TTL):
+        self.location = location or get_default_cache_dir()
+        self.ttl = ttl
+
+    def get_entry_location(self, api_url, license_key):
+        """
+        Return the location of the cache entry file for a `license_key` of
+        an `api_url`.
+        """
+        cache_key = '%s\n%s' % (api_url.rstrip('/'), license_key)
+        cache_key = sha1(cache_key.encode('utf-8')).hexdigest()
+        return os.path.join(self.location, cache_key + '.json')
+
+    def get(self, api_url, license_key):
+        """
+        Return a cached entry mapping for a `license_key` of an `api_url` or
+        None if there is no such entry.
+        """
+        location = self.get_entry_location(api_url, license_key)
+        try:
+            with io.open(location, encoding='utf-8') as entry_file:
+                return json.load(entry_file)
+        except (IOError, ValueError):
+            return None
+
+    def put(self, api_url, license_key, license_data, etag=None, last_modified=None):
+        """
+        Store the `license_data` mapping of a `license_key` of an `api_url`
+        with its optional `etag` and `last_modified` validators.
+        """
+        entry = dict(
+            api_url=api_url,
+            key=license_key,
+            fetched_at=time.time(),
+            etag=etag,
+            last_modified=last_modified,
+            data=license_data,
+        )
+        location = self.get_entry_location(api_url, license_key)
+        if not os.path.exists(self.location):
+            os.makedirs(self.location, exist_ok=True)
+        # write to a temp file first such that concurrent readers never see
+        # a partially written entry
+        temp_location = '%s.%d.%d.tmp' % (location, os.getpid(), threading.get_ident())
+        with io.open(temp_location, 'w', encoding='utf-8') as entry_file:
+            json.dump(entry, entry_file)
+        os.replace(temp_location, location)
+        return entry
+
+    def is_fresh(self, entry):
+        """
+        Return True if a cached `entry` is younger than the time to live.
+        """
+        if not entry:
+            return False
+        return time.time() - entry.get('fetched_at', 0) < self.ttl
+
+    @staticmethod
+    def get_conditional_headers(entry):
+        """
+        Return a dictionary of conditional request headers to revalidate a
+        cached `entry`.
+        """
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+
+def get_request_error(exception, license_key=None):
+    """
+    Return an Error for the `exception` raised by a failed request for the
+    data of `license_key`.
+    """
+    if isinstance(exception, HTTPError):
+        if exception.code == 403:
+            return Error(ERROR, AUTH_DENIED_MESSAGE)
+        if exception.code == 404:
+            return Error(ERROR, INVALID_API_URL_MESSAGE)
+        if exception.code in RETRY_CODES:
+            # The server is still failing after all the retries.
+            return Error(ERROR, NETWORK_PROBLEM_MESSAGE)
+        # Other errors are caused by the requested 'license'.
+        return Error(ERROR, u"Invalid 'license': %s" % license_key)
+    if isinstance(exception, (OSError, http.client.HTTPException)):
+        return Error(ERROR, NETWORK_PROBLEM_MESSAGE)
+    if isinstance(exception, (ValueError, KeyError)):
+        # The response is not a license API JSON response.
+        return Error(ERROR, INVALID_API_URL_MESSAGE)
+    return Error(ERROR, str(exception))
+
 
 # FIXME: args should start with license_key
-def request_license_data(api_url, api_key, license_key):
+def request_license_data(api_url, api_key, license_key, client=None, cache=None, offline=False):
     """
     Return a tuple of (dictionary of license data, list of errors) given a
     `license_key`. Send a request to `api_url` authenticating with `api_key`.
+    Use the optional `client` HttpClient to reuse persistent connections.
+
+    If a `cache` LicenseCache is provided, return fresh cached data without
+    any request, revalidate stale cached data and cache fetched data. If
+    `offline` is True, only return cached data.
     """
+    cached = cache and cache.get(api_url, license_key)
+    if cached and (offline or cache.is_fresh(cached)):
+        return cached['data'], []
+
+    if offline:
+        return {}, [Error(ERROR, OFFLINE_MISSING_MESSAGE % license_key)]
+
     headers = {
         'Authorization': 'Token %s' % api_key,
     }
+    if cached:
+        headers.update(cache.get_conditional_headers(cached))
     payload = {
         'api_key': api_key,
         'key': license_key,
@@ -53,32 +425,27 @@ def request_license_data(api_url, api_key, license_key):
     quoted_url = quote(full_url, safe="%/:=&?~#+!$,;'@()*[]")
 
     license_data = {}
+    response_headers = {}
+    not_modified = False
     errors = []
     try:
-        request = Request(quoted_url, headers=headers)
-        response = urlopen(request)
-        response_content = response.read().decode('utf-8')
+        response_content, response_headers = get_url_content(quoted_url, headers, client)
         # FIXME: this should be an ordered dict
-        license_data = json.loads(response_content)
+        license_data = json.loads(response_content.decode('utf-8'))
         if not license_data['results']:
             msg = u"Invalid 'license': %s" % license_key
             errors.append(Error(ERROR, msg))
 
     except HTTPError as http_e:
-        # some auth problem
-        if http_e.code == 403:
-            msg = (u"Authorization denied. Invalid '--api_key'. "
-                   u"License generation is skipped.")
-            errors.append(Error(ERROR, msg))
+        if http_e.code == 304 and cached:
+            # the cached data is still valid
+            not_modified = True
+            response_headers = http_e.headers or {}
         else:
-            # Since no api_url/api_key/network status have
-            # problem detected, it yields 'license' is the cause of
-            # this exception.
-            msg = u"Invalid 'license': %s" % license_key
-            errors.append(Error(ERROR, msg))
+            errors.append(get_request_error(http_e, license_key))
 
     except Exception as e:
-        errors.append(Error(ERROR, str(e)))
+        errors.append(get_request_error(e, license_key))
 
     finally:
         if license_data.get('count') == 1:
@@ -86,9 +453,141 @@ def request_license_data(api_url, api_key, license_key):
         else:
             license_data = {}
 
+    if not_modified:
+        license_data = cached['data']
+
+    if cache and license_data:
+        cache.put(
+            api_url, license_key, license_data,
+            etag=response_headers.get('ETag') or (cached or {}).get('etag'),
+            last_modified=response_headers.get('Last-Modified') or (cached or {}).get('last_modified'),
+        )
+
     return license_data, errors
 
 
+def request_licenses_data(api_url, api_key, license_keys, client=None, cache=None):
+    """
+    Return a tuple of ({license_key: license data}, {license_key: [errors]})
+    given a `license_keys` list of license keys. Send requests to `api_url`
+    authenticating with `api_key`, requesting all the keys at once with the
+    licenses endpoint "key__in" list filter and following the pagination.
+    Use the optional `client` HttpClient to reuse persistent connections and
+    store the fetched data in the optional `cache` LicenseCache.
+
+    Fall back to one request per key if the list request fails or if the
+    list filter is not supported by the API.
+    """
+    license_keys = list(dict.fromkeys(license_keys))
+    if not license_keys:
+        return {}, {}
+
+    headers = {
+        'Authorization': 'Token %s' % api_key,
+    }
+    payload = {
+        'api_key': api_key,
+        'key__in': ','.join(license_keys),
+        'page_size': len(license_keys),
+        'format': 'json'
+    }
+
+    api_url = api_url.rstrip('/')
+    payload = urlencode(payload)
+
+    full_url = '%(api_url)s/?%(payload)s' % locals()
+    # handle special characters in URL such as space etc.
+    url = quote(full_url, safe="%/:=&?~#+!$,;'@()*[]")
+
+    requested = set(license_keys)
+    licenses_data = {}
+    try:
+        while url:
+            response_content, _response_headers = get_url_content(url, headers, client)
+            page = json.loads(response_content.decode('utf-8'))
+            if page.get('count', 0) > len(requested):
+                # The list filter was ignored and the whole license library
+                # is returned instead.
+                return request_each_license_data(
+                    api_url, api_key, license_keys, client, cache)
+            for license_data in page.get('results') or []:
+                license_key = license_data.get('key')
+                if license_key in requested:
+                    licenses_data[license_key] = license_data
+            url = page.get('next')
+
+    except Exception as e:
+        error = get_request_error(e)
+        if error.message in FATAL_MESSAGES:
+            return {}, {k: [error] for k in license_keys}
+        # The list request failed for some other reason: try each key.
+        return request_each_license_data(
+            api_url, api_key, license_keys, client, cache)
+
+    errors = {}
+    for license_key in license_keys:
+        license_data = licenses_data.get(license_key)
+        if not license_data:
+            msg = u"Invalid 'license': %s" % license_key
+            errors[license_key] = [Error(ERROR, msg)]
+        elif cache:
+            cache.put(api_url, license_key, license_data)
+    return licenses_data, errors
+
+
+def iter_licenses_data(api_url, api_key, client=None, page_size=100):
+    """
+    Yield the license data of all the licenses of the license library at
+    `api_url` authenticating with `api_key`, following the pagination.
+    Raise an exception if a page cannot be fetched.
+    """
+    headers = {
+        'Authorization': 'Token %s' % api_key,
+    }
+    payload = urlencode({
+        'api_key': api_key,
+        'page_size': page_size,
+        'format': 'json'
+    })
+    url = '%s/?%s' % (api_url.rstrip('/'), payload)
+    while url:
+        response_content, _response_headers = get_url_content(url, headers, client)
+        page = json.loads(response_content.decode('utf-8'))
+        for license_data in page.get('results') or []:
+            yield license_data
+        url = page.get('next')
+
+
+def get_license_url(api_url, license_key):
+    """
+    Return the DejaCode URL of the license with `license_key` given the
+    `api_url` of a DejaCode license library.
+    """
+    dje_uri = urlparse(api_url)
+    domain = '{uri.scheme}://{uri.netloc}/'.format(uri=dje_uri)
+    return urljoin(domain, 'urn/?urn=urn:dje:license:') + license_key
+
+
+def request_each_license_data(api_url, api_key, license_keys, client=None, cache=None):
+    """
+    Return a tuple of ({license_key: license data}, {license_key: [errors]})
+    given a `license_keys` list of license keys, sending one request per key
+    to `api_url` authenticating with `api_key`.
+    """
+    licenses_data = {}
+    errors = {}
+    for license_key in license_keys:
+        license_data, errs = request_license_data(
+            api_url, api_key, license_key, client=client, cache=cache)
+        if license_data:
+            licenses_data[license_key] = license_data
+        if errs:
+            errors[license_key] = errs
+            if any(e.message in FATAL_MESSAGES for e in errs):
+                break
+    return licenses_data, errors
+
+
 # FIXME: args should start with license_key
 def get_license_details_from_api(api_url, api_key, license_key):
     """
@@ -103,3 +602,88 @@ def get_license_details_from_api(api_url, api_key, license_key):
     license_text = license_data.get('full_text', '')
     license_key = license_data.get('key', '')
     return license_name, license_key, license_text, errors
+
+
+def fetch_licenses_data(api_url, api_key, license_keys, max_workers=DEFAULT_MAX_WORKERS,
+                        cache=None, offline=False, batch_size=DEFAULT_BATCH_SIZE, client=None):
+    """
+    Return a tuple of (dictionary of {license_key: license data}, list of
+    errors) given a `license_keys` list of license keys. Send requests to
+    `api_url` authenticating with `api_key`.
+
+    License keys are requested in batches of up to `batch_size` keys and up
+    to `max_workers` requests are sent concurrently over persistent
+    connections. Keys that cannot be fetched are not included in the returned
+    dictionary.
+
+    Use the optional `cache` LicenseCache to avoid or revalidate requests. If
+    `offline` is True, only return data from the `cache`. Use the optional
+    `client` HttpClient or a new one otherwise.
+
+    Authorization and network problems are detected from the first failed
+    requests: the remaining requests are not sent as these would fail too.
+    """
+    license_keys = list(dict.fromkeys(license_keys))
+    if not license_keys:
+        return {}, []
+
+    licenses_data = {}
+    errors_by_key = {}
+    # stale cached keys with validators are revalidated one by one with
+    # conditional requests. The other keys are requested in batches.
+    to_revalidate = []
+    to_fetch = []
+    for license_key in license_keys:
+        cached = cache and cache.get(api_url, license_key)
+        if cached and (offline or cache.is_fresh(cached)):
+            licenses_data[license_key] = cached['data']
+        elif offline:
+            errors_by_key[license_key] = [Error(ERROR, OFFLINE_MISSING_MESSAGE % license_key)]
+        elif cached and cache.get_conditional_headers(cached):
+            to_revalidate.append(license_key)
+        else:
+            to_fetch.append(license_key)
+
+    batch_size = max(1, batch_size or 1)
+    batches = [[k] for k in to_revalidate] + [
+        to_fetch[i:i + batch_size] for i in range(0, len(to_fetch), batch_size)]
+
+    # Once an authorization is denied or the API is unreachable, all the other
+    # requests will fail too: stop sending these.
+    failed = threading.Event()
+
+    def fetch(batch):
+        if failed.is_set():
+            return {}, {}
+        if len(batch) == 1:
+            license_data, errs = request_license_data(
+                api_url, api_key, batch[0], client=client, cache=cache)
+            fetched = {batch[0]: license_data} if license_data else {}
+            errs = {batch[0]: errs} if errs else {}
+        else:
+            fetched, errs = request_licenses_data(
+                api_url, api_key, batch, client=client, cache=cache)
+        if any(e.message in FATAL_MESSAGES for es in errs.values() for e in es):
+            failed.set()
+        return fetched, errs
+
+    if batches:
+        own_client = client is None
+        if own_client:
+            client = HttpClient()
+        max_workers = max(1, min(max_workers or 1, len(batches)))
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for fetched, errs in executor.map(fetch, batches):
+                    licenses_data.update(fetched)
+                    errors_by_key.update(errs)
+        finally:
+            if own_client:
+                client.close()
+
+    errors = []
+    for license_key in license_keys:
+        for e in errors_by_key.get(license_key, []):
+            if e not in errors:
+                errors.append(e)
+    return licenses_data, errors
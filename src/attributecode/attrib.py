@@ -15,9 +15,14 @@
 # ============================================================================
 
 import collections
+from concurrent.futures import ThreadPoolExecutor
+import csv
 import datetime
+from hashlib import sha1
 import io
+import json
 import os
+import threading
 
 import jinja2
 
@@ -29,10 +34,27 @@ from attributecode.licenses import COMMON_LICENSES
 from attributecode.model import detect_special_char
 from attributecode.model import parse_license_expression
 from attributecode.util import add_unc
-from attributecode.attrib_util import multi_sort
+from attributecode.util import format_about_dict_for_csv_output
+from attributecode.attrib_util import BUILTIN_TEMPLATES_DIR
+from attributecode.attrib_util import FILTER_MEMO
+from attributecode.attrib_util import load_template
 
-DEFAULT_TEMPLATE_FILE = os.path.join(
-    os.path.dirname(os.path.realpath(__file__)), '../../templates', 'default_html.template')
+DEFAULT_TEMPLATE_FILE = os.path.join(BUILTIN_TEMPLATES_DIR, 'default_html.template')
+
+# Attribution formats written natively without a template.
+ATTRIBUTION_FORMATS = ('json', 'csv')
+
+# About fields of each component of a native attribution.
+ATTRIBUTION_FIELDS = (
+    'name',
+    'version',
+    'license_expression',
+    'license_name',
+    'copyright',
+    'homepage_url',
+)
+
+ATTRIBUTION_TITLE = 'Open Source Software Information'
 
 
 def generate(abouts, template=None, variables=None):
@@ -45,7 +67,216 @@ def generate(abouts, template=None, variables=None):
     or None and attribution text is the generated text or None.
     """
     rendered = None
+    error, template = get_checked_template(template)
+    if error:
+        return error, None
+
+    try:
+        error, context = get_template_context(abouts, variables)
+        if error:
+            return error, ''
+        rendered = template.render(**context)
+    except Exception as e:
+        error = get_processing_error(e)
+    return error, rendered
+
+
+def generate_to_file(abouts, output_location, template=None, variables=None):
+    """
+    Generate an attribution text from an `abouts` list of About objects, a
+    `template` template text and a `variables` optional dict of extra
+    variables and write it to the `output_location` file as it is rendered
+    without keeping the whole attribution text in memory. The output file is
+    only created or replaced if the attribution is generated successfully.
+
+    Return an Error object or None.
+    """
+    error, template = get_checked_template(template)
+    if error:
+        return error
+
+    try:
+        error, context = get_template_context(abouts, variables)
+    except Exception as e:
+        return get_processing_error(e)
+    if error:
+        return error
+    return render_to_file(template, context, output_location)
+
+
+def render_to_file(template, context, output_location, fragment_cache=None):
+    """
+    Render a compiled `template` with a `context` mapping and write it to the
+    `output_location` file as it is rendered. The output file is only created
+    or replaced if the rendering is successful. Use the optional
+    `fragment_cache` FragmentCache to reuse the rendered component fragments.
+
+    Return an Error object or None.
+    """
     error = None
+    output_location = add_unc(output_location)
+    temp_location = '%s.%d.%d.tmp' % (output_location, os.getpid(), threading.get_ident())
+    try:
+        if fragment_cache:
+            chunks = fragment_cache.generate(template, context)
+        else:
+            chunks = template.generate(**context)
+        with io.open(temp_location, 'w', encoding='utf-8') as of:
+            for chunk in chunks:
+                of.write(chunk)
+        os.replace(temp_location, output_location)
+    except Exception as e:
+        error = get_processing_error(e)
+    finally:
+        if os.path.exists(temp_location):
+            os.remove(temp_location)
+    return error
+
+
+class FragmentCache(object):
+    """
+    An on-disk cache of the rendered fragments of the About objects of a
+    template. A template declares a per-component fragment with a scoped
+    "component" block rendered for each About object, available as the
+    `about_object` (or `about`) variable of the block:
+
+    .. sourcecode:: jinja
+
+        {% for about_object in abouts %}
+            {% block component scoped %}...{% endblock %}
+        {% endfor %}
+
+    A fragment is cached by a hash of the template, the tool version, the
+    extra template variables, the entries of the global license mappings for
+    the license keys, license files and license texts of the About object,
+    the About object data and its license and notice texts. A fragment must
+    only depend on these.
+    """
+
+    block_name = 'component'
+
+    def __init__(self, location):
+        self.location = location
+        self.hits = 0
+        self.misses = 0
+
+    def get_context_digest(self, context, about):
+        """
+        Return a digest of the entries of the global license mappings of a
+        template `context` mapping that the fragment of an `about` About
+        object may depend on: the entries of its own license keys, license
+        file names and license text hashes.
+        """
+        common_licenses = context.get('common_licenses') or ()
+        license_file_key_and_license_key = context.get('license_file_key_and_license_key') or {}
+        license_file_name_and_license_file_key = context.get('license_file_name_and_license_file_key') or {}
+        license_text_hash_and_common_license_key = context.get('license_text_hash_and_common_license_key') or {}
+
+        license_keys = set(about.license_key.value or [])
+        if about.license_expression.value:
+            _special_char, expression_keys = parse_license_expression(about.license_expression.value)
+            license_keys.update(expression_keys)
+
+        entries = []
+        for license_file_name in sorted(about.license_file.value or {}):
+            license_file_key = license_file_name_and_license_file_key.get(license_file_name)
+            license_key = license_file_key_and_license_key.get(license_file_key)
+            entries.append((license_file_name, license_file_key, license_key))
+            license_keys.update(key for key in (license_file_key, license_key) if key)
+
+        for license_text_hash in sorted(getattr(about, 'license_file_hashes', {}).values()):
+            entries.append((license_text_hash, license_text_hash_and_common_license_key.get(license_text_hash)))
+
+        for license_key in sorted(license_keys):
+            entries.append((license_key, license_key in common_licenses))
+
+        return sha1(repr(entries).encode('utf-8')).hexdigest()
+
+    def get_key(self, template, about, variables=None, context_digest=''):
+        """
+        Return the cache key of the fragment of an `about` About object for a
+        compiled `template`, a `variables` optional dict of extra variables
+        and a `context_digest` digest of its global license mappings entries.
+        """
+        key = sha1()
+        for value in (template.name, __version__, repr(sorted((variables or {}).items())),
+                      context_digest, about.dumps()):
+            key.update(value.encode('utf-8'))
+            key.update(b'\0')
+        for field in (about.license_file, about.notice_file):
+            for name, text in sorted((field.value or {}).items()):
+                key.update(name.encode('utf-8'))
+                key.update(b'\0')
+                key.update((text or '').encode('utf-8'))
+                key.update(b'\0')
+        return key.hexdigest()
+
+    def get_location(self, key):
+        return os.path.join(self.location, key[:2], key + '.fragment')
+
+    def get(self, key):
+        """
+        Return the cached fragment for `key` or None.
+        """
+        try:
+            with io.open(self.get_location(key), encoding='utf-8') as ff:
+                return ff.read()
+        except IOError:
+            return None
+
+    def put(self, key, fragment):
+        location = self.get_location(key)
+        parent = os.path.dirname(location)
+        if not os.path.exists(parent):
+            os.makedirs(parent, exist_ok=True)
+        # write to a temp file first such that concurrent readers never see
+        # a partially written fragment
+        temp_location = '%s.%d.%d.tmp' % (location, os.getpid(), threading.get_ident())
+        with io.open(temp_location, 'w', encoding='utf-8') as ff:
+            ff.write(fragment)
+        os.replace(temp_location, location)
+
+    def generate(self, template, context):
+        """
+        Yield the rendered chunks of a compiled `template` for a `context`
+        mapping using cached component fragments. Render the template
+        normally if it has no component block.
+        """
+        if self.block_name not in template.blocks or not template.name:
+            yield from template.generate(**context)
+            return
+
+        variables = context.get('variables')
+        template_context = template.new_context(context)
+        block_render_funcs = template_context.blocks[self.block_name]
+        render_block = block_render_funcs[0]
+
+        def render_cached_block(block_context):
+            about = block_context.get('about_object') or block_context.get('about')
+            if about is None:
+                yield from render_block(block_context)
+                return
+            context_digest = self.get_context_digest(context, about)
+            key = self.get_key(template, about, variables, context_digest)
+            fragment = self.get(key)
+            if fragment is None:
+                self.misses += 1
+                fragment = ''.join(render_block(block_context))
+                self.put(key, fragment)
+            else:
+                self.hits += 1
+            yield fragment
+
+        block_render_funcs[0] = render_cached_block
+        yield from template.root_render_func(template_context)
+
+
+def get_checked_template(template):
+    """
+    Return a tuple of (error, compiled template) for a `template` template
+    text where error is an Error object or None and the compiled template is
+    None if the template is not valid.
+    """
     template_error = check_template(template)
     if template_error:
         lineno, message = template_error
@@ -54,124 +285,240 @@ def generate(abouts, template=None, variables=None):
             'Template validation error at line: {lineno}: "{message}"'.format(**locals())
         )
         return error, None
+    return None, load_template(template)
 
-    template = jinja2.Template(template)
 
-    try:
-        captured_license = []
-        license_file_key_and_context = {}
-        sorted_license_file_key_and_context = {}
-        license_file_name_and_license_file_key = {}
-        license_key_and_license_name = {}
-        license_name_and_license_key = {}
-        license_key_and_license_file_name = {}
-        license_file_key_and_license_key = {}
-        # FIXME: This need to be simplified
-        for about in abouts:
-            # about.license_file.value is a OrderDict with license_file_name as
-            # the key and the license text as the value
-            if about.license_file:
-                # We want to create a dictionary which have the license file key as
-                # the key and license text as the value
-                # The reason we want to use license file key as the key instead of the
-                # license key is because there is a scenario such that the input only provide
-                # license_file but not license_key
-                # The license file key is bascially a license_key or a license file
-                # name if it's not generated from DJE. The reason for not using
-                # license file name as the key at the first place is because
-                # we need the license_key to match with the common license list
-                for license_file_name in about.license_file.value:
-                    if not license_file_name in captured_license:
-                        captured_license.append(license_file_name)
-                        license_file_key = get_license_file_key(license_file_name)
-                        license_file_key_and_context[license_file_key] = about.license_file.value[license_file_name]
-                        sorted_license_file_key_and_context = collections.OrderedDict(sorted(license_file_key_and_context.items()))
-                        license_file_name_and_license_file_key[license_file_name] = license_file_key
-
-            lic_list = []
-            lic_name_list = []
-            lic_name_expression_list = []
-            # Convert/map the key to name
-            if about.license_name.value:
-                if about.license_expression.value or about.license_key.value:
-                    if about.license_expression.value:
-                        special_char, lic_list = parse_license_expression(about.license_expression.value)
-                        about.license_key.value = lic_list
-                    else:
-                        lic_list = about.license_key.value
-                        special_char = []
-                        for lic in lic_list:
-                            special_char_list = detect_special_char(lic)
-                            if special_char_list:
-                                for char in special_char_list:
-                                    special_char.append(char)
-                    if special_char:
-                        error = Error(CRITICAL, 'Special character(s) are not allowed in '
-                                      'license_expression or license_key: %s' % special_char)
-                        return error, ''
-                else:
-                    # No license_key or license_expression present. We will put
-                    # None as the value of license key
-                    about.license_key.value = about.license_file.value.keys()
-                    lic_list = about.license_file.value.keys()
-
-                lic_name_list = about.license_name.value
-
-                # The order of the license_name and key should be the same
-                # The length for both list should be the same
-                assert len(lic_name_list) == len(lic_list)
-
-                # Map the license key to license name
-                index_for_license_name_list = 0
-                for key in lic_list:
-                    license_key_and_license_file_name[key] = list(about.license_file.value.keys())[index_for_license_name_list]
-                    license_key_and_license_name[key] = lic_name_list[index_for_license_name_list]
-                    license_name_and_license_key[lic_name_list[index_for_license_name_list]] = key
-                    license_file_key = license_file_name_and_license_file_key[license_key_and_license_file_name[key]]
-                    license_file_key_and_license_key[license_file_key] = key
-                    index_for_license_name_list = index_for_license_name_list + 1
-
-                # Create a license expression with license name instead of key
-                for segment in about.license_expression.value.split():
-                    if segment in license_key_and_license_name:
-                        lic_name_expression_list.append(license_key_and_license_name[segment])
-                    else:
-                        lic_name_expression_list.append(segment)
-
-                # Join the license name expression into a single string
-                lic_name_expression = ' '.join(lic_name_expression_list)
-
-                # Add the license name expression string into the about object
-                about.license_name_expression = lic_name_expression
+def get_processing_error(exception):
+    """
+    Return an Error for an `exception` raised while rendering a template.
+    """
+    return Error(CRITICAL, 'Template processing error:' + str(exception))
 
+
+def get_template_context(abouts, variables=None):
+    """
+    Return a tuple of (error, template context mapping) for an `abouts` list
+    of About objects and a `variables` optional dict of extra variables where
+    error is an Error object or None. Update the About objects license keys
+    and license name expression.
+    """
+    license_index = LicenseIndex()
+    for about in abouts:
+        license_index.add_license_files(about)
+
+        lic_list = []
+        # Convert/map the key to name
+        if about.license_name.value:
+            if about.license_expression.value or about.license_key.value:
+                if about.license_expression.value:
+                    special_char, lic_list = parse_license_expression(about.license_expression.value)
+                    about.license_key.value = lic_list
+                else:
+                    lic_list = about.license_key.value
+                    special_char = []
+                    for lic in lic_list:
+                        special_char_list = detect_special_char(lic)
+                        if special_char_list:
+                            for char in special_char_list:
+                                special_char.append(char)
+                if special_char:
+                    error = Error(CRITICAL, 'Special character(s) are not allowed in '
+                                  'license_expression or license_key: %s' % special_char)
+                    return error, None
+            else:
+                # No license_key or license_expression present. We will put
+                # None as the value of license key
+                about.license_key.value = about.license_file.value.keys()
+                lic_list = about.license_file.value.keys()
+
+            license_index.add_license_names(about, lic_list)
+
+            # Add the license name expression string into the about object
+            about.license_name_expression = license_index.get_license_name_expression(
+                about.license_expression.value)
+
+    context = dict(
+        abouts=abouts,
+        common_licenses=COMMON_LICENSES,
         # Get the current UTC time
-        utcnow = datetime.datetime.utcnow()
-        rendered = template.render(
-            abouts=abouts, common_licenses=COMMON_LICENSES,
-            license_file_key_and_context=sorted_license_file_key_and_context,
-            license_file_key_and_license_key=license_file_key_and_license_key,
-            license_file_name_and_license_file_key=license_file_name_and_license_file_key,
-            license_key_and_license_file_name=license_key_and_license_file_name,
-            license_key_and_license_name=license_key_and_license_name,
-            license_name_and_license_key=license_name_and_license_key,
-            utcnow=utcnow,
-            tkversion=__version__,
-            variables=variables
-        )
-    except Exception as e:
-        lineno = getattr(e, 'lineno', '') or ''
-        if lineno:
-            lineno = ' at line: {}'.format(lineno)
-        err = getattr(e, 'message', '') or ''
-#        error = Error(
-#            CRITICAL,
-#            'Template processing error {lineno}: {err}'.format(**locals()),
-#        )
-        error = Error(
-            CRITICAL,
-            'Template processing error:' + str(e),
+        utcnow=datetime.datetime.utcnow(),
+        tkversion=__version__,
+        variables=variables,
+    )
+    context.update(license_index.get_context())
+    context.update(get_about_indexes(abouts))
+    # memoize the results of the multi_sort and unique_together filters
+    context[FILTER_MEMO] = {}
+    return None, context
+
+
+def get_about_license_keys(about):
+    """
+    Return a list of the unique license keys of an `about` About object.
+    """
+    license_keys = about.license_key.value
+    if not license_keys and about.license_expression.value:
+        special_char, license_keys = parse_license_expression(about.license_expression.value)
+        if special_char:
+            license_keys = []
+    return list(dict.fromkeys(license_keys or []))
+
+
+def get_about_indexes(abouts):
+    """
+    Return a mapping of template variables with groupings and sortings of an
+    `abouts` list of About objects computed once for all the templates:
+
+    - abouts_by_license_key: {license key: [About objects]} sorted by key
+    - abouts_by_owner: {owner: [About objects]} sorted by owner
+    - license_keys_sorted: sorted list of all the license keys
+    - abouts_sorted_by_name: About objects sorted by name and version,
+      ignoring case
+
+    The About objects of each group are in the `abouts` order.
+    """
+    abouts_by_license_key = {}
+    abouts_by_owner = {}
+    for about in abouts:
+        for license_key in get_about_license_keys(about):
+            abouts_by_license_key.setdefault(license_key, []).append(about)
+        if about.owner.value:
+            abouts_by_owner.setdefault(about.owner.value, []).append(about)
+
+    license_keys_sorted = sorted(abouts_by_license_key)
+
+    def name_version(about):
+        return (about.name.value or '').lower(), (about.version.value or '').lower()
+
+    return dict(
+        abouts_by_license_key=collections.OrderedDict(
+            (key, abouts_by_license_key[key]) for key in license_keys_sorted),
+        abouts_by_owner=collections.OrderedDict(sorted(abouts_by_owner.items())),
+        license_keys_sorted=license_keys_sorted,
+        abouts_sorted_by_name=sorted(abouts, key=name_version),
+    )
+
+
+class LicenseIndex(object):
+    """
+    Index the license files, keys and names of About objects, built in a
+    single pass over the About objects. The mappings are exposed to templates
+    with get_context().
+
+    A license file key is the license key of a license file generated from
+    DejaCode or the license file name otherwise: the input may provide a
+    license_file without a license_key. It is used rather than the license file
+    name to match the license keys of the common license list.
+
+    License texts are also indexed by the SHA1 of their content such that
+    templates can output each distinct text once: the license text hash of
+    each license file of an About object is stored in its
+    `license_file_hashes` {license file name: license text hash} mapping and
+    the names of the license files of each text are listed.
+    """
+
+    def __init__(self, common_licenses=COMMON_LICENSES):
+        self.common_licenses = common_licenses
+        # {license file key: license text}
+        self.license_file_key_and_context = {}
+        # {license text hash: license text} in order of first appearance
+        self.license_text_by_hash = {}
+        # {license text hash: [license file names]} of the same text
+        self.license_text_hash_and_license_file_names = {}
+        self.license_file_name_and_license_file_key = {}
+        self.license_key_and_license_file_name = {}
+        self.license_key_and_license_name = {}
+        self.license_name_and_license_key = {}
+        self.license_file_key_and_license_key = {}
+
+    def add_license_files(self, about):
+        """
+        Index the license files of an `about` About object. The first text of
+        a license file name is kept.
+        """
+        # about.license_file.value is an ordered dict of
+        # {license file name: license text}
+        about.license_file_hashes = {}
+        if not about.license_file:
+            return
+        for license_file_name, license_text in about.license_file.value.items():
+            if license_text:
+                license_text_hash = get_license_text_hash(license_text)
+                about.license_file_hashes[license_file_name] = license_text_hash
+                self.license_text_by_hash.setdefault(license_text_hash, license_text)
+                license_file_names = self.license_text_hash_and_license_file_names.setdefault(
+                    license_text_hash, [])
+                if license_file_name not in license_file_names:
+                    license_file_names.append(license_file_name)
+
+            if license_file_name in self.license_file_name_and_license_file_key:
+                continue
+            license_file_key = get_license_file_key(license_file_name)
+            self.license_file_key_and_context[license_file_key] = license_text
+            self.license_file_name_and_license_file_key[license_file_name] = license_file_key
+
+    def add_license_names(self, about, lic_list):
+        """
+        Index the license names of an `about` About object for a `lic_list`
+        list of license keys. License keys, names and files are listed in the
+        same order.
+        """
+        lic_name_list = about.license_name.value
+        # The length for both list should be the same
+        assert len(lic_name_list) == len(lic_list)
+
+        license_file_names = list(about.license_file.value.keys())
+        for index, key in enumerate(lic_list):
+            license_file_name = license_file_names[index]
+            license_name = lic_name_list[index]
+            self.license_key_and_license_file_name[key] = license_file_name
+            self.license_key_and_license_name[key] = license_name
+            self.license_name_and_license_key[license_name] = key
+            license_file_key = self.license_file_name_and_license_file_key[license_file_name]
+            self.license_file_key_and_license_key[license_file_key] = key
+
+    def get_license_name_expression(self, license_expression):
+        """
+        Return a license expression string with license names instead of
+        the license keys of a `license_expression` string.
+        """
+        license_key_and_license_name = self.license_key_and_license_name
+        return ' '.join(
+            license_key_and_license_name.get(segment, segment)
+            for segment in license_expression.split())
+
+    def get_context(self):
+        """
+        Return a mapping of the template variables of this index. The license
+        texts are sorted by license file key.
+        """
+        # the common license texts are output by license file key: map
+        # their hash to that key
+        license_text_hash_and_common_license_key = {}
+        for license_file_key, license_text in sorted(self.license_file_key_and_context.items()):
+            if license_text and license_file_key in self.common_licenses:
+                license_text_hash_and_common_license_key.setdefault(
+                    get_license_text_hash(license_text), license_file_key)
+
+        return dict(
+            license_file_key_and_context=collections.OrderedDict(
+                sorted(self.license_file_key_and_context.items())),
+            license_text_by_hash=self.license_text_by_hash,
+            license_text_hash_and_common_license_key=license_text_hash_and_common_license_key,
+            license_text_hash_and_license_file_names=self.license_text_hash_and_license_file_names,
+            license_file_key_and_license_key=self.license_file_key_and_license_key,
+            license_file_name_and_license_file_key=self.license_file_name_and_license_file_key,
+            license_key_and_license_file_name=self.license_key_and_license_file_name,
+            license_key_and_license_name=self.license_key_and_license_name,
+            license_name_and_license_key=self.license_name_and_license_key,
         )
-    return error, rendered
+
+
+def get_license_text_hash(license_text):
+    """
+    Return the SHA1 hex digest of a `license_text` string.
+    """
+    return sha1(license_text.encode('utf-8')).hexdigest()
 
 
 def get_license_file_key(license_text_name):
@@ -189,8 +536,7 @@ def check_template(template_string):
     message) if the template is invalid or None if it is valid.
     """
     try:
-        jinja2.filters.FILTERS['multi_sort'] = multi_sort
-        jinja2.Template(template_string)
+        load_template(template_string)
     except (jinja2.TemplateSyntaxError, jinja2.TemplateAssertionError) as e:
         return e.lineno, e.message
 
@@ -204,24 +550,34 @@ def generate_from_file(abouts, template_loc=DEFAULT_TEMPLATE_FILE, variables=Non
     Return a tuple of (error, attribution text) where error is an Error object
     or None and attribution text is the generated text or None.
     """
+    return generate(abouts, template=read_template(template_loc), variables=variables)
 
-    template_loc = add_unc(template_loc)
+
+def read_template(template_loc=DEFAULT_TEMPLATE_FILE):
+    """
+    Return the template text of the `template_loc` template file location.
+    """
+    template_loc = add_unc(template_loc or DEFAULT_TEMPLATE_FILE)
     with io.open(template_loc, encoding='utf-8') as tplf:
-        tpls = tplf.read()
-    return generate(abouts, template=tpls, variables=variables)
+        return tplf.read()
 
 
-def generate_and_save(abouts, output_location, template_loc=None, variables=None):
+def get_builtin_template(name):
     """
-    Generate an attribution text from an `abouts` list of About objects, a
-    `template_loc` template file location and a `variables` optional
-    dict of extra variables. Save the generated attribution text in the
-    `output_location` file.
-    Return a list of Error objects if any.
+    Return the location of the built-in template file `name` or None if
+    there is no such built-in template.
     """
-    errors = []
+    location = os.path.join(BUILTIN_TEMPLATES_DIR, name)
+    if os.path.basename(name) == name and os.path.isfile(location):
+        return location
+
 
-    # Parse license_expression and save to the license list
+def check_license_expressions(abouts):
+    """
+    Return a list of errors for the license expressions of an `abouts` list
+    of About objects.
+    """
+    errors = []
     for about in abouts:
         if not about.license_expression.value:
             continue
@@ -230,6 +586,162 @@ def generate_and_save(abouts, output_location, template_loc=None, variables=None
             msg = (u"The following character(s) cannot be in the license_expression: " +
                    str(special_char_in_expression))
             errors.append(Error(ERROR, msg))
+    return errors
+
+
+def generate_and_save_many(abouts, output_templates, variables=None, max_workers=None,
+                           fragment_cache=None):
+    """
+    Generate attribution texts from an `abouts` list of About objects and a
+    `variables` optional dict of extra variables for an `output_templates`
+    list of (output file location, template file location) tuples. Save each
+    generated attribution text in its output file.
+
+    The template context is computed once and shared by all the templates
+    which are rendered concurrently using up to `max_workers` threads, each
+    with its own FILTER_MEMO dictionary. Use
+    the optional `fragment_cache` FragmentCache to reuse the rendered
+    component fragments of templates that declare a component block.
+    Return a tuple of (list of Error objects, list of the output locations
+    successfully generated).
+    """
+    errors = check_license_expressions(abouts)
+
+    templates = []
+    for output_location, template_loc in output_templates:
+        error, template = get_checked_template(read_template(template_loc))
+        if error:
+            errors.append(error)
+        else:
+            templates.append((output_location, template))
+
+    if not templates:
+        return errors, []
+
+    try:
+        error, context = get_template_context(abouts, variables)
+    except Exception as e:
+        error = get_processing_error(e)
+    if error:
+        errors.append(error)
+        return errors, []
+
+    def render(output_template):
+        output_location, template = output_template
+        # the filter memo is keyed by object ids: never share it across threads
+        render_context = dict(context)
+        render_context[FILTER_MEMO] = {}
+        return render_to_file(template, render_context, output_location, fragment_cache)
+
+    generated = []
+    max_workers = max_workers or len(templates)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        rendering_errors = executor.map(render, templates)
+        for (output_location, _template), error in zip(templates, rendering_errors):
+            if error:
+                errors.append(error)
+            else:
+                generated.append(output_location)
+    return errors, generated
+
+
+def get_attribution_entries(abouts):
+    """
+    Yield an attribution entry mapping of ATTRIBUTION_FIELDS names to their
+    non-empty serialized value (a string or a list of strings) for each About
+    object of an `abouts` list.
+    """
+    for about in abouts:
+        entry = {}
+        for name in ATTRIBUTION_FIELDS:
+            value = getattr(about, name).serialized_value()
+            if value:
+                entry[name] = value
+        yield entry
+
+
+def write_json_attribution(abouts, output_file):
+    """
+    Write a JSON attribution of an `abouts` list of About objects to the
+    `output_file` file-like object one entry at a time.
+    """
+    output_file.write('{\n  "ossAttribution": {\n')
+    output_file.write('    "title": %s,\n' % json.dumps(ATTRIBUTION_TITLE))
+    output_file.write('    "entries": [')
+    separator = '\n'
+    for entry in get_attribution_entries(abouts):
+        output_file.write(separator)
+        output_file.write('      ')
+        output_file.write(json.dumps(entry, ensure_ascii=False))
+        separator = ',\n'
+    output_file.write('\n    ]\n  }\n}\n')
+
+
+def write_csv_attribution(abouts, output_file):
+    """
+    Write a CSV attribution of an `abouts` list of About objects to the
+    `output_file` file-like object one row at a time.
+    """
+    writer = csv.DictWriter(output_file, ATTRIBUTION_FIELDS)
+    writer.writeheader()
+    for entry in get_attribution_entries(abouts):
+        # list values are one per line as in an inventory
+        writer.writerows(format_about_dict_for_csv_output([entry]))
+
+
+def save_attribution_data(abouts, output_location, output_format):
+    """
+    Save an attribution of an `abouts` list of About objects in the
+    `output_location` file in the `output_format` "json" or "csv" format,
+    serialized directly without a template. The output file is only created
+    or replaced if the serialization is successful.
+
+    Return a list of Error objects.
+    """
+    errors = check_license_expressions(abouts)
+    write_attribution = dict(
+        json=write_json_attribution,
+        csv=write_csv_attribution,
+    )[output_format]
+
+    output_location = add_unc(output_location)
+    temp_location = '%s.%d.%d.tmp' % (output_location, os.getpid(), threading.get_ident())
+    try:
+        with io.open(temp_location, 'w', encoding='utf-8', newline='') as of:
+            write_attribution(abouts, of)
+        os.replace(temp_location, output_location)
+    except Exception as e:
+        msg = u'Cannot write the attribution: ' + str(e)
+        errors.append(Error(CRITICAL, msg))
+    finally:
+        if os.path.exists(temp_location):
+            os.remove(temp_location)
+    return errors
+
+
+def generate_and_save(abouts, output_location, template_loc=None, variables=None, stream=False):
+    """
+    Generate an attribution text from an `abouts` list of About objects, a
+    `template_loc` template file location and a `variables` optional
+    dict of extra variables. Save the generated attribution text in the
+    `output_location` file.
+
+    Return a tuple of (list of Error objects, attribution text). If `stream`
+    is True, the attribution text is written to the output file as it is
+    rendered and the returned attribution text is None.
+    """
+    errors = check_license_expressions(abouts)
+
+    if stream:
+        rendering_error = generate_to_file(
+            abouts,
+            output_location=output_location,
+            template=read_template(template_loc),
+            variables=variables
+        )
+        if rendering_error:
+            errors.append(rendering_error)
+        return errors, None
 
     rendering_error, rendered = generate_from_file(
         abouts,
@@ -14,32 +14,297 @@
 #  limitations under the License.
 # ============================================================================
 
+import functools
+from hashlib import sha1
+import io
+import os
+import threading
+import time
+
+from jinja2 import BaseLoader
 from jinja2 import Environment
-from jinja2.filters import environmentfilter
+from jinja2 import FileSystemBytecodeCache
+from jinja2 import ModuleLoader
+from jinja2 import TemplateNotFound
+from jinja2 import __version__ as jinja_version
+from jinja2.filters import contextfilter
 from jinja2.filters import make_attrgetter
 from jinja2.filters import ignore_case
 from jinja2.filters import FilterArgumentError
 
+from attributecode.util import get_cache_dir
+
 """
 Extra JINJA2 custom filters and other template utilities.
 """
 
+# Directory of the templates bundled with the toolkit.
+BUILTIN_TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), 'templates')
 
-def get_template(template_text):
+# Directory of the built-in templates compiled ahead of time to Python
+# modules at build time. See compile_builtin_templates().
+COMPILED_TEMPLATES_DIR = os.path.join(BUILTIN_TEMPLATES_DIR, 'compiled')
+
+# Name of the file of a compiled templates directory with the version of Jinja
+# that compiled these templates.
+COMPILED_TEMPLATES_VERSION_FILE = 'JINJA_VERSION'
+
+# Name of the template context variable with a dictionary used to memoize the
+# results of the multi_sort and unique_together filters during a rendering.
+FILTER_MEMO = 'filter_memo'
+
+
+def memoized(context, name, value, arguments, func):
     """
-    Return a template built from a text string.
-    Register custom templates as needed.
+    Return the result of calling `func` for a filter `name` applied to a
+    `value` with `arguments`, memoized in the FILTER_MEMO dictionary of the
+    template `context` if present.
+    """
+    memo = context.get(FILTER_MEMO)
+    if memo is None:
+        return func()
+    # the memo keeps a reference to the value such that its id is not reused
+    key = name, id(value), arguments
+    memoized_value, result = memo.get(key, (None, None))
+    if memoized_value is not value:
+        result = func()
+        memo[key] = value, result
+    return result
+
+
+class TemplateTextLoader(BaseLoader):
+    """
+    A loader of template texts named after the SHA1 of their content. A
+    template text is compiled once by an Environment and its bytecode cached
+    by content.
+    """
+
+    def __init__(self, compiled_dir=None):
+        self.sources = {}
+        self._lock = threading.Lock()
+        # templates compiled ahead of time to Python modules are loaded
+        # without parsing nor compiling their text. The compiled modules
+        # depend on the Jinja runtime: these are only used with the same
+        # Jinja version.
+        self.module_loader = None
+        if compiled_dir and get_compiled_templates_version(compiled_dir) == jinja_version:
+            self.module_loader = ModuleLoader(compiled_dir)
+
+    def add(self, template_text):
+        """
+        Add a `template_text` string and return its template name.
+        """
+        name = sha1(template_text.encode('utf-8')).hexdigest()
+        with self._lock:
+            self.sources[name] = template_text
+        return name
+
+    def get_source(self, environment, template):
+        source = self.sources.get(template)
+        if source is None:
+            raise TemplateNotFound(template)
+        # a template name is its content hash: it is always up to date
+        return source, None, lambda: True
+
+    def list_templates(self):
+        return sorted(self.sources)
+
+    def load(self, environment, name, globals=None):  # NOQA
+        if self.module_loader and name in self.sources:
+            # a compiled module is named after the content hash of its
+            # template: a stale compiled template is never found
+            try:
+                return self.module_loader.load(environment, name, globals)
+            except TemplateNotFound:
+                pass
+        return BaseLoader.load(self, environment, name, globals)
+
+
+class TemplateBytecodeCache(FileSystemBytecodeCache):
+    """
+    A bytecode cache that stores the compiled templates on disk. A cache
+    that cannot be read or written is ignored. The cache is bounded: see
+    prune().
+    """
+
+    # maximum number of cached templates, least recently used first removed
+    max_entries = 200
+    # maximum age in seconds of an unused cached template: thirty days
+    max_age = 30 * 24 * 60 * 60
+
+    def load_bytecode(self, bucket):
+        try:
+            FileSystemBytecodeCache.load_bytecode(self, bucket)
+        except (OSError, EOFError, ValueError):
+            bucket.reset()
+            return
+        if bucket.code is not None:
+            # mark this cached template as recently used
+            try:
+                os.utime(self._get_cache_filename(bucket))
+            except OSError:
+                pass
+
+    def dump_bytecode(self, bucket):
+        location = self._get_cache_filename(bucket)
+        # write to a temp file first such that concurrent readers never see
+        # a partially written file
+        temp_location = '%s.%d.%d.tmp' % (location, os.getpid(), threading.get_ident())
+        try:
+            with open(temp_location, 'wb') as cache_file:
+                bucket.write_bytecode(cache_file)
+            os.replace(temp_location, location)
+        except OSError:
+            pass
+
+    def prune(self):
+        """
+        Remove the cached templates not used for more than `max_age` seconds
+        and the least recently used templates beyond `max_entries`.
+        """
+        prefix, _, suffix = self.pattern.partition('%s')
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        entries = []
+        for name in names:
+            if not (name.startswith(prefix) and name.endswith(suffix)):
+                continue
+            location = os.path.join(self.directory, name)
+            try:
+                entries.append((os.stat(location).st_mtime, location))
+            except OSError:
+                continue
+
+        oldest = time.time() - self.max_age
+        entries.sort(reverse=True)
+        for index, (last_used, location) in enumerate(entries):
+            if index >= self.max_entries or last_used < oldest:
+                try:
+                    os.remove(location)
+                except OSError:
+                    pass
+
+
+# Environment variable with the directory of the template bytecode cache. The
+# cache is disabled if this variable is set to an empty value.
+TEMPLATE_CACHE_DIR_ENV = 'ABOUTCODE_TEMPLATE_CACHE_DIR'
+
+
+def get_bytecode_cache(location=None):
+    """
+    Return a pruned TemplateBytecodeCache stored in the `location` directory,
+    in the directory of the ABOUTCODE_TEMPLATE_CACHE_DIR environment variable
+    or in the "templates" user cache directory by default. Return None if the
+    cache is disabled or if its directory cannot be created.
     """
-    env = Environment(autoescape=True)
+    if not location:
+        location = os.environ.get(TEMPLATE_CACHE_DIR_ENV)
+        if location is None:
+            location = get_cache_dir('templates')
+        elif not location:
+            return None
+    try:
+        os.makedirs(location, exist_ok=True)
+    except OSError:
+        return None
+    cache = TemplateBytecodeCache(location)
+    cache.prune()
+    return cache
+
+
+@functools.lru_cache(maxsize=None)
+def get_environment(autoescape=False):
+    """
+    Return the shared Environment used to compile and render templates with
+    our custom filters registered. Compiled templates are cached in memory
+    and their bytecode on disk.
+    """
+    # the built-in templates are compiled ahead of time without autoescaping
+    compiled_dir = None if autoescape else COMPILED_TEMPLATES_DIR
+    return create_environment(
+        loader=TemplateTextLoader(compiled_dir),
+        bytecode_cache=get_bytecode_cache(),
+        autoescape=autoescape,
+    )
+
+
+def create_environment(loader, bytecode_cache=None, autoescape=False):
+    """
+    Return a new Environment using a template `loader` and an optional
+    `bytecode_cache` with our custom filters registered.
+    """
+    env = Environment(
+        loader=loader,
+        bytecode_cache=bytecode_cache,
+        autoescape=autoescape,
+    )
     # register our custom filters
     env.filters.update(dict(
         unique_together=unique_together,
         multi_sort=multi_sort))
-    return env.from_string(template_text)
+    return env
+
+
+def compile_builtin_templates(target=COMPILED_TEMPLATES_DIR):
+    """
+    Compile the built-in templates to Python modules in the `target`
+    directory. These are loaded by the shared Environment instead of parsing
+    and compiling the built-in templates. Return a list of compiled template
+    names.
+    """
+    loader = TemplateTextLoader()
+    for name in sorted(os.listdir(BUILTIN_TEMPLATES_DIR)):
+        location = os.path.join(BUILTIN_TEMPLATES_DIR, name)
+        if not os.path.isfile(location):
+            continue
+        with io.open(location, encoding='utf-8') as template:
+            loader.add(template.read())
+
+    env = create_environment(loader)
+    os.makedirs(target, exist_ok=True)
+    env.compile_templates(target, zip=None, ignore_errors=False)
+    version_location = os.path.join(target, COMPILED_TEMPLATES_VERSION_FILE)
+    with io.open(version_location, 'w', encoding='utf-8') as version_file:
+        version_file.write(jinja_version)
+    return loader.list_templates()
+
+
+def get_compiled_templates_version(compiled_dir):
+    """
+    Return the version of Jinja that compiled the templates of the
+    `compiled_dir` directory or None if this is not known.
+    """
+    version_location = os.path.join(compiled_dir, COMPILED_TEMPLATES_VERSION_FILE)
+    try:
+        with io.open(version_location, encoding='utf-8') as version_file:
+            return version_file.read().strip()
+    except (OSError, ValueError):
+        return None
+
+
+def load_template(template_text, autoescape=False):
+    """
+    Return a compiled template built from a `template_text` string, compiling
+    it only if this template text was not compiled before.
+    Raise a jinja2.TemplateSyntaxError if the template is not valid.
+    """
+    env = get_environment(autoescape)
+    return env.get_template(env.loader.add(template_text))
+
+
+def get_template(template_text):
+    """
+    Return a template built from a text string.
+    Register custom templates as needed.
+    """
+    return load_template(template_text, autoescape=True)
 
 
-@environmentfilter
-def multi_sort(environment, value, reverse=False, case_sensitive=False,
+@contextfilter
+def multi_sort(context, value, reverse=False, case_sensitive=False,
                attributes=None):
     """
     Sort an iterable using an "attributes" list of attribute names available on
@@ -58,6 +323,13 @@ def multi_sort(environment, value, reverse=False, case_sensitive=False,
             'such as in: '
             "for item in iterable|multi_sort(attributes=['date', 'name'])")
 
+    arguments = reverse, case_sensitive, tuple(attributes)
+    return memoized(
+        context, 'multi_sort', value, arguments,
+        lambda: _multi_sort(context.environment, value, reverse, case_sensitive, attributes))
+
+
+def _multi_sort(environment, value, reverse, case_sensitive, attributes):
     # build a list of attribute getters, one for each attribute
     do_ignore_case = ignore_case if not case_sensitive else None
     attribute_getters = []
@@ -72,8 +344,8 @@ def multi_sort(environment, value, reverse=False, case_sensitive=False,
     return sorted(value, key=key, reverse=reverse)
 
 
-@environmentfilter
-def unique_together(environment, value, case_sensitive=False, attributes=None):
+@contextfilter
+def unique_together(context, value, case_sensitive=False, attributes=None):
     """
     Return a list of unique items from an iterable. Unicity is checked when
     considering together all the values of an "attributes" list of attribute
@@ -92,6 +364,13 @@ def unique_together(environment, value, case_sensitive=False, attributes=None):
             'such as in: '
             "{% for item in iterable|unique_together(attributes=['date', 'name']) %} ")
 
+    arguments = case_sensitive, tuple(attributes)
+    return memoized(
+        context, 'unique_together', value, arguments,
+        lambda: _unique_together(context.environment, value, case_sensitive, attributes))
+
+
+def _unique_together(environment, value, case_sensitive, attributes):
     # build a list of attribute getters, one for each attribute
     do_ignore_case = ignore_case if not case_sensitive else None
     attribute_getters = []
@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# ============================================================================
+#  Copyright (c) nexB Inc. http://www.nexb.com/ - All rights reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ============================================================================
+
+import datetime
+import io
+import os
+import sqlite3
+import zlib
+from urllib.error import HTTPError
+from urllib.request import pathname2url
+
+from attributecode import __version__
+from attributecode import api
+from attributecode import ERROR
+from attributecode import Error
+from attributecode import util
+from attributecode.util import add_unc
+
+"""
+Offline license library bundles.
+
+A license bundle is a single SQLite file with the key, name, URL and full text
+of licenses, indexed by license key. It is exported from a DejaCode license
+library API or from a reference directory of .LICENSE files and is used to
+resolve licenses without any network access.
+"""
+
+BUNDLE_FORMAT_VERSION = '1'
+
+
+class LicenseBundle(object):
+    """
+    A license bundle file at `location`. License texts are stored compressed.
+    An existing bundle is opened read-only unless `read_only` is False. Use
+    open_bundle() to open a bundle checking that it is a valid bundle and
+    LicenseBundle.create() to create a new bundle.
+    """
+
+    def __init__(self, location, read_only=True):
+        self.location = location
+        if read_only:
+            # open with a URI to never write to nor create the file
+            uri = 'file:%s?mode=ro' % pathname2url(os.path.abspath(location))
+            self.connection = sqlite3.connect(uri, uri=True)
+        else:
+            self.connection = sqlite3.connect(add_unc(location))
+
+    @classmethod
+    def create(cls, location, api_url=None):
+        """
+        Return a new empty LicenseBundle created at `location`, replacing any
+        existing file. `api_url` is the optional URL of the API the licenses
+        are exported from.
+        """
+        if os.path.exists(location):
+            os.remove(location)
+        bundle = cls(location, read_only=False)
+        bundle.connection.executescript('''
+            CREATE TABLE metadata (
+                name TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE licenses (
+                key TEXT PRIMARY KEY,
+                name TEXT,
+                url TEXT,
+                text BLOB
+            );
+        ''')
+        metadata = dict(
+            format_version=BUNDLE_FORMAT_VERSION,
+            tool_version=__version__,
+            created=datetime.datetime.utcnow().isoformat(),
+            api_url=api_url or '',
+        )
+        with bundle.connection:
+            bundle.connection.executemany(
+                'INSERT INTO metadata (name, value) VALUES (?, ?)', metadata.items())
+        return bundle
+
+    @property
+    def metadata(self):
+        """
+        Return a dictionary of the bundle metadata.
+        """
+        return dict(self.connection.execute('SELECT name, value FROM metadata'))
+
+    def add(self, key, name, url, text):
+        """
+        Add or replace the license with `key`, `name`, `url` and `text`. The
+        changes are committed when the bundle is closed.
+        """
+        text = zlib.compress((text or '').encode('utf-8'), 9)
+        self.connection.execute(
+            'INSERT OR REPLACE INTO licenses (key, name, url, text) VALUES (?, ?, ?, ?)',
+            (key, name or key, url or '', text))
+
+    def get(self, key):
+        """
+        Return a list of [license name, license text, license URL] for the
+        license `key` or None if the license is not in this bundle.
+        """
+        row = self.connection.execute(
+            'SELECT name, text, url FROM licenses WHERE key = ?', (key,)).fetchone()
+        if not row:
+            return
+        name, text, url = row
+        return [name, zlib.decompress(text).decode('utf-8'), url]
+
+    def keys(self):
+        """
+        Return a sorted list of the license keys of this bundle.
+        """
+        return [k for k, in self.connection.execute('SELECT key FROM licenses ORDER BY key')]
+
+    def __contains__(self, key):
+        return bool(self.connection.execute(
+            'SELECT 1 FROM licenses WHERE key = ?', (key,)).fetchone())
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM licenses').fetchone()[0]
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_bundle(location):
+    """
+    Return a tuple of (LicenseBundle or None, list of errors) for the license
+    bundle file at `location` opened read-only. The bundle is None if the file
+    cannot be opened or is not a license bundle.
+    """
+    try:
+        bundle = LicenseBundle(location)
+    except sqlite3.DatabaseError as e:
+        msg = u'Cannot open the license bundle: %(location)s: %(e)s' % locals()
+        return None, [Error(ERROR, msg)]
+
+    try:
+        bundle.metadata
+        len(bundle)
+    except sqlite3.DatabaseError as e:
+        bundle.close()
+        msg = u'Not a valid license bundle: %(location)s: %(e)s' % locals()
+        return None, [Error(ERROR, msg)]
+    return bundle, []
+
+
+def get_inventory_license_keys(location):
+    """
+    Return a tuple of (list of unique license keys, list of errors) for the
+    license keys of the license_expression fields of the CSV or JSON inventory
+    at `location`.
+    """
+    from attributecode.model import parse_license_expression
+
+    if location.endswith('.csv'):
+        inventory = util.load_csv(location)
+    else:
+        inventory = util.iter_json(location)
+
+    license_keys = []
+    errors = []
+    for component in inventory:
+        expression = component.get('license_expression')
+        if not expression:
+            continue
+        special_char_in_expression, lic_list = parse_license_expression(expression)
+        if special_char_in_expression:
+            msg = (u"The following character(s) cannot be in the license_expression: " +
+                   str(special_char_in_expression))
+            errors.append(Error(ERROR, msg))
+        else:
+            license_keys.extend(lic_list)
+    return util.unique(license_keys), util.unique(errors)
+
+
+def export_from_api(location, api_url, api_key, license_keys=None,
+                    max_workers=api.DEFAULT_MAX_WORKERS):
+    """
+    Create a license bundle at `location` with the licenses of the DejaCode
+    license library at `api_url` authenticating with `api_key`. Only export
+    the `license_keys` licenses if provided or the whole library otherwise.
+    Return a tuple of (count of exported licenses, list of errors).
+    """
+    errors = []
+    if license_keys is None:
+        client = api.HttpClient()
+        try:
+            licenses_data = list(api.iter_licenses_data(api_url, api_key, client))
+        except HTTPError as http_e:
+            if http_e.code == 403:
+                msg = api.AUTH_DENIED_MESSAGE
+            else:
+                msg = u"URL not reachable. Invalid '--api_url': %s" % http_e
+            return 0, [Error(ERROR, msg)]
+        except Exception as e:
+            return 0, [api.get_request_error(e)]
+        finally:
+            client.close()
+    else:
+        licenses_data, errors = api.fetch_licenses_data(
+            api_url, api_key, license_keys, max_workers=max_workers)
+        licenses_data = licenses_data.values()
+
+    with LicenseBundle.create(location, api_url=api_url) as bundle:
+        for license_data in licenses_data:
+            key = license_data.get('key')
+            if not key:
+                continue
+            bundle.add(
+                key=key,
+                name=license_data.get('name'),
+                url=api.get_license_url(api_url, key),
+                text=license_data.get('full_text'),
+            )
+        return len(bundle), errors
+
+
+def export_from_reference(location, reference_dir, license_keys=None):
+    """
+    Create a license bundle at `location` with the <key>.LICENSE files of
+    the `reference_dir` directory. Only export the `license_keys` licenses if
+    provided or all the licenses otherwise.
+    Return a tuple of (count of exported licenses, list of errors).
+    """
+    errors = []
+    texts = {}
+    for name in sorted(os.listdir(reference_dir)):
+        if name.endswith('.LICENSE'):
+            texts[name[:-len('.LICENSE')]] = name
+
+    if license_keys is None:
+        license_keys = list(texts)
+
+    with LicenseBundle.create(location) as bundle:
+        for key in dict.fromkeys(license_keys):
+            file_name = texts.get(key)
+            if not file_name:
+                msg = u'License not found in the reference directory: %(key)s' % locals()
+                errors.append(Error(ERROR, msg))
+                continue
+            license_location = add_unc(os.path.join(reference_dir, file_name))
+            with io.open(license_location, encoding='utf-8', errors='replace') as lic:
+                bundle.add(key=key, name=key, url='', text=lic.read())
+        return len(bundle), errors
+
+
+def import_to_cache(location, cache, api_url=None):
+    """
+    Import all the licenses of the license bundle at `location` in the
+    `cache` LicenseCache for the `api_url`, defaulting to the API URL the
+    bundle was exported from.
+    Return a tuple of (count of imported licenses, list of errors).
+    """
+    bundle, errors = open_bundle(location)
+    if errors:
+        return 0, errors
+
+    with bundle:
+        api_url = api_url or bundle.metadata.get('api_url')
+        if not api_url:
+            msg = u'The license bundle has no API URL: an API URL is required.'
+            return 0, [Error(ERROR, msg)]
+
+        count = 0
+        for key in bundle.keys():
+            name, text, _url = bundle.get(key)
+            license_data = dict(key=key, name=name, full_text=text)
+            cache.put(api_url, key, license_data)
+            count += 1
+    return count, []
@@ -23,22 +23,26 @@ import sys
 
 import click
 
+from attributecode import CRITICAL
 from attributecode import WARNING
 from attributecode.util import unique
 
 from attributecode import __about_spec_version__
 from attributecode import __version__
+from attributecode import DEFAULT_CACHE_TTL
+from attributecode import DEFAULT_MAX_WORKERS
 from attributecode import severities
-from attributecode.attrib import check_template
-from attributecode.attrib import DEFAULT_TEMPLATE_FILE
-from attributecode.attrib import generate_and_save as generate_attribution_doc
-from attributecode.gen import generate as generate_about_files, load_inventory
-from attributecode.model import collect_inventory, get_copy_list
-from attributecode.model import copy_redist_src
-from attributecode.model import write_output
+from attributecode.util import DEFAULT_COPY_THREADS
+from attributecode.util import DEFAULT_ZIP_COMPRESSION
 from attributecode.util import extract_zip
 from attributecode.util import filter_errors
-from attributecode.util import get_temp_dir
+from attributecode.util import get_archive_format
+from attributecode.util import LINK_MODES
+from attributecode.util import ZIP_COMPRESSIONS
+
+# NOTE: the modules that import jinja2, license_expression, packageurl,
+# saneyaml or attr such as the model, attrib, gen and transform modules are
+# imported in the subcommands that use them to keep the CLI startup fast.
 
 __copyright__ = """
     Copyright (c) nexB Inc and others. All rights reserved.
@@ -167,6 +171,9 @@ LOCATION: Path to an ABOUT file or a directory with ABOUT files.
 
 OUTPUT: Path to the JSON or CSV inventory file to create.
     """
+    from attributecode.model import collect_inventory
+    from attributecode.model import write_output
+
     if not quiet:
         print_version()
         click.echo('Collecting inventory from ABOUT files...')
@@ -216,6 +223,39 @@ OUTPUT: Path to the JSON or CSV inventory file to create.
     help='Fetch license data and text files from a DejaCode License Library '
          'API URL using the API KEY.')
 
+@click.option('--fetch-workers',
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_WORKERS,
+    show_default=True,
+    metavar='INTEGER',
+    help='Maximum number of concurrent requests used to fetch license data '
+         'with --fetch-license.')
+
+@click.option('--license-cache',
+    metavar='DIR',
+    type=click.Path(file_okay=False, writable=True, resolve_path=True),
+    help='Path to a directory where to cache the license data fetched with '
+         '--fetch-license. Default to a directory in the user cache.')
+
+@click.option('--license-cache-ttl',
+    type=click.IntRange(min=0),
+    default=DEFAULT_CACHE_TTL,
+    show_default=True,
+    metavar='SECONDS',
+    help='Time to live of the cached license data. Older cached data is '
+         'revalidated with the API.')
+
+@click.option('--offline',
+    is_flag=True,
+    help='Use only the cached license data with --fetch-license and do not '
+         'send any API request.')
+
+@click.option('--license-bundle',
+    metavar='FILE',
+    type=click.Path(exists=True, dir_okay=False, readable=True, resolve_path=True),
+    help='Path to a license bundle file to use for license data and text files '
+         'instead of --fetch-license. See the license-bundle command.')
+
 @click.option('--reference',
     metavar='DIR',
     type=click.Path(exists=True, file_okay=False, readable=True, resolve_path=True),
@@ -230,7 +270,8 @@ OUTPUT: Path to the JSON or CSV inventory file to create.
     help='Show all error and warning messages.')
 
 @click.help_option('-h', '--help')
-def gen(location, output, android, fetch_license, reference, quiet, verbose):
+def gen(location, output, android, fetch_license, fetch_workers, license_cache,
+        license_cache_ttl, offline, license_bundle, reference, quiet, verbose):
     """
 Given a CSV/JSON inventory, generate ABOUT files in the output location.
 
@@ -238,6 +279,10 @@ LOCATION: Path to a JSON or CSV inventory file.
 
 OUTPUT: Path to a directory where ABOUT files are generated.
     """
+    from attributecode.api import LicenseCache
+    from attributecode.bundle import open_bundle
+    from attributecode.gen import generate as generate_about_files
+
     if not quiet:
         print_version()
         click.echo('Generating .ABOUT files...')
@@ -246,13 +291,34 @@ OUTPUT: Path to a directory where ABOUT files are generated.
     if not location.endswith(('.csv', '.json',)):
         raise click.UsageError('ERROR: Invalid input file extension: must be one .csv or .json.')
 
-    errors, abouts = generate_about_files(
-        location=location,
-        base_dir=output,
-        android=android,
-        reference_dir=reference,
-        fetch_license=fetch_license,
-    )
+    if offline and not fetch_license:
+        raise click.UsageError('ERROR: --offline requires --fetch-license.')
+
+    if license_bundle and fetch_license:
+        raise click.UsageError(
+            'ERROR: --license-bundle and --fetch-license cannot be used together.')
+
+    if license_bundle:
+        license_bundle, errors = open_bundle(license_bundle)
+        if errors:
+            errors_count = report_errors(errors, quiet, verbose, log_file_loc=output + '-error.log')
+            sys.exit(errors_count)
+
+    try:
+        errors, abouts = generate_about_files(
+            location=location,
+            base_dir=output,
+            android=android,
+            reference_dir=reference,
+            fetch_license=fetch_license,
+            max_workers=fetch_workers,
+            license_cache=LicenseCache(license_cache, ttl=license_cache_ttl),
+            offline=offline,
+            license_bundle=license_bundle,
+        )
+    finally:
+        if license_bundle:
+            license_bundle.close()
 
     errors = unique(errors)
     errors_count = report_errors(errors, quiet, verbose, log_file_loc=output + '-error.log')
@@ -267,7 +333,14 @@ OUTPUT: Path to a directory where ABOUT files are generated.
 ######################################################################
 
 
+# file extensions of the inventory files accepted as attrib LOCATION
+INVENTORY_EXTENSIONS = ('.csv', '.json', '.jsonl')
+
+
 def validate_template(ctx, param, value):
+    from attributecode.attrib import check_template
+    from attributecode.attrib import DEFAULT_TEMPLATE_FILE
+
     if not value:
         return DEFAULT_TEMPLATE_FILE
 
@@ -282,6 +355,49 @@ def validate_template(ctx, param, value):
     return value
 
 
+def split_output_template(value):
+    """
+    Return a tuple of (output, template) from an OUTPUT:TEMPLATE string or
+    None if it is not valid. Windows drive letters are not separators.
+    """
+    output, _, template = value.rpartition(':')
+    if (len(output) > 2 and output[-2] == ':' and output[-1].isalpha()
+            and template.startswith(('\\', '/'))):
+        # the template is a path with a drive letter such as C:\template
+        template = output[-1] + ':' + template
+        output = output[:-2]
+    if not output or not template:
+        return
+    return output, template
+
+
+def validate_output_templates(ctx, param, value):
+    """
+    Return a list of (output location, template location) tuples for a list
+    of OUTPUT:TEMPLATE strings or raise a UsageError. TEMPLATE is a template
+    file or the name of a built-in template.
+    """
+    output_templates = []
+    for output_template in value or []:
+        split = split_output_template(output_template)
+        if not split:
+            raise click.UsageError(
+                'Invalid --output-template option: {output_template}: '
+                'must be in the form OUTPUT:TEMPLATE'.format(**locals()))
+        output, template = split
+        if not os.path.isfile(template):
+            from attributecode.attrib import get_builtin_template
+            builtin = get_builtin_template(template)
+            if not builtin:
+                raise click.UsageError(
+                    'Invalid --output-template option: {output_template}: '
+                    'template file not found: {template}'.format(**locals()))
+            template = builtin
+        validate_template(ctx, param, template)
+        output_templates.append((os.path.abspath(output), os.path.abspath(template)))
+    return output_templates
+
+
 @about.command(cls=AboutCommand,
     short_help='Generate an attribution document from .ABOUT files.')
 
@@ -292,10 +408,19 @@ def validate_template(ctx, param, value):
         exists=True, file_okay=True, dir_okay=True, readable=True, resolve_path=True))
 
 @click.argument('output',
-    required=True,
+    required=False,
     metavar='OUTPUT',
     type=click.Path(exists=False, dir_okay=False, writable=True, resolve_path=True))
 
+@click.option('--format',
+    'output_format',
+    type=click.Choice(('html', 'json', 'csv')),
+    default='html',
+    show_default=True,
+    help='Format of the attribution document at OUTPUT. The html format uses '
+         'the default or --template template. The json and csv formats are '
+         'written directly without a template.')
+
 @click.option('--template',
     metavar='FILE',
     callback=validate_template,
@@ -303,12 +428,39 @@ def validate_template(ctx, param, value):
     help='Path to an optional custom attribution template to generate the '
          'attribution document. If not provided the default built-in template is used.')
 
+@click.option('--output-template',
+    multiple=True,
+    metavar='OUTPUT:TEMPLATE',
+    callback=validate_output_templates,
+    help='Also generate an attribution document at OUTPUT using the TEMPLATE '
+         'file or built-in template name such as default_json.template. '
+         'Can be used multiple times. All the documents are generated in one run.')
+
+@click.option('--fragment-cache',
+    metavar='DIR',
+    type=click.Path(exists=False, file_okay=False, writable=True, resolve_path=True),
+    help='Cache the rendered fragment of each component in this directory and '
+         'reuse the fragments of unchanged components. The template must '
+         'declare a "component" block such as the default template.')
+
 @click.option('--vartext',
     multiple=True,
     callback=validate_key_values,
     metavar='<key>=<value>',
     help='Add variable text as key=value for use in a custom attribution template.')
 
+@click.option('--license-bundle',
+    metavar='FILE',
+    type=click.Path(exists=True, dir_okay=False, readable=True, resolve_path=True),
+    help='Path to a license bundle file used to get the license names and texts '
+         'of the .ABOUT files that have a license_expression but no license file.')
+
+@click.option('--reference',
+    metavar='DIR',
+    type=click.Path(exists=True, file_okay=False, readable=True, resolve_path=True),
+    help='Path to a directory with the license and notice files of an inventory '
+         'LOCATION.')
+
 @click.option('-q', '--quiet',
     is_flag=True,
     help='Do not print error or warning messages.')
@@ -318,14 +470,38 @@ def validate_template(ctx, param, value):
     help='Show all error and warning messages.')
 
 @click.help_option('-h', '--help')
-def attrib(location, output, template, vartext, quiet, verbose):
+def attrib(location, output, output_format, template, output_template, fragment_cache, vartext,
+           license_bundle, reference, quiet, verbose):
     """
 Generate an attribution document at OUTPUT using .ABOUT files at LOCATION.
 
-LOCATION: Path to a file, directory or .zip archive containing .ABOUT files.
+LOCATION: Path to a file, directory or .zip archive containing .ABOUT files,
+or to a CSV, JSON or JSON lines (.jsonl) inventory file.
 
-OUTPUT: Path where to write the attribution document.
+OUTPUT: Path where to write the attribution document. Optional if
+--output-template is used.
     """
+    from attributecode.attrib import DEFAULT_TEMPLATE_FILE
+    from attributecode.attrib import FragmentCache
+    from attributecode.attrib import generate_and_save_many as generate_attribution_docs
+    from attributecode.attrib import save_attribution_data
+    from attributecode.bundle import open_bundle
+    from attributecode.gen import load_inventory
+    from attributecode.model import add_licenses_from_bundle
+    from attributecode.model import collect_inventory
+
+    output_templates = list(output_template)
+    if output_format != 'html':
+        if template != DEFAULT_TEMPLATE_FILE:
+            raise click.UsageError(
+                'The --template option cannot be used with --format {output_format}.'.format(**locals()))
+        if not output:
+            raise click.UsageError('Missing argument "OUTPUT" for --format {output_format}.'.format(**locals()))
+    elif output:
+        output_templates.insert(0, (output, template))
+    if not output and not output_templates:
+        raise click.UsageError('Missing argument "OUTPUT" or option "--output-template".')
+
     if not quiet:
         print_version()
         click.echo('Generating attribution...')
@@ -334,27 +510,63 @@ OUTPUT: Path where to write the attribution document.
     if location.lower().endswith('.zip'):
         location = extract_zip(location)
 
-    errors, abouts = collect_inventory(location)
+    if location.lower().endswith(INVENTORY_EXTENSIONS):
+        # build the About objects in memory from the inventory: the license
+        # and notice files are relative to the inventory or in the reference
+        errors, abouts = load_inventory(
+            location=location,
+            base_dir=os.path.dirname(location),
+            reference_dir=reference,
+            copy_reference_files=False,
+        )
+    else:
+        errors, abouts = collect_inventory(location)
 
     if not abouts:
         msg = 'No ABOUT file is found. Attribution generation halted.'
         click.echo(msg)
         sys.exit(1)
-    attrib_errors, rendered = generate_attribution_doc(
-        abouts=abouts,
-        output_location=output,
-        template_loc=template,
-        variables=vartext,
-    )
-    errors.extend(attrib_errors)
+
+    if license_bundle:
+        bundle, bundle_errors = open_bundle(license_bundle)
+        errors.extend(bundle_errors)
+        if bundle:
+            with bundle:
+                errors.extend(add_licenses_from_bundle(abouts, bundle))
+
+    if fragment_cache:
+        fragment_cache = FragmentCache(fragment_cache)
+
+    outputs_count = len(output_templates)
+    generated = []
+    if output_format != 'html':
+        # serialize the attribution data directly without a template
+        outputs_count += 1
+        attrib_errors = save_attribution_data(abouts, output, output_format)
+        errors.extend(attrib_errors)
+        if not [e for e in attrib_errors if e.severity == CRITICAL]:
+            generated.append(output)
+
+    if output_templates:
+        attrib_errors, generated_docs = generate_attribution_docs(
+            abouts=abouts,
+            output_templates=output_templates,
+            variables=vartext,
+            fragment_cache=fragment_cache,
+        )
+        errors.extend(attrib_errors)
+        generated.extend(generated_docs)
+
     errors = unique(errors)
-    errors_count = report_errors(errors, quiet, verbose, log_file_loc=output + '-error.log')
+    log_file_loc = (output or output_templates[0][0]) + '-error.log'
+    errors_count = report_errors(errors, quiet, verbose, log_file_loc=log_file_loc)
 
     if not quiet:
-        if rendered:
+        # an attribution is only written if there is no rendering error
+        for output in generated:
             msg = 'Attribution generated in: {output}'.format(**locals())
             click.echo(msg)
-        else:
+        if len(generated) < outputs_count:
             msg = 'Attribution generation failed.'
             click.echo(msg)
     sys.exit(errors_count)
@@ -389,7 +601,41 @@ OUTPUT: Path where to write the attribution document.
 
 @click.option('--zip',
     is_flag=True,
-    help='Zip the copied sources to the output location.')
+    help='Write the sources directly in an archive at the output location: '
+         'a .zip, .tar, .tar.gz, .tgz or .tar.xz file.')
+
+@click.option('--compression',
+    type=click.Choice(sorted(ZIP_COMPRESSIONS)),
+    default=DEFAULT_ZIP_COMPRESSION,
+    show_default=True,
+    help='Compression method of a .zip archive with --zip. The compression '
+         'of a tar archive is set by its extension.')
+
+@click.option('--compression-level',
+    type=click.IntRange(min=0, max=9),
+    metavar='INTEGER',
+    help='Compression level from 0 (fastest) to 9 (smallest) of a deflate .zip, '
+         '.tar.gz or .tar.xz archive with --zip.')
+
+@click.option('--link-mode',
+    type=click.Choice(LINK_MODES),
+    default='copy',
+    show_default=True,
+    help='Copy the files or create hard links or symbolic links to the source '
+         'files in the output directory. Not supported with --zip.')
+
+@click.option('--manifest',
+    metavar='FILE',
+    type=click.Path(exists=False, dir_okay=False, writable=True, resolve_path=True),
+    help='Write a manifest with the size and the md5, sha1 and sha256 checksums '
+         'of each collected file keyed by its output path in this CSV or JSON file.')
+
+@click.option('--threads',
+    type=click.IntRange(min=1),
+    default=DEFAULT_COPY_THREADS,
+    show_default=True,
+    metavar='INTEGER',
+    help='Maximum number of threads used to copy the sources.')
 
 @click.option('-q', '--quiet',
     is_flag=True,
@@ -400,7 +646,8 @@ OUTPUT: Path where to write the attribution document.
     help='Show all error and warning messages.')
 
 @click.help_option('-h', '--help')
-def collect_redist_src(location, output, from_inventory, with_structures, zip, quiet, verbose):
+def collect_redist_src(location, output, from_inventory, with_structures, zip, compression,
+                       compression_level, link_mode, manifest, threads, quiet, verbose):
     """
 Collect sources that have 'redistribute' flagged as 'True' in .ABOUT files or inventory
 to the output location.
@@ -409,10 +656,26 @@ LOCATION: Path to a directory containing sources that need to be copied
 (and containing ABOUT files if `inventory` is not provided)
 
 OUTPUT: Path to a directory or a zip file where sources will be copied to.
+
+A file is not copied again if the output directory already has a file with
+the same size and modification time (to the second): a source file changed
+without changing its size within the same second is not copied again.
     """
+    from attributecode.gen import load_inventory
+    from attributecode.model import archive_redist_src
+    from attributecode.model import collect_inventory
+    from attributecode.model import copy_redist_src
+    from attributecode.model import get_copy_list
+
+    if manifest and not manifest.lower().endswith(('.csv', '.json')):
+        raise click.UsageError('The --manifest file needs to be a .csv or .json file.')
+
+    if zip and link_mode != 'copy':
+        raise click.UsageError('The --link-mode option cannot be used with --zip.')
+
     if zip:
-        if not output.endswith('.zip'):
-            click.echo('The output needs to be a zip file.')
+        if not get_archive_format(output):
+            click.echo('The output needs to be a .zip, .tar, .tar.gz, .tgz or .tar.xz file.')
             sys.exit()
 
     if not quiet:
@@ -428,21 +691,19 @@ OUTPUT: Path to a directory or a zip file where sources will be copied to.
     else:
         errors, abouts = collect_inventory(location)
 
-    if zip:
-        # Copy to a temp location and the zip to the output location
-        output_location = get_temp_dir()
-    else:
-        output_location = output
-
     copy_list, copy_list_errors = get_copy_list(abouts, location)
-    copy_errors = copy_redist_src(copy_list, location, output_location, with_structures)
-
     if zip:
-        import shutil
-        # Stripped the .zip extension as the `shutil.make_archive` will
-        # append the .zip extension
-        output_no_extension = output.rsplit('.', 1)[0]
-        shutil.make_archive(output_no_extension, 'zip', output_location)
+        # write the sources in the archive without copying them first
+        copy_errors = archive_redist_src(
+            copy_list, location, output, with_structures,
+            compression=compression,
+            compresslevel=compression_level,
+            manifest=manifest,
+            threads=threads,
+        )
+    else:
+        copy_errors = copy_redist_src(
+            copy_list, location, output, with_structures, threads, link_mode, manifest)
 
     errors.extend(copy_list_errors)
     errors.extend(copy_errors)
@@ -452,6 +713,154 @@ OUTPUT: Path to a directory or a zip file where sources will be copied to.
         click.echo(msg)
     sys.exit(errors_count)
 
+######################################################################
+# license-bundle subcommands
+######################################################################
+
+
+@about.group(name='license-bundle',
+    short_help='Export or import an offline license library bundle.')
+
+@click.help_option('-h', '--help')
+def license_bundle():
+    """
+Export or import a license bundle: a single indexed file with the key, name, URL
+and text of licenses for use without network access.
+
+Use about license-bundle <command> --help for help on a command.
+    """
+
+
+@license_bundle.command(name='export', cls=AboutCommand,
+    short_help='Export licenses to a license bundle file.')
+
+@click.argument('output',
+    required=True,
+    metavar='OUTPUT',
+    type=click.Path(exists=False, dir_okay=False, writable=True, resolve_path=True))
+
+@click.option('--fetch-license',
+    nargs=2,
+    type=str,
+    metavar='URL KEY',
+    help='Export licenses from a DejaCode License Library API URL using the API KEY.')
+
+@click.option('--fetch-workers',
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_WORKERS,
+    show_default=True,
+    metavar='INTEGER',
+    help='Maximum number of concurrent requests used with --fetch-license.')
+
+@click.option('--reference',
+    metavar='DIR',
+    type=click.Path(exists=True, file_okay=False, readable=True, resolve_path=True),
+    help='Export the <key>.LICENSE files of a directory of reference license texts.')
+
+@click.option('--from-inventory',
+    metavar='FILE',
+    type=click.Path(exists=True, dir_okay=False, readable=True, resolve_path=True),
+    help='Path to an inventory CSV/JSON file: only export the licenses of its '
+         'license_expression fields. Export all the licenses otherwise.')
+
+@click.option('-q', '--quiet',
+    is_flag=True,
+    help='Do not print error or warning messages.')
+
+@click.option('--verbose',
+    is_flag=True,
+    help='Show all error and warning messages.')
+
+@click.help_option('-h', '--help')
+def license_bundle_export(output, fetch_license, fetch_workers, reference, from_inventory,
+                          quiet, verbose):
+    """
+Export licenses from a DejaCode License Library API or from a reference directory
+to a license bundle file at OUTPUT.
+
+OUTPUT: Path to the license bundle file to create.
+    """
+    from attributecode import bundle
+
+    if bool(fetch_license) == bool(reference):
+        raise click.UsageError('ERROR: one of --fetch-license or --reference is required.')
+
+    if not quiet:
+        print_version()
+        click.echo('Exporting license bundle...')
+
+    errors = []
+    license_keys = None
+    if from_inventory:
+        license_keys, key_errors = bundle.get_inventory_license_keys(from_inventory)
+        errors.extend(key_errors)
+
+    if fetch_license:
+        api_url = fetch_license[0].strip("'").strip('"')
+        api_key = fetch_license[1].strip("'").strip('"')
+        count, export_errors = bundle.export_from_api(
+            output, api_url, api_key, license_keys, max_workers=fetch_workers)
+    else:
+        count, export_errors = bundle.export_from_reference(output, reference, license_keys)
+
+    errors.extend(export_errors)
+    errors = unique(errors)
+    errors_count = report_errors(errors, quiet, verbose, log_file_loc=output + '-error.log')
+    if not quiet:
+        msg = '{count} licenses exported to {output}.'.format(**locals())
+        click.echo(msg)
+    sys.exit(errors_count)
+
+
+@license_bundle.command(name='import', cls=AboutCommand,
+    short_help='Import a license bundle file in the license cache.')
+
+@click.argument('location',
+    required=True,
+    metavar='LOCATION',
+    type=click.Path(exists=True, dir_okay=False, readable=True, resolve_path=True))
+
+@click.option('--license-cache',
+    metavar='DIR',
+    type=click.Path(file_okay=False, writable=True, resolve_path=True),
+    help='Path to the license cache directory used by "gen --fetch-license". '
+         'Default to a directory in the user cache.')
+
+@click.option('--api-url',
+    metavar='URL',
+    help='DejaCode License Library API URL to import the licenses for. Default '
+         'to the API URL the bundle was exported from.')
+
+@click.option('-q', '--quiet',
+    is_flag=True,
+    help='Do not print error or warning messages.')
+
+@click.option('--verbose',
+    is_flag=True,
+    help='Show all error and warning messages.')
+
+@click.help_option('-h', '--help')
+def license_bundle_import(location, license_cache, api_url, quiet, verbose):
+    """
+Import the license bundle file at LOCATION in the license cache such that
+"gen --fetch-license URL KEY --offline" can use these licenses.
+
+LOCATION: Path to a license bundle file.
+    """
+    from attributecode import bundle
+    from attributecode.api import LicenseCache
+
+    if not quiet:
+        print_version()
+        click.echo('Importing license bundle...')
+
+    count, errors = bundle.import_to_cache(location, LicenseCache(license_cache), api_url)
+    errors_count = report_errors(errors, quiet, verbose)
+    if not quiet:
+        msg = '{count} licenses imported.'.format(**locals())
+        click.echo(msg)
+    sys.exit(errors_count)
+
 ######################################################################
 # check subcommand
 ######################################################################
@@ -480,6 +889,8 @@ Check .ABOUT file(s) at LOCATION for validity and print error messages.
 
 LOCATION: Path to an ABOUT file or a directory with ABOUT files.
     """
+    from attributecode.model import collect_inventory
+
     print_version()
     click.echo('Checking ABOUT files...')
     errors, _abouts = collect_inventory(location)
@@ -526,6 +937,13 @@ def print_config_help(ctx, param, value):
     callback=print_config_help,
     help='Show configuration file format help and exit.')
 
+@click.option('--processes',
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    metavar='INTEGER',
+    help='Number of processes used to transform a CSV file in parallel chunks.')
+
 @click.option('-q', '--quiet',
     is_flag=True,
     help='Do not print error or warning messages.')
@@ -535,7 +953,7 @@ def print_config_help(ctx, param, value):
     help='Show all error and warning messages.')
 
 @click.help_option('-h', '--help')
-def transform(location, output, configuration, quiet, verbose):  # NOQA
+def transform(location, output, configuration, processes, quiet, verbose):  # NOQA
     """
 Transform the CSV/JSON file at LOCATION by applying renamings, filters and checks
 and then write a new CSV/JSON to OUTPUT (Format for input and output need to be
@@ -555,7 +973,7 @@ OUTPUT: Path to CSV/JSON inventory file to create.
         transformer = Transformer.from_file(configuration)
 
     if location.endswith('.csv') and output.endswith('.csv'):
-        errors = transform_csv_to_csv(location, output, transformer)
+        errors = transform_csv_to_csv(location, output, transformer, processes)
     elif location.endswith('.json') and output.endswith('.json'):
         errors = transform_json_to_json(location, output, transformer)
     else:
@@ -28,6 +28,7 @@ from attributecode import INFO
 from attributecode import Error
 from attributecode import model
 from attributecode import util
+from attributecode.api import DEFAULT_MAX_WORKERS
 from attributecode.util import add_unc
 from attributecode.util import csv
 from attributecode.util import file_fields
@@ -114,14 +115,15 @@ def check_about_resource_filename(arp):
 
 
 # TODO: this should be either the CSV or the ABOUT files but not both???
-def load_inventory(location, base_dir, reference_dir=None):
+def load_inventory(location, base_dir, reference_dir=None, copy_reference_files=True):
     """
-    Load the inventory file at `location` for ABOUT and LICENSE files stored in
-    the `base_dir`. Return a list of errors and a list of About objects
-    validated against the `base_dir`.
+    Load the CSV, JSON or JSON lines inventory file at `location` for ABOUT and
+    LICENSE files stored in the `base_dir`. Return a list of errors and a list
+    of About objects validated against the `base_dir`.
 
     Optionally use `reference_dir` as the directory location of extra reference
-    license and notice files to reuse.
+    license and notice files to reuse. These are copied to the `base_dir`
+    unless `copy_reference_files` is False.
     """
     errors = []
     abouts = []
@@ -134,8 +136,12 @@ def load_inventory(location, base_dir, reference_dir=None):
             errors.extend(dup_cols_err)
             return errors, abouts
         inventory = util.load_csv(location)
+    elif location.endswith('.jsonl'):
+        inventory = util.load_jsonl(location)
     else:
-        inventory = util.load_json(location)
+        # the JSON entries are read again from the file for each pass below
+        # instead of being all kept in memory
+        inventory = util.iter_json(location)
 
     try:
         arp_list = []
@@ -158,12 +164,18 @@ def load_inventory(location, base_dir, reference_dir=None):
         if errors:
             return errors, abouts
 
+    except ValueError:
+        # invalid JSON
+        raise
     except Exception as e:
         # TODO: why catch ALL Exception
         msg = "The essential field 'about_resource' is not found in the <input>"
         errors.append(Error(CRITICAL, msg))
         return errors, abouts
 
+    if not location.endswith(('.csv', '.jsonl')):
+        inventory = util.iter_json(location)
+
     for i, fields in enumerate(inventory):
         # check does the input contains the required fields
         required_fields = model.About.required_fields
@@ -202,6 +214,7 @@ def load_inventory(location, base_dir, reference_dir=None):
             base_dir,
             running_inventory=False,
             reference_dir=reference_dir,
+            copy_reference_files=copy_reference_files,
         )
         """
         # 'about_resource' field will be generated during the process.
@@ -222,10 +235,20 @@ def update_about_resource(self):
     pass
 
 
-def generate(location, base_dir, android=None, reference_dir=None, fetch_license=False):
+def generate(location, base_dir, android=None, reference_dir=None, fetch_license=False,
+             max_workers=DEFAULT_MAX_WORKERS, license_cache=None, offline=False,
+             license_bundle=None):
     """
     Load ABOUT data from a CSV inventory at `location`. Write ABOUT files to
     base_dir. Return errors and about objects.
+
+    If `fetch_license` is provided, fetch the license data using up to
+    `max_workers` concurrent API requests. Use the optional `license_cache`
+    LicenseCache to reuse previously fetched license data. If `offline` is
+    True, only use the license data available in the `license_cache`.
+
+    If a `license_bundle` LicenseBundle is provided, use the license data of
+    this bundle instead of fetching it.
     """
     not_exist_errors = []
     notice_dict = {}
@@ -249,8 +272,16 @@ def generate(location, base_dir, android=None, reference_dir=None, fetch_license
         reference_dir=reference_dir
     )
 
-    if gen_license:
-        license_dict, err = model.pre_process_and_fetch_license_dict(abouts, api_url, api_key)
+    if license_bundle:
+        gen_license = True
+        license_dict, err = model.get_license_dict_from_bundle(abouts, license_bundle)
+        for e in err:
+            if not e in errors:
+                errors.append(e)
+    elif gen_license:
+        license_dict, err = model.pre_process_and_fetch_license_dict(
+            abouts, api_url, api_key, max_workers=max_workers,
+            cache=license_cache, offline=offline)
         if err:
             for e in err:
                 # Avoid having same error multiple times
@@ -29,15 +29,13 @@ import json
 import os
 import posixpath
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from itertools import zip_longest
-from urllib.parse import urljoin
 from urllib.parse import urlparse
-from urllib.request import urlopen
-from urllib.request import Request
-from urllib.error import HTTPError
 
 from license_expression import Licensing
 from packageurl import PackageURL
+import saneyaml
 
 from attributecode import __version__
 from attributecode import CRITICAL
@@ -46,12 +44,14 @@ from attributecode import INFO
 from attributecode import WARNING
 from attributecode import api
 from attributecode import Error
-from attributecode import saneyaml
 from attributecode import util
 from attributecode.util import add_unc
 from attributecode.util import boolean_fields
 from attributecode.util import copy_license_notice_files
-from attributecode.util import copy_file
+from attributecode.util import copy_files
+from attributecode.util import DEFAULT_COPY_THREADS
+from attributecode.util import DEFAULT_ZIP_COMPRESSION
+from attributecode.util import get_copy_tasks
 from attributecode.util import csv
 from attributecode.util import file_fields
 from attributecode.util import filter_errors
@@ -933,10 +933,12 @@ class About(object):
         return errors
 
     def process(self, fields, about_file_path, running_inventory=False,
-                base_dir=None, reference_dir=None):
+                base_dir=None, reference_dir=None, copy_reference_files=True):
         """
         Validate and set as attributes on this About object a sequence of
         `fields` name/value tuples. Return a list of errors.
+        If `copy_reference_files` is True, copy the license and notice files
+        found in the `reference_dir` to the `base_dir`.
         """
         self.base_dir = base_dir
         self.reference_dir = reference_dir
@@ -944,7 +946,7 @@ class About(object):
 
         errors = self.hydrate(fields)
         # We want to copy the license_files before the validation
-        if reference_dir:
+        if reference_dir and copy_reference_files:
             copy_err = copy_license_notice_files(
                 fields, base_dir, reference_dir, afp)
             errors.extend(copy_err)
@@ -1004,7 +1006,8 @@ class About(object):
 
     # FIXME: should be a from_dict class factory instead
     # FIXME: running_inventory: remove this : this should be done in the commands, not here
-    def load_dict(self, fields_dict, base_dir, running_inventory=False, reference_dir=None,):
+    def load_dict(self, fields_dict, base_dir, running_inventory=False, reference_dir=None,
+                  copy_reference_files=True):
         """
         Load this About object file from a `fields_dict` name/value dict.
         Return a list of errors.
@@ -1038,6 +1041,7 @@ class About(object):
             running_inventory=running_inventory,
             base_dir=base_dir,
             reference_dir=reference_dir,
+            copy_reference_files=copy_reference_files,
         )
         self.errors = errors
         return errors
@@ -1334,28 +1338,139 @@ def get_field_names(abouts):
     return fields
 
 
-def copy_redist_src(copy_list, location, output, with_structure):
+def get_redist_output_dir(from_path, location, output, with_structure):
     """
-    Given a list of files/directories and copy to the destination
+    Return the directory in `output` where to copy a `from_path` file or
+    directory of `location`, with its parent directories relative to
+    `location` if `with_structure` is True.
+    """
+    if not with_structure:
+        return output
+    norm_from_path = norm(from_path)
+    relative_from_path = norm_from_path.partition(util.norm(location))[2]
+    # Need to strip the '/' to use the join
+    if relative_from_path.startswith('/'):
+        relative_from_path = relative_from_path.partition('/')[2]
+    # Get the directory name of the output path
+    return os.path.dirname(os.path.join(output, util.norm(relative_from_path)))
+
+
+def copy_redist_src(copy_list, location, output, with_structure,
+                    threads=DEFAULT_COPY_THREADS, link_mode='copy', manifest=None):
+    """
+    Given a list of files/directories and copy to the destination. The files
+    are copied concurrently using up to `threads` threads and the files that
+    are already identical at the destination are skipped. With a "hardlink"
+    or "symlink" `link_mode` the directories are created and the files are
+    linked to their source instead of copied.
+
+    Write an optional `manifest` CSV or JSON file with the checksums of the
+    copied files keyed by their path relative to `output`.
     """
     errors = []
+    copy_tasks = []
     for from_path in copy_list:
-        norm_from_path = norm(from_path)
-        relative_from_path = norm_from_path.partition(util.norm(location))[2]
-        # Need to strip the '/' to use the join
-        if relative_from_path.startswith('/'):
-            relative_from_path = relative_from_path.partition('/')[2]
-        # Get the directory name of the output path
-        if with_structure:
-            output_dir = os.path.dirname(os.path.join(output, util.norm(relative_from_path)))
-        else:
-            output_dir = output
-        err = copy_file(from_path, output_dir)
+        output_dir = get_redist_output_dir(from_path, location, output, with_structure)
+        tasks, err = get_copy_tasks(from_path, output_dir, link_mode)
         if err:
-            errors.extend(err)
+            errors.append(err)
+        copy_tasks.extend(tasks)
+
+    checksums = {} if manifest else None
+    errors.extend(copy_files(copy_tasks, threads, link_mode, checksums))
+    if manifest:
+        checksums = {
+            util.to_posix(os.path.relpath(target, output)): file_checksums
+            for target, file_checksums in checksums.items()
+        }
+        util.write_manifest(manifest, checksums)
     return errors
 
 
+def archive_redist_src(copy_list, location, output, with_structure,
+                       compression=DEFAULT_ZIP_COMPRESSION, compresslevel=None,
+                       manifest=None, threads=DEFAULT_COPY_THREADS):
+    """
+    Given a list of files/directories, write them in the `output` zip or tar
+    archive directly, without copying them first. Use the `compression`
+    method and optional `compresslevel` compression level of the archive.
+
+    Write an optional `manifest` CSV or JSON file with the checksums of the
+    archived files keyed by their archive path. These are computed using up
+    to `threads` threads while the archive is written.
+    Return a list of Error objects.
+    """
+    errors = []
+    members = {}
+    for from_path in copy_list:
+        from_path = from_path.strip()
+        # Errors will be captured when doing the validation
+        if not os.path.exists(from_path):
+            continue
+        output_dir = get_redist_output_dir(from_path, location, '', with_structure)
+        copy_paths = util.iter_copy_paths(from_path, output_dir)
+        for index, (source, name, _is_dir) in enumerate(copy_paths):
+            name = util.to_posix(name)
+            if not index and members.get(name, source) != source:
+                msg = name + ' is already existed and is replaced by ' + source
+                errors.append(Error(WARNING, msg))
+            # the last source of an archive name wins as if copied in sequence
+            members.pop(name, None)
+            members[name] = source
+
+    members = [(source, name) for name, source in members.items()]
+    if not manifest:
+        errors.extend(util.write_archive(output, members, compression, compresslevel))
+        return errors
+
+    files = [(source, name) for source, name in members if os.path.isfile(source)]
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future_checksums = executor.submit(
+            util.get_files_checksums, [source for source, _name in files], threads)
+        errors.extend(util.write_archive(output, members, compression, compresslevel))
+        files_checksums = future_checksums.result()
+
+    checksums = {}
+    for (_source, name), file_checksums in zip(files, files_checksums):
+        if file_checksums:
+            checksums[name] = file_checksums
+    util.write_manifest(manifest, checksums)
+    return errors
+
+
+def add_copy_path(trie, segments, is_dir):
+    """
+    Add a path to be copied as a list of path `segments` to a `trie` of
+    nested dictionaries of path segments. A copied path is a leaf with an
+    `is_dir` boolean value. A path in an already copied directory is ignored
+    and the paths in a copied directory are removed.
+    """
+    node = trie
+    for segment in segments[:-1]:
+        node = node.setdefault(segment, {})
+        if not isinstance(node, dict):
+            # a parent directory is already copied
+            return
+    last = segments[-1]
+    if not isinstance(node.get(last), bool):
+        # replace the paths in this directory if any
+        node[last] = is_dir
+
+
+def iter_copy_paths(trie, parents=()):
+    """
+    Yield a tuple of (tuple of path segments, is_dir) for each copied path of
+    a `trie` of path segments in the order they were added.
+    """
+    for segment, node in trie.items():
+        segments = parents + (segment,)
+        if isinstance(node, dict):
+            for copy_path in iter_copy_paths(node, segments):
+                yield copy_path
+        else:
+            yield segments, node
+
+
 def get_copy_list(abouts, location):
     """
     Return a list of files/directories that need to be copied (and error if any)
@@ -1368,11 +1483,17 @@ def get_copy_list(abouts, location):
     it will prompt warning as the directory that need to be copied is already exist.
     Technically, this is correct, but it leads to confusion. Therefore, we want to
     create a summarized list to avoid this kind of confusion.
+
+    The paths are summarized in a trie of path segments in linear time.
+    The files at the root of `location` are listed first, then the directories
+    and then the other files.
     """
     errors = []
     copy_list = []
-    dir_list = []
-    file_list = []
+    copy_paths = {}
+    location_copied = False
+    seen = set()
+    norm_location = util.norm(location)
     for about in abouts:
         if about.redistribute.value:
             file_exist = True
@@ -1381,64 +1502,42 @@ def get_copy_list(abouts, location):
                     msg = e.message + u' and cannot be copied.'
                     errors.append(Error(CRITICAL, msg))
                     file_exist = False
-                    continue
             if file_exist:
-                for k in about.about_resource.value:
-                    from_path = about.about_resource.value.get(k)
-                    if on_windows:
-                        norm_from_path = norm(from_path)
-                    else:
-                        norm_from_path = os.path.normpath(from_path)
-                    # Get the relative path
-                    relative_from_path = norm_from_path.partition(util.norm(location))[2]
-                    if os.path.isdir(from_path):
-                        if not dir_list:
-                            dir_list.append(relative_from_path)
-                        else:
-                            handled = False
-                            for dir in dir_list:
-                                # The dir is a parent of the relative_from_path
-                                if dir in relative_from_path:
-                                    handled = True
-                                    continue
-                                # The relative_from_path is the parent of the dir
-                                # We need to update the dir_list
-                                if relative_from_path in dir:
-                                    dir_list.remove(dir)
-                                    dir_list.append(relative_from_path)
-                                    handled = True
-                                    continue
-                            if not handled:
-                                dir_list.append(relative_from_path)
-                    else:
-                        # Check if the file is from "root"
+                for from_path in about.about_resource.value.values():
+                    if from_path in seen:
+                        continue
+                    seen.add(from_path)
+                    # Get the relative path segments
+                    relative_from_path = norm(from_path).partition(norm_location)[2]
+                    segments = [s for s in relative_from_path.split('/') if s]
+                    is_dir = os.path.isdir(from_path)
+                    if not segments:
+                        # the whole location is copied
+                        location_copied = location_copied or is_dir
+                        continue
+                    if not is_dir and len(segments) == 1:
                         # If the file is at root level, it'll add to the copy_list
-                        if not os.path.dirname(relative_from_path) == '/':
-                            file_list.append(relative_from_path)
-                        else:
-                            copy_list.append(from_path)
+                        copy_list.append(from_path)
+                    else:
+                        add_copy_path(copy_paths, segments, is_dir)
 
-    for dir in dir_list:
-        for f in file_list:
-            # The file is already in one of copied directories
-            if dir in f:
-                file_list.remove(f)
-                continue
-        if dir.startswith('/'):
-            dir = dir.partition('/')[2]
-        absolute_path = os.path.join(location, dir)
-        if on_windows:
-            absolute_path = add_unc(absolute_path)
-        copy_list.append(absolute_path)
+    if location_copied:
+        copy_paths = {}
+        copy_list = [add_unc(location) if on_windows else location]
 
-    for f in file_list:
-        if f.startswith('/'):
-            f = f.partition('/')[2]
-        absolute_path = os.path.join(location, f)
+    dirs = []
+    files = []
+    for segments, is_dir in iter_copy_paths(copy_paths):
+        absolute_path = os.path.join(location, *segments)
         if on_windows:
             absolute_path = add_unc(absolute_path)
-        copy_list.append(absolute_path)
+        if is_dir:
+            dirs.append(absolute_path)
+        else:
+            files.append(absolute_path)
 
+    copy_list.extend(dirs)
+    copy_list.extend(files)
     return copy_list, errors
 
 
@@ -1520,30 +1619,15 @@ def save_as_csv(location, about_dicts, field_names):
     return errors
 
 
-def pre_process_and_fetch_license_dict(abouts, api_url, api_key):
+def collect_license_keys(abouts):
     """
-    Modify a list of About data dictionaries by adding license information
-    fetched from the DejaCode API.
+    Return a tuple of (list of unique license keys, list of errors) for the
+    license keys of the license expressions of an `abouts` list of About
+    objects.
     """
-    dje_uri = urlparse(api_url)
-    domain = '{uri.scheme}://{uri.netloc}/'.format(uri=dje_uri)
-    dje_lic_urn = urljoin(domain, 'urn/?urn=urn:dje:license:')
-    key_text_dict = {}
-    captured_license = []
+    lic_keys = []
     errors = []
-    if util.have_network_connection():
-        if not valid_api_url(api_url):
-            msg = u"URL not reachable. Invalid '--api_url'. License generation is skipped."
-            errors.append(Error(ERROR, msg))
-    else:
-        msg = u'Network problem. Please check your Internet connection. License generation is skipped.'
-        errors.append(Error(ERROR, msg))
     for about in abouts:
-        # No need to go through all the about objects for license extraction if we detected
-        # invalid '--api_key'
-        auth_error = Error(ERROR, u"Authorization denied. Invalid '--api_key'. License generation is skipped.")
-        if auth_error in errors:
-            break
         if about.license_expression.present:
             special_char_in_expression, lic_list = parse_license_expression(about.license_expression.value)
             if special_char_in_expression:
@@ -1551,23 +1635,99 @@ def pre_process_and_fetch_license_dict(abouts, api_url, api_key):
                        str(special_char_in_expression))
                 errors.append(Error(ERROR, msg))
             else:
-                for lic_key in lic_list:
-                    if not lic_key in captured_license:
-                        detail_list = []
-                        license_name, license_key, license_text, errs = api.get_license_details_from_api(api_url, api_key, lic_key)
-                        for e in errs:
-                            if e not in errors:
-                                errors.append(e)
-                        if license_key:
-                            captured_license.append(lic_key)
-                            dje_lic_url = dje_lic_urn + license_key
-                            detail_list.append(license_name)
-                            detail_list.append(license_text)
-                            detail_list.append(dje_lic_url)
-                            key_text_dict[license_key] = detail_list
+                lic_keys.extend(lic_list)
+    return unique(lic_keys), errors
+
+
+def pre_process_and_fetch_license_dict(abouts, api_url, api_key, max_workers=api.DEFAULT_MAX_WORKERS,
+                                       cache=None, offline=False):
+    """
+    Modify a list of About data dictionaries by adding license information
+    fetched from the DejaCode API using up to `max_workers` concurrent requests.
+
+    Use the optional `cache` LicenseCache to avoid refetching license data. If
+    `offline` is True, only use the license data available in the `cache`.
+    """
+    key_text_dict = {}
+
+    # Collect all the unique license keys first to fetch them all at once
+    lic_keys, errors = collect_license_keys(abouts)
+
+    licenses_data, errs = api.fetch_licenses_data(
+        api_url, api_key, lic_keys, max_workers, cache=cache, offline=offline)
+    for e in errs:
+        if e not in errors:
+            errors.append(e)
+
+    for lic_key in lic_keys:
+        license_data = licenses_data.get(lic_key)
+        if not license_data:
+            continue
+        license_key = license_data.get('key', '')
+        if license_key:
+            dje_lic_url = api.get_license_url(api_url, license_key)
+            license_name = license_data.get('name', '')
+            license_text = license_data.get('full_text', '')
+            key_text_dict[license_key] = [license_name, license_text, dje_lic_url]
+    return key_text_dict, errors
+
+
+def get_license_dict_from_bundle(abouts, bundle):
+    """
+    Return a tuple of (license dictionary, list of errors) for the license keys
+    of an `abouts` list of About objects looked up in the `bundle`
+    LicenseBundle. The license dictionary has the same format as the one
+    returned by pre_process_and_fetch_license_dict().
+    """
+    key_text_dict = {}
+    lic_keys, errors = collect_license_keys(abouts)
+    for lic_key in lic_keys:
+        license_details = bundle.get(lic_key)
+        if license_details:
+            key_text_dict[lic_key] = license_details
+        else:
+            msg = u'License not found in the license bundle: %(lic_key)s' % locals()
+            errors.append(Error(ERROR, msg))
     return key_text_dict, errors
 
 
+def add_licenses_from_bundle(abouts, bundle):
+    """
+    Update an `abouts` list of About objects that have a license expression
+    but no license file with the license names, texts and URLs looked up in
+    the `bundle` LicenseBundle. Return a list of errors.
+    """
+    errors = []
+    for about in abouts:
+        if not about.license_expression.value or about.license_file.value:
+            continue
+        special_char_in_expression, lic_list = parse_license_expression(about.license_expression.value)
+        if special_char_in_expression:
+            continue
+
+        missing = [k for k in lic_list if k not in bundle]
+        if missing:
+            for lic_key in missing:
+                msg = u'License not found in the license bundle: %(lic_key)s' % locals()
+                errors.append(Error(ERROR, msg))
+            continue
+
+        about.license_key.value = list(lic_list)
+        about.license_name.value = []
+        about.license_url.value = []
+        about.license_file.value = dict()
+        for lic_key in lic_list:
+            lic_name, lic_text, lic_url = bundle.get(lic_key)
+            about.license_name.value.append(lic_name)
+            about.license_file.value[lic_key + u'.LICENSE'] = lic_text
+            if lic_url:
+                about.license_url.value.append(lic_url)
+        for field in (about.license_key, about.license_name, about.license_file, about.license_url):
+            if field.value:
+                field.present = True
+    return unique(errors)
+
+
 def parse_license_expression(lic_expression):
     licensing = Licensing()
     lic_list = []
@@ -1587,20 +1747,3 @@ def detect_special_char(expression):
         if char in expression:
             special_character.append(char)
     return special_character
-
-
-def valid_api_url(api_url):
-    try:
-        request = Request(api_url)
-        # This will always goes to exception as no key are provided.
-        # The purpose of this code is to validate the provided api_url is correct
-        urlopen(request)
-    except HTTPError as http_e:
-        # The 403 error code is refer to "Authentication credentials were not provided.".
-        # This is correct as no key are provided.
-        if http_e.code == 403:
-            return True
-    except:
-        # All other exceptions yield to invalid api_url
-        pass
-    return False
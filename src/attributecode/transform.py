@@ -15,23 +15,31 @@
 
 import io
 import json
+import os
+import shutil
 from collections import Counter
-from itertools import zip_longest
+from concurrent.futures import ProcessPoolExecutor
 
 import attr
+import saneyaml
 
 from attributecode import CRITICAL
 from attributecode import Error
-from attributecode import saneyaml
 from attributecode.util import csv
+from attributecode.util import iter_json_entries
 from attributecode.util import replace_tab_with_spaces
 
 
-def transform_csv_to_csv(location, output, transformer):
+def transform_csv_to_csv(location, output, transformer, processes=1):
     """
     Read a CSV file at `location` and write a new CSV file at `output`. Apply
     transformations using the `transformer` Transformer.
     Return a list of Error objects.
+
+    The rows are read, transformed and written one at a time. The `output`
+    file is only created or replaced if there are no errors. If `processes`
+    is more than one, the rows are split in as many chunks transformed in
+    parallel in separate processes.
     """
     if not transformer:
         raise ValueError('Cannot transform without Transformer')
@@ -39,8 +47,7 @@ def transform_csv_to_csv(location, output, transformer):
     rows = read_csv_rows(location)
 
     errors = []
-    data = iter(rows)
-    names = next(rows)
+    names = next(rows, [])
     field_names = strip_trailing_fields_csv(names)
     dupes = check_duplicate_fields(field_names)
 
@@ -48,18 +55,157 @@ def transform_csv_to_csv(location, output, transformer):
         msg = u'Duplicated field name: %(name)s'
         for name in dupes:
             errors.append(Error(CRITICAL, msg % locals()))
-        return field_names, [], errors
+        return errors
 
-    # Convert to dicts
-    new_data = [dict(zip_longest(field_names, item)) for item in data]
+    # the transformations are compiled once for the header and applied to
+    # each row as a list of values
+    projection = transformer.get_projection(field_names)
+    new_field_names = [name for name, _index in projection]
 
-    field_names, updated_data, errors = transform_data(new_data, transformer)
+    chunks = get_csv_chunks(location, processes) if processes > 1 else []
+    if len(chunks) > 1:
+        rows.close()
+        return write_output(
+            output, errors, write_csv_chunks, chunks, location, transformer, projection, errors)
 
-    if errors:
-        return errors
-    else:
-        write_csv(output, updated_data, field_names)
-        return []
+    updated_data = transform_csv_rows(rows, projection)
+    updated_data = transformer.iter_checked_rows(updated_data, errors, new_field_names)
+    return write_output(output, errors, write_csv_rows, updated_data, new_field_names)
+
+
+def get_csv_chunks(location, count):
+    """
+    Return a list of up to `count` (start, end, first row number) tuples for
+    the byte ranges of about the same size of the data rows of the CSV file at
+    `location`. The first row number is the index of the first row of a range
+    among all the data rows, after the header row.
+
+    The ranges start and end on the record boundaries found by parsing the
+    file with a CSV reader, as a quote does not always start a quoted value.
+    Return an empty list if the file cannot be split this way such that it is
+    processed in a single process.
+    """
+    size = os.path.getsize(location)
+    targets = [size * i // count for i in range(1, count)]
+    offset = 0
+
+    def iter_lines(csvfile):
+        # track the byte offset of the lines read by the CSV reader: a row
+        # ends at the end of the last line it was read from
+        nonlocal offset
+        for line in csvfile:
+            offset += len(line)
+            yield line.decode('utf-8', errors='replace')
+
+    with open(location, 'rb') as csvfile:
+        reader = csv.reader(iter_lines(csvfile))
+        try:
+            # the data rows start after the header row
+            next(reader, None)
+            # list of (start offset, count of rows before this offset)
+            starts = [(offset, 0)]
+            rows = 0
+            for _row in reader:
+                rows += 1
+                if targets and offset >= targets[0]:
+                    starts.append((offset, rows))
+                    while targets and targets[0] <= offset:
+                        targets.pop(0)
+        except csv.Error:
+            return []
+
+    starts = [(start, first_row) for start, first_row in starts if start < size]
+    ends = [start for start, _first_row in starts[1:]] + [size]
+    return [(start, end, first_row) for (start, first_row), end in zip(starts, ends)]
+
+
+class FileRange(io.RawIOBase):
+    """
+    A readable binary file-like object for the `start` to `end` byte range of
+    the file at `location`.
+    """
+
+    def __init__(self, location, start, end):
+        self.file = open(location, 'rb')
+        self.file.seek(start)
+        self.remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.remaining)
+        if size <= 0:
+            return 0
+        read = self.file.readinto(memoryview(buffer)[:size])
+        self.remaining -= read
+        return read
+
+    def close(self):
+        self.file.close()
+        super(FileRange, self).close()
+
+
+def read_csv_chunk_rows(location, start, end):
+    """
+    Yield rows (as a list of values) from the `start` to `end` byte range of
+    a CSV file at `location`.
+    """
+    file_range = io.BufferedReader(FileRange(location, start, end), 1024 * 1024)
+    with io.TextIOWrapper(file_range, encoding='utf-8', errors='replace') as csvfile:
+        reader = csv.reader(csvfile)
+        for row in reader:
+            yield row
+
+
+def transform_csv_chunk(location, start, end, first_row, transformer, projection, output):
+    """
+    Transform the rows of the `start` to `end` byte range of a CSV file at
+    `location` using the `transformer` Transformer and a `projection` list of
+    (field name, index) tuples and write them without header in a new CSV file
+    at `output`. The rows are numbered from `first_row` in errors.
+    Return a list of Error objects.
+    """
+    errors = []
+    field_names = [name for name, _index in projection]
+    rows = read_csv_chunk_rows(location, start, end)
+    updated_data = transform_csv_rows(rows, projection)
+    updated_data = transformer.iter_checked_rows(
+        updated_data, errors, field_names, first_row=first_row)
+    write_csv_rows(output, updated_data)
+    return errors
+
+
+def write_csv_chunks(location, chunks, input_location, transformer, projection, errors):
+    """
+    Write a CSV file at `location` with the rows of the `chunks` list of
+    (start, end, first row number) byte ranges of a CSV file at
+    `input_location` transformed in parallel, one process for each chunk,
+    using the `transformer` Transformer and a `projection` list of
+    (field name, index) tuples. The transformed chunks are concatenated in
+    order. Extend the `errors` list with errors of each chunk.
+    """
+    chunk_outputs = ['%s.%d' % (location, index) for index in range(len(chunks))]
+    try:
+        with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            futures = [
+                executor.submit(
+                    transform_csv_chunk, input_location, start, end, first_row,
+                    transformer, projection, chunk_output)
+                for (start, end, first_row), chunk_output in zip(chunks, chunk_outputs)
+            ]
+            for future in futures:
+                errors.extend(future.result())
+
+        write_csv_rows(location, [], [name for name, _index in projection])
+        with open(location, 'ab') as csvfile:
+            for chunk_output in chunk_outputs:
+                with open(chunk_output, 'rb') as chunk:
+                    shutil.copyfileobj(chunk, csvfile)
+    finally:
+        for chunk_output in chunk_outputs:
+            if os.path.exists(chunk_output):
+                os.remove(chunk_output)
 
 
 def transform_json_to_json(location, output, transformer):
@@ -67,21 +213,38 @@ def transform_json_to_json(location, output, transformer):
     Read a JSON file at `location` and write a new JSON file at `output`. Apply
     transformations using the `transformer` Transformer.
     Return a list of Error objects.
+
+    The entries are transformed and written one at a time. The `output` file
+    is only created or replaced if there are no errors.
     """
     if not transformer:
         raise ValueError('Cannot transform without Transformer')
 
-    items = read_json(location)
-    data = normalize_dict_data(items)
-    new_data = strip_trailing_fields_json(data)
+    data = iter_json_entries(location, is_scancode_files)
+    new_data = iter_stripped_fields_json(data)
 
-    _field_names, updated_data, errors = transform_data(new_data, transformer)
+    errors = []
+    updated_data = transform_rows(new_data, transformer, errors)
+    return write_output(output, errors, write_json, updated_data)
 
-    if errors:
-        return errors
-    else:
-        write_json(output, updated_data)
-        return []
+
+def write_output(output, errors, writer, data, *args):
+    """
+    Write the `data` iterable to the `output` file using the `writer`
+    function called with the output location, `data` and extra `args`. The
+    `errors` list is updated as `data` is consumed: the `output` file is only
+    created or replaced if there are no errors.
+    Return the `errors` list.
+    """
+    temp_location = '%s.%d.tmp' % (output, os.getpid())
+    try:
+        writer(temp_location, data, *args)
+        if not errors:
+            os.replace(temp_location, output)
+    finally:
+        if os.path.exists(temp_location):
+            os.remove(temp_location)
+    return errors
 
 
 def strip_trailing_fields_csv(names):
@@ -98,14 +261,20 @@ def strip_trailing_fields_json(items):
     """
     Strip trailing spaces for field name #456
     """
-    data = []
+    return list(iter_stripped_fields_json(items))
+
+
+def iter_stripped_fields_json(items):
+    """
+    Yield dicts from an `items` iterable of dicts with the trailing spaces of
+    their field names stripped.
+    """
     for item in items:
         od = {}
         for field in item:
             stripped_field_name = field.strip()
             od[stripped_field_name] = item[field]
-        data.append(od)
-    return data
+        yield od
 
 
 def normalize_dict_data(data):
@@ -126,6 +295,18 @@ def normalize_dict_data(data):
     return new_data
 
 
+def is_scancode_files(name, members):
+    """
+    Return True if the `name` top-level array of a JSON file is the list of
+    files of a scancode-toolkit JSON output given the dict of top-level
+    `members` that precede it.
+    """
+    try:
+        return name == 'files' and members['headers'][0]['tool_name'] == 'scancode-toolkit'
+    except (KeyError, IndexError, TypeError):
+        return False
+
+
 def transform_data(data, transformer):
     """
     Read a dictionary and apply transformations using the
@@ -136,24 +317,69 @@ def transform_data(data, transformer):
     if not transformer:
         return data
 
-    renamed_field_data = transformer.apply_renamings(data)
+    field_names = list(data[0].keys()) if data else []
+    field_names = get_transformed_field_names(field_names, transformer)
 
-    field_names = renamed_field_data[0].keys()
-
-    if transformer.field_filters:
-        renamed_field_data = list(transformer.filter_fields(renamed_field_data))
-        field_names = [c for c in field_names if c in transformer.field_filters]
-
-    if transformer.exclude_fields:
-        renamed_field_data = list(transformer.filter_excluded(renamed_field_data))
-        field_names = [c for c in field_names if c not in transformer.exclude_fields]
-
-    errors = transformer.check_required_fields(renamed_field_data)
+    errors = []
+    renamed_field_data = list(transform_rows(data, transformer, errors))
     if errors:
         return field_names, data, errors
     return field_names, renamed_field_data, errors
 
 
+def get_transformed_field_names(field_names, transformer):
+    """
+    Return a list of field names transformed from a `field_names` list using
+    the `transformer` Transformer renamings and filters.
+    """
+    return [name for name, _index in transformer.get_projection(field_names)]
+
+
+def transform_rows(data, transformer, errors):
+    """
+    Yield transformed dicts from a `data` iterable of dicts using the
+    `transformer` Transformer. Append an Error to the `errors` list for each
+    row missing a value for a required field as the rows are transformed.
+    """
+    return transformer.iter_checked_rows(transform_dict_rows(data, transformer), errors)
+
+
+def transform_dict_rows(data, transformer):
+    """
+    Yield transformed dicts from a `data` iterable of dicts using the
+    `transformer` Transformer. The transformations are compiled once for
+    each distinct sequence of field names.
+    """
+    projections = {}
+    for item in data:
+        field_names = tuple(item)
+        projection = projections.get(field_names)
+        if projection is None:
+            projection = projections[field_names] = transformer.get_projection(field_names)
+        values = list(item.values())
+        yield {name: values[index] for name, index in projection}
+
+
+def transform_csv_rows(rows, projection):
+    """
+    Yield transformed lists of values from a `rows` iterable of lists of
+    values using a `projection` list of (field name, index) tuples.
+    """
+    indexes = [index for _name, index in projection]
+    size = len(indexes)
+    if indexes == list(range(size)):
+        # only renamings: the values are unchanged
+        for row in rows:
+            if len(row) != size:
+                row = (row + [None] * size)[:size]
+            yield row
+        return
+
+    for row in rows:
+        row_size = len(row)
+        yield [row[index] if index < row_size else None for index in indexes]
+
+
 tranformer_config_help = '''
 A transform configuration file is used to describe which transformations and
 validations to apply to a source CSV file. This is a simple text file using YAML
@@ -270,75 +496,64 @@ class Transformer(object):
         dict is missing a value for a required field name.
         """
         errors = []
-        required = set(self.essential_fields + self.required_fields)
-        if not required:
-            return []
-
-        for rn, item in enumerate(data):
-            missings = [rk for rk in required if not item.get(rk)]
-            if not missings:
-                continue
-
-            missings = ', '.join(missings)
-            msg = 'Row {rn} is missing required values for fields: {missings}'
-            errors.append(Error(CRITICAL, msg.format(**locals())))
+        for _item in self.iter_checked_rows(data, errors):
+            pass
         return errors
 
-    def apply_renamings(self, data):
+    def iter_checked_rows(self, data, errors, field_names=None, first_row=0):
         """
-        Return a tranformed list of `field_names` where fields are renamed
-        based on this Transformer configuration.
+        Yield each dict of a `data` iterable of dicts and append an Error to
+        the `errors` list for each dict missing a value for a required field
+        name. If `field_names` is provided, each item of `data` is instead a
+        list of values for these field names. Rows are numbered from
+        `first_row`.
         """
-        renamings = self.field_renamings
-        if not renamings:
-            return data
-        renamings = {n: rn for n, rn in renamings.items()}
-
-        renamed_list = []
-        for row in data:
-            renamed = {}
-            for key in row:
-                matched = False
-                for renamed_key in renamings:
-                    if key == renamings[renamed_key]:
-                        renamed[renamed_key] = row[key]
-                        matched = True
-                if not matched:
-                    renamed[key] = row[key]
-            renamed_list.append(renamed)
-        return renamed_list
-
-    """
-    def clean_fields(self, field_names):
-
-        Apply standard cleanups to a list of fields and return these.
-
-        if not field_names:
-            return field_names
-        return [c.strip().lower() for c in field_names]
-    """
-
-    def filter_fields(self, data):
+        required = set(self.essential_fields + self.required_fields)
+        if not required:
+            for item in data:
+                yield item
+            return
+
+        if field_names is not None:
+            # check the values by position
+            positions = {name: index for index, name in enumerate(field_names)}
+            required = [(rk, positions.get(rk)) for rk in required]
+
+        for rn, item in enumerate(data, first_row):
+            if field_names is None:
+                missings = [rk for rk in required if not item.get(rk)]
+            else:
+                missings = [rk for rk, index in required if index is None or not item[index]]
+            if missings:
+                missings = ', '.join(missings)
+                msg = 'Row {rn} is missing required values for fields: {missings}'
+                errors.append(Error(CRITICAL, msg.format(**locals())))
+            yield item
+
+    def get_projection(self, field_names):
         """
-        Yield transformed dicts from a `data` list of dicts keeping only
-        fields with a name in the `field_filters`of this Transformer.
-        Return the data unchanged if no `field_filters` exists.
+        Return a list of (transformed field name, index) tuples for a
+        `field_names` sequence of input field names, where index is the
+        position in `field_names` of the value of a transformed field. The
+        renamings, field filters and excluded fields of this Transformer are
+        compiled in this single mapping.
         """
-        # field_filters = set(self.clean_fields(self.field_filters))
-        field_filters = set(self.field_filters)
-        for entry in data:
-            yield {k: v for k, v in entry.items() if k in field_filters}
+        renamed_by_name = {}
+        for renamed_key, key in self.field_renamings.items():
+            renamed_by_name.setdefault(key, []).append(renamed_key)
 
-    def filter_excluded(self, data):
-        """
-        Yield transformed dicts from a `data` list of dicts excluding
-        fields with names in the `exclude_fields`of this Transformer.
-        Return the data unchanged if no `exclude_fields` exists.
-        """
-        # exclude_fields = set(self.clean_fields(self.exclude_fields))
+        # a later field renamed to the same name replaces the earlier value
+        projection = {}
+        for index, key in enumerate(field_names):
+            for name in renamed_by_name.get(key, [key]):
+                projection[name] = index
+
+        field_filters = set(self.field_filters)
         exclude_fields = set(self.exclude_fields)
-        for entry in data:
-            yield {k: v for k, v in entry.items() if k not in exclude_fields}
+        return [
+            (name, index) for name, index in projection.items()
+            if (not field_filters or name in field_filters) and name not in exclude_fields
+        ]
 
 
 def check_duplicate_fields(field_names):
@@ -368,20 +583,32 @@ def read_json(location):
         return json.load(jsonfile)
 
 
-def write_csv(location, data, field_names):  # NOQA
+def write_csv_rows(location, rows, field_names=None):
     """
-    Write a CSV file at `location` the `data` list of ordered dicts using the
-    `field_names`.
+    Write a CSV file at `location` the `rows` iterable of lists of values for
+    the `field_names`. The header row is only written if `field_names` is
+    provided.
     """
     with io.open(location, 'w', encoding='utf-8', newline='\n') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=field_names)
-        writer.writeheader()
-        writer.writerows(data)
+        writer = csv.writer(csvfile)
+        if field_names is not None:
+            writer.writerow(field_names)
+        writer.writerows(rows)
 
 
 def write_json(location, data):
     """
-    Write a JSON file at `location` the `data` list of ordered dicts.
+    Write a JSON file at `location` the `data` iterable of ordered dicts one
+    at a time, formatted as a list.
     """
     with open(location, 'w') as jsonfile:
-        json.dump(data, jsonfile, indent=3)
+        separator = '[\n'
+        for item in data:
+            jsonfile.write(separator)
+            item = json.dumps(item, indent=3)
+            jsonfile.write('\n'.join('   ' + line for line in item.splitlines()))
+            separator = ',\n'
+        if separator == '[\n':
+            jsonfile.write('[]')
+        else:
+            jsonfile.write('\n]')
@@ -15,6 +15,9 @@
 
 import codecs
 import csv
+import functools
+import hashlib
+import io
 import json
 import ntpath
 import os
@@ -23,7 +26,9 @@ import re
 import shutil
 import string
 import sys
-from distutils.dir_util import copy_tree
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from itertools import zip_longest
 
 from attributecode import CRITICAL
@@ -36,6 +41,12 @@ on_windows = 'win32' in sys.platform
 boolean_fields = ['redistribute', 'attribute', 'track_change', 'modified', 'internal_use_only']
 file_fields = ['about_resource', 'notice_file', 'changelog_file', 'author_file']
 
+# default number of threads used to copy files
+DEFAULT_COPY_THREADS = 8
+
+# ways to copy a file: copy its content or create a hard or symbolic link
+LINK_MODES = ('copy', 'hardlink', 'symlink')
+
 
 def to_posix(path):
     """
@@ -274,39 +285,217 @@ def load_json(location):
     Read JSON file at `location` and return a list of ordered dicts, one for
     each entry.
     """
-    with open(location) as json_file:
-        results = json.load(json_file)
+    return list(iter_json(location))
+
+
+def iter_json(location):
+    """
+    Yield an ordered dict for each entry of the JSON file at `location`, one
+    at a time, reading the file incrementally.
+    """
+    return iter_json_entries(location, is_inventory_entries)
+
 
+def is_inventory_entries(name, members):
+    """
+    Return True if the `name` top-level array of a JSON inventory is the list
+    of entries given the dict of top-level `members` that precede it.
+    """
     # FIXME: this is too clever and complex... IMHO we should not try to guess the format.
     # instead a command line option should be provided explictly to say what is the format
-    if isinstance(results, list):
-        results = sorted(results)
-    else:
-        if u'aboutcode_manager_notice' in results:
-            results = results['components']
-        elif u'scancode_notice' in results:
-            results = results['files']
+    if name == u'components':
+        return u'aboutcode_manager_notice' in members
+    if name == u'files':
+        return u'scancode_notice' in members
+    return False
+
+
+def iter_json_entries(location, is_entries=None, chunk_size=1024 * 1024):
+    """
+    Yield the entries of the JSON file at `location` one at a time, reading
+    the file incrementally in `chunk_size` characters.
+
+    The entries are the items of a top-level array. For a top-level object,
+    these are the items of the first top-level array member for which the
+    `is_entries(name, members)` callable returns True given the member name
+    and the dict of the top-level members decoded so far; the whole object is
+    the single entry if there is no such member. Entries that precede the
+    members that tell `is_entries` about the format are only yielded once the
+    whole object is decoded.
+    """
+    with io.open(location, encoding='utf-8-sig', errors='replace') as json_file:
+        reader = JsonReader(json_file, chunk_size)
+        start = reader.peek()
+        if start == '[':
+            for entry in reader.iter_array():
+                yield entry
+        elif start == '{':
+            members = {}
+            streamed = False
+            for name in reader.iter_object_names():
+                if (not streamed and is_entries and reader.peek() == '['
+                        and is_entries(name, members)):
+                    streamed = True
+                    for entry in reader.iter_array():
+                        yield entry
+                else:
+                    members[name] = reader.decode_value()
+            if not streamed:
+                # the member that tells the format may follow the entries
+                entries = [members]
+                for name, value in members.items():
+                    if isinstance(value, list) and is_entries and is_entries(name, members):
+                        entries = value
+                        break
+                for entry in entries:
+                    yield entry
         else:
-            results = [results]
-    return results
+            yield reader.decode_value()
+        reader.check_end()
 
 
-# FIXME: rename to is_online: BUT do we really need this at all????
-def have_network_connection():
+class JsonReader(object):
     """
-    Return True if an HTTP connection to some public web site is possible.
+    An incremental reader of the JSON text of the `json_file` file-like
+    object read in buffered chunks of `chunk_size` characters. The values are
+    decoded one at a time, keeping only the undecoded text in memory.
     """
-    import socket
-    import http.client as httplib
 
-    http_connection = httplib.HTTPConnection('dejacode.org', timeout=10)  # NOQA
-    try:
-        http_connection.connect()
-    except socket.error:
-        return False
-    else:
+    whitespace = re.compile(r'[ \t\n\r]*')
+    # the characters that may continue a JSON number
+    number_chars = frozenset('0123456789.eE+-')
+
+    def __init__(self, json_file, chunk_size=1024 * 1024):
+        self.json_file = json_file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+
+    def read(self):
+        """
+        Read more text in the buffer, dropping the decoded text. Return False
+        at the end of the file.
+        """
+        # read at least as much as is buffered such that a large value that
+        # spans many chunks is not decoded over and over
+        size = max(self.chunk_size, len(self.buffer) - self.pos)
+        chunk = self.json_file.read(size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
         return True
 
+    def peek(self):
+        """
+        Return the next non-whitespace character or an empty string at the end
+        of the file.
+        """
+        while True:
+            self.pos = self.whitespace.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read():
+                return ''
+
+    def expect(self, *chars):
+        """
+        Consume and return the next non-whitespace character if it is one of
+        `chars` or raise a ValueError.
+        """
+        char = self.peek()
+        if char not in chars or not char:
+            self.fail('Expecting %s' % ' or '.join(repr(c) for c in chars))
+        self.pos += 1
+        return char
+
+    def fail(self, msg):
+        raise json.JSONDecodeError(msg, self.buffer, self.pos)
+
+    def decode_value(self):
+        """
+        Decode and return the next JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # the value may be truncated at the end of the buffer
+                if not self.read():
+                    raise
+                continue
+            # a number may also be truncated at the end of the buffer and
+            # still decode as a shorter number: only accept it when followed
+            # by a delimiter or the end of the file
+            if end == len(self.buffer) or self.buffer[end] in self.number_chars:
+                # the buffer is only shifted if more text is read
+                if self.read():
+                    continue
+            self.pos = end
+            return value
+
+    def iter_array(self):
+        """
+        Yield the decoded items of the next JSON array one at a time.
+        """
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            if self.expect(',', ']') == ']':
+                return
+
+    def iter_object_names(self):
+        """
+        Yield the member names of the next JSON object one at a time. The
+        caller must consume each member value before the next name.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                self.fail('Expecting property name enclosed in double quotes')
+            name = self.decode_value()
+            self.expect(':')
+            yield name
+            if self.expect(',', '}') == '}':
+                return
+
+    def check_end(self):
+        """
+        Raise a ValueError if there is extra data after the decoded value.
+        """
+        if self.peek():
+            self.fail('Extra data')
+
+
+def load_jsonl(location):
+    """
+    Read the JSON lines file at `location` and return a list of dicts, one for
+    each non-empty line.
+    """
+    results = []
+    with io.open(location, encoding='utf-8-sig') as jsonl_file:
+        for line in jsonl_file:
+            if line.strip():
+                results.append(json.loads(line))
+    return results
+
+
+def get_cache_dir(name):
+    """
+    Return the location of the `name` cache directory of the user cache.
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'aboutcode-toolkit', name)
+
 
 def extract_zip(location):
     """
@@ -415,11 +604,32 @@ def copy_license_notice_files(fields, base_dir, reference_dir, afp):
 
 
 def copy_file(from_path, to_path):
-    error = ''
+    """
+    Copy a `from_path` file or directory in the `to_path` directory. Return
+    an Error or an empty string.
+    """
     # Return if the from_path is empty or None.
     if not from_path:
         return
 
+    copy_tasks, error = get_copy_tasks(from_path, to_path)
+    errors = copy_files(copy_tasks, threads=1)
+    if errors:
+        return errors[0]
+    return error
+
+
+def get_copy_tasks(from_path, to_path, link_mode='copy'):
+    """
+    Return a tuple of (list of (source file, target file) tuples, error) to
+    copy a `from_path` file or directory in the `to_path` directory, creating
+    the target directories. The error is a WARNING Error if the target
+    already exists and some of its files are replaced when copied or linked
+    with `link_mode`, a CRITICAL Error if the target directories cannot be
+    created or an empty string.
+    """
+    copy_tasks = []
+    error = ''
     if on_windows:
         if not from_path.startswith(UNC_PREFIXES):
             from_path = add_unc(from_path)
@@ -431,33 +641,415 @@ def copy_file(from_path, to_path):
     to_path = to_path.strip()
     # Errors will be captured when doing the validation
     if not os.path.exists(from_path):
-        return ''
+        return copy_tasks, error
 
-    if not posixpath.exists(to_path):
-        os.makedirs(to_path)
     try:
-        if os.path.isdir(from_path):
-            # Copy the whole directory structure
-            if from_path.endswith('/'):
-                from_path = from_path.rpartition('/')[0]
-            folder_name = os.path.basename(from_path)
-            to_path = os.path.join(to_path, folder_name)
-            if os.path.exists(to_path):
-                msg = to_path + ' is already existed and is replaced by ' + from_path
-                error = Error(WARNING, msg)
-            copy_tree(from_path, to_path)
-        else:
-            file_name = os.path.basename(from_path)
-            to_file_path = os.path.join(to_path, file_name)
-            if os.path.exists(to_file_path):
-                msg = to_file_path + ' is already existed and is replaced by ' + from_path
-                error = Error(WARNING, msg)
-            shutil.copy2(from_path, to_path)
-        return error
-    except Exception as e:
+        os.makedirs(to_path, exist_ok=True)
+        copy_paths = iter_copy_paths(from_path, to_path)
+        replaced = None
+        for index, (source, target, is_dir) in enumerate(copy_paths):
+            if not index and os.path.exists(target):
+                replaced = source, target
+            if is_dir:
+                os.makedirs(target, exist_ok=True)
+            else:
+                copy_tasks.append((source, target))
+    except Exception:
         msg = 'Cannot copy file at %(from_path)r.' % locals()
-        error = Error(CRITICAL, msg)
-        return error
+        return copy_tasks, Error(CRITICAL, msg)
+
+    # only report an existing target if some of its files are written to
+    if replaced and not all(is_up_to_date(s, t, link_mode) for s, t in copy_tasks):
+        source, target = replaced
+        msg = target + ' is already existed and is replaced by ' + source
+        error = Error(WARNING, msg)
+    return copy_tasks, error
+
+
+def iter_copy_paths(from_path, to_path):
+    """
+    Yield a tuple of (source path, target path, is_dir) to copy a `from_path`
+    file or directory in the `to_path` directory, then for each of the
+    directories and files of a `from_path` directory.
+    """
+    if not os.path.isdir(from_path):
+        yield from_path, os.path.join(to_path, os.path.basename(from_path)), False
+        return
+
+    # Copy the whole directory structure
+    if from_path.endswith('/'):
+        from_path = from_path.rpartition('/')[0]
+    folder_name = os.path.basename(from_path)
+    to_path = os.path.join(to_path, folder_name)
+    for top, _dirs, files in os.walk(from_path, followlinks=True):
+        target_dir = os.path.normpath(os.path.join(to_path, os.path.relpath(top, from_path)))
+        yield top, target_dir, True
+        for file_name in files:
+            yield os.path.join(top, file_name), os.path.join(target_dir, file_name), False
+
+
+def copy_files(copy_tasks, threads=DEFAULT_COPY_THREADS, link_mode='copy', checksums=None):
+    """
+    Copy the files of a `copy_tasks` list of (source file, target file)
+    tuples using up to `threads` threads. A target file with the same size
+    and modification time as its source file is already copied and skipped.
+    In "copy" `link_mode` a target file that is a link is replaced by a copy.
+    When several sources have the same target, the last one is copied.
+    With a "hardlink" or "symlink" `link_mode` each target file is a link to
+    its source file instead of a copy.
+
+    If `checksums` is a dictionary, add to it a mapping of each target file
+    to its checksums computed in the same read as its copy.
+    Return a list of Error objects.
+    """
+    # the last source of a target wins as if copied in sequence
+    targets = {}
+    for from_path, to_path in copy_tasks:
+        targets[to_path] = from_path
+
+    with_checksums = checksums is not None
+
+    def copy(target):
+        to_path, from_path = target
+        file_checksums = None
+        try:
+            if link_mode != 'copy':
+                link_file(from_path, to_path, symbolic=link_mode == 'symlink')
+            elif not is_same_file(from_path, to_path):
+                if is_link(to_path):
+                    # replace a link rather than writing to the linked file
+                    os.remove(to_path)
+                file_checksums = copy_file_content(from_path, to_path, with_checksums)
+            if with_checksums and not file_checksums:
+                file_checksums = get_file_checksums(to_path)
+        except Exception:
+            if link_mode != 'copy':
+                msg = 'Cannot link file at %(from_path)r.' % locals()
+            else:
+                msg = 'Cannot copy file at %(from_path)r.' % locals()
+            return Error(CRITICAL, msg), None
+        return None, file_checksums
+
+    if threads > 1 and len(targets) > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(copy, targets.items()))
+    else:
+        results = [copy(target) for target in targets.items()]
+
+    errors = []
+    for to_path, (error, file_checksums) in zip(targets, results):
+        if error:
+            errors.append(error)
+        elif with_checksums:
+            checksums[to_path] = file_checksums
+    return errors
+
+
+def is_same_file(from_path, to_path):
+    """
+    Return True if the `to_path` file exists and has the same size and
+    modification time as the `from_path` file such as a previous copy. A link
+    is never a copy even if it is a link to the `from_path` file.
+    """
+    if is_link(to_path):
+        return False
+    try:
+        to_stat = os.stat(to_path)
+    except OSError:
+        return False
+    from_stat = os.stat(from_path)
+    return (from_stat.st_size == to_stat.st_size
+            and int(from_stat.st_mtime) == int(to_stat.st_mtime))
+
+
+def is_link(location):
+    """
+    Return True if `location` is a symbolic link or a file with other hard
+    links such that writing to it would also change another file.
+    """
+    try:
+        return os.path.islink(location) or os.stat(location).st_nlink > 1
+    except OSError:
+        return False
+
+
+def is_up_to_date(from_path, to_path, link_mode='copy'):
+    """
+    Return True if the `to_path` file is already a copy of the `from_path`
+    file, or its hard link or symbolic link for a "hardlink" or "symlink"
+    `link_mode`, such that it is not written again.
+    """
+    if link_mode == 'copy':
+        return is_same_file(from_path, to_path)
+    return is_linked_file(from_path, to_path, symbolic=link_mode == 'symlink')
+
+
+def is_linked_file(from_path, to_path, symbolic=False):
+    """
+    Return True if `to_path` is a hard link or a symbolic link if `symbolic`
+    is True to the `from_path` file.
+    """
+    if symbolic:
+        return (os.path.islink(to_path)
+                and os.readlink(to_path) == os.path.abspath(from_path))
+    return (not os.path.islink(to_path) and os.path.isfile(to_path)
+            and os.path.samefile(from_path, to_path))
+
+
+def link_file(from_path, to_path, symbolic=False):
+    """
+    Create a `to_path` hard link or a symbolic link if `symbolic` is True to
+    the `from_path` file, replacing an existing `to_path` file. Do nothing if
+    `to_path` is already this link.
+    """
+    if is_linked_file(from_path, to_path, symbolic):
+        return
+    from_path = os.path.abspath(from_path)
+
+    # link to a temp file first such that the target is replaced at once
+    temp_location = '%s.%d.%d.tmp' % (to_path, os.getpid(), threading.get_ident())
+    try:
+        if symbolic:
+            os.symlink(from_path, temp_location)
+        else:
+            os.link(from_path, temp_location)
+        os.replace(temp_location, to_path)
+    finally:
+        if os.path.lexists(temp_location):
+            os.remove(temp_location)
+
+
+def copy_file_range(source_fd, target_fd, offset, count):
+    """
+    Copy `count` bytes at `offset` of the `source_fd` file descriptor to the
+    same offset of the `target_fd` file descriptor in the kernel. Return the
+    number of bytes copied.
+    """
+    return os.copy_file_range(source_fd, target_fd, count, offset, offset)
+
+
+def sendfile(source_fd, target_fd, offset, count):
+    """
+    Copy `count` bytes at `offset` of the `source_fd` file descriptor to the
+    same offset of the `target_fd` file descriptor in the kernel. Return the
+    number of bytes copied.
+    """
+    os.lseek(target_fd, offset, os.SEEK_SET)
+    return os.sendfile(target_fd, source_fd, offset, count)
+
+
+# in-kernel copy functions available on this platform, by order of preference
+FAST_COPY_FUNCTIONS = []
+if hasattr(os, 'copy_file_range'):
+    FAST_COPY_FUNCTIONS.append(copy_file_range)
+# sendfile only supports a regular file as target on Linux
+if hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+    FAST_COPY_FUNCTIONS.append(sendfile)
+
+
+def copy_file_content(from_path, to_path, with_checksums=False):
+    """
+    Copy the content and the metadata of the `from_path` file to the
+    `to_path` file. Use an in-kernel copy when available on this platform
+    and for these files and a regular copy otherwise.
+
+    If `with_checksums` is True, return a mapping of checksums of the file
+    content computed as it is copied. Return None otherwise.
+    """
+    with open(from_path, 'rb') as source, open(to_path, 'wb') as target:
+        if with_checksums:
+            # the content must be read to compute its checksums
+            checksums = get_checksums(source, on_chunk=target.write)
+        else:
+            checksums = None
+            fast_copy_file(source, target)
+    shutil.copystat(from_path, to_path)
+    return checksums
+
+
+def fast_copy_file(source, target):
+    """
+    Copy the content of a `source` binary file object to a `target` binary
+    file object using an in-kernel copy when possible.
+    """
+    size = os.fstat(source.fileno()).st_size
+    copied = 0
+    for fast_copy in FAST_COPY_FUNCTIONS:
+        try:
+            while copied < size:
+                count = fast_copy(source.fileno(), target.fileno(), copied, size - copied)
+                if not count:
+                    break
+                copied += count
+        except OSError:
+            # not supported for these files: try the next way to copy
+            continue
+        if copied >= size:
+            break
+
+    if copied < size:
+        source.seek(copied)
+        target.seek(copied)
+        shutil.copyfileobj(source, target)
+
+
+# checksums of a file in a manifest
+CHECKSUM_NAMES = ('md5', 'sha1', 'sha256')
+
+
+def get_checksums(source, on_chunk=None, chunk_size=1024 * 1024):
+    """
+    Return a mapping of the size and of the CHECKSUM_NAMES checksums of the
+    content of a `source` binary file object, computed in a single read.
+    Call the optional `on_chunk` function with each chunk read.
+    """
+    hashers = [hashlib.new(name) for name in CHECKSUM_NAMES]
+    size = 0
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        for hasher in hashers:
+            hasher.update(chunk)
+        if on_chunk:
+            on_chunk(chunk)
+    checksums = dict(size=size)
+    for name, hasher in zip(CHECKSUM_NAMES, hashers):
+        checksums[name] = hasher.hexdigest()
+    return checksums
+
+
+def get_file_checksums(location):
+    """
+    Return a mapping of the size and of the CHECKSUM_NAMES checksums of the
+    file at `location`.
+    """
+    with open(location, 'rb') as source:
+        return get_checksums(source)
+
+
+def get_files_checksums(locations, threads=DEFAULT_COPY_THREADS):
+    """
+    Return a list of checksums mappings for a `locations` list of file paths
+    computed using up to `threads` threads, with None for a file that cannot
+    be read.
+    """
+    def checksum(location):
+        try:
+            return get_file_checksums(location)
+        except OSError:
+            return
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(checksum, locations))
+
+
+def write_manifest(location, checksums):
+    """
+    Write a manifest at `location` of a `checksums` mapping of relative file
+    paths to their checksums mapping as a JSON object keyed by path if
+    `location` is a .json file and as a CSV file otherwise.
+    """
+    location = add_unc(location)
+    if location.lower().endswith('.json'):
+        with io.open(location, 'w', encoding='utf-8') as output_file:
+            json.dump(checksums, output_file, indent=2, sort_keys=True)
+        return
+
+    field_names = ('path', 'size') + CHECKSUM_NAMES
+    with io.open(location, 'w', encoding='utf-8', newline='') as output_file:
+        writer = csv.DictWriter(output_file, field_names)
+        writer.writeheader()
+        for path in sorted(checksums):
+            row = dict(checksums[path])
+            row['path'] = path
+            writer.writerow(row)
+
+
+# archive formats by archive file extension
+ARCHIVE_FORMATS = {
+    '.zip': 'zip',
+    '.tar': 'tar',
+    '.tar.gz': 'gztar',
+    '.tgz': 'gztar',
+    '.tar.xz': 'xztar',
+}
+
+# compression methods of a zip archive
+ZIP_COMPRESSIONS = {
+    'stored': zipfile.ZIP_STORED,
+    'deflate': zipfile.ZIP_DEFLATED,
+    'lzma': zipfile.ZIP_LZMA,
+}
+
+DEFAULT_ZIP_COMPRESSION = 'deflate'
+
+
+def get_archive_format(location):
+    """
+    Return the archive format of an archive file `location` based on its
+    extension or None if this is not a supported archive file.
+    """
+    location = location.lower()
+    for extension, archive_format in ARCHIVE_FORMATS.items():
+        if location.endswith(extension):
+            return archive_format
+
+
+def write_archive(location, members, compression=DEFAULT_ZIP_COMPRESSION, compresslevel=None):
+    """
+    Write an archive at `location` with a `members` list of (file or
+    directory path, archive name) tuples. Each file is read and compressed
+    in the archive as a stream. The archive format is based on the
+    `location` extension. Use the `compression` method of a zip archive and
+    the optional `compresslevel` level of a deflate zip, gztar or xztar
+    archive. Files modified before 1980 are stored in a zip archive with a
+    1980 timestamp, the earliest a zip archive supports.
+    Return a list of Error objects.
+    """
+    errors = []
+    archive_format = get_archive_format(location)
+    if compresslevel is not None:
+        if archive_format == 'zip':
+            uses_level = compression == 'deflate'
+            archive_kind = '%(compression)s zip' % locals()
+        else:
+            uses_level = archive_format in ('gztar', 'xztar')
+            archive_kind = archive_format
+        if not uses_level:
+            msg = 'The compression level is ignored for a %(archive_kind)s archive.' % locals()
+            errors.append(Error(WARNING, msg))
+
+    if archive_format == 'zip':
+        archive = zipfile.ZipFile(
+            location, 'w',
+            compression=ZIP_COMPRESSIONS[compression],
+            compresslevel=compresslevel,
+            strict_timestamps=False,
+        )
+        add_member = archive.write
+    else:
+        import tarfile
+        compressor = archive_format.partition('tar')[0]
+        mode = 'w:' + compressor if compressor else 'w'
+        kwargs = {}
+        if compresslevel is not None:
+            if mode == 'w:gz':
+                kwargs['compresslevel'] = compresslevel
+            elif mode == 'w:xz':
+                kwargs['preset'] = compresslevel
+        archive = tarfile.open(location, mode, **kwargs)
+        add_member = functools.partial(archive.add, recursive=False)
+
+    with archive:
+        for path, name in members:
+            try:
+                add_member(path, to_posix(name))
+            except (OSError, ValueError):
+                msg = 'Cannot copy file at %(path)r.' % locals()
+                errors.append(Error(CRITICAL, msg))
+    return errors
 
 
 # FIXME: we should use a license object instead
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# ============================================================================
+#  Copyright (c) nexB Inc. http://www.nexb.com/ - All rights reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ============================================================================
+
+import os
+import shutil
+import tempfile
+
+# the user caches directory of the tests
+cache_home = None
+
+
+def pytest_configure(config):
+    # keep the license and template caches of the tests out of the user home
+    global cache_home
+    cache_home = tempfile.mkdtemp(prefix='aboutcode-toolkit-cache-')
+    os.environ['XDG_CACHE_HOME'] = cache_home
+    os.environ.pop('ABOUTCODE_TEMPLATE_CACHE_DIR', None)
+
+
+def pytest_unconfigure(config):
+    if cache_home:
+        shutil.rmtree(cache_home, ignore_errors=True)
@@ -13,10 +13,15 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 # ============================================================================
+from http.client import HTTPMessage
 import unittest
 
 import mock
 
+from testing_utils import FakeLicenseApiServer
+from testing_utils import get_fake_licenses
+from testing_utils import get_temp_dir
+
 from attributecode import api
 from attributecode import ERROR
 from attributecode import Error
@@ -25,8 +30,11 @@ from attributecode import Error
 class FakeResponse(object):
     response_content = None
 
-    def __init__(self, response_content):
+    def __init__(self, response_content, headers=None):
         self.response_content = response_content
+        self.headers = HTTPMessage()
+        for name, value in (headers or {}).items():
+            self.headers[name] = value
 
     def read(self):
         return self.response_content
@@ -75,3 +83,295 @@ class ApiTest(unittest.TestCase):
             api_url='http://fake.url/', api_key='api_key', license_key='apache-2.0')
         expected = ({}, [Error(ERROR, "Invalid 'license': apache-2.0")])
         assert expected == license_data
+
+
+class FetchLicensesTest(unittest.TestCase):
+
+    def test_fetch_licenses_data_reuses_a_single_connection(self):
+        licenses = get_fake_licenses(5)
+        license_keys = [lic['key'] for lic in licenses]
+        with FakeLicenseApiServer(licenses) as server:
+            result, errors = api.fetch_licenses_data(
+                server.api_url, 'api_key', license_keys, max_workers=1, batch_size=1)
+
+        assert [] == errors
+        assert dict(zip(license_keys, licenses)) == result
+        assert 5 == len(server.requests)
+        assert 1 == len(server.connections)
+
+    def test_fetch_licenses_data_concurrently_limits_connections(self):
+        licenses = get_fake_licenses(20)
+        license_keys = [lic['key'] for lic in licenses]
+        with FakeLicenseApiServer(licenses) as server:
+            result, errors = api.fetch_licenses_data(
+                server.api_url, 'api_key', license_keys + license_keys, max_workers=4,
+                batch_size=1)
+
+        assert [] == errors
+        assert dict(zip(license_keys, licenses)) == result
+        assert 20 == len(server.requests)
+        assert len(server.connections) <= 4
+
+    def test_fetch_licenses_data_reports_invalid_keys(self):
+        licenses = get_fake_licenses(2)
+        with FakeLicenseApiServer(licenses) as server:
+            result, errors = api.fetch_licenses_data(
+                server.api_url, 'api_key', ['lic-0', 'unknown', 'lic-1'])
+
+        assert ['lic-0', 'lic-1'] == sorted(result)
+        assert [Error(ERROR, "Invalid 'license': unknown")] == errors
+
+    def test_fetch_licenses_data_stops_on_authorization_denied(self):
+        licenses = get_fake_licenses(10)
+        license_keys = [lic['key'] for lic in licenses]
+        with FakeLicenseApiServer(licenses) as server:
+            result, errors = api.fetch_licenses_data(
+                server.api_url, 'bad_key', license_keys, max_workers=1)
+
+        assert {} == result
+        assert [Error(ERROR, api.AUTH_DENIED_MESSAGE)] == errors
+        assert 1 == len(server.requests)
+
+    def test_fetch_licenses_data_follows_redirections(self):
+        licenses = get_fake_licenses(2)
+        with FakeLicenseApiServer(licenses) as server:
+            api_url = server.api_url.replace('/api/', '/redirect/api/')
+            result, errors = api.fetch_licenses_data(api_url, 'api_key', ['lic-0', 'lic-1'])
+
+        assert [] == errors
+        assert {'lic-0': licenses[0], 'lic-1': licenses[1]} == result
+        assert 2 == len(server.requests)
+
+    def test_fetch_licenses_data_without_keys_does_not_send_requests(self):
+        assert ({}, []) == api.fetch_licenses_data('http://fake.url/', 'api_key', [])
+
+
+class LicenseCacheTest(unittest.TestCase):
+
+    def test_fetch_licenses_data_with_fresh_cache_does_not_send_requests(self):
+        licenses = get_fake_licenses(3)
+        license_keys = [lic['key'] for lic in licenses]
+        cache = api.LicenseCache(get_temp_dir())
+        with FakeLicenseApiServer(licenses) as server:
+            first, errors = api.fetch_licenses_data(
+                server.api_url, 'api_key', license_keys, cache=cache)
+            assert [] == errors
+            requests_count = len(server.requests)
+
+            second, errors = api.fetch_licenses_data(
+                server.api_url, 'api_key', license_keys, cache=cache)
+            assert [] == errors
+            assert requests_count == len(server.requests)
+
+        assert first == second
+        assert dict(zip(license_keys, licenses)) == second
+
+    def test_fetch_licenses_data_revalidates_stale_cache(self):
+        licenses = get_fake_licenses(2)
+        license_keys = [lic['key'] for lic in licenses]
+        cache = api.LicenseCache(get_temp_dir(), ttl=0)
+        with FakeLicenseApiServer(licenses) as server:
+            api.fetch_licenses_data(
+                server.api_url, 'api_key', license_keys, cache=cache, batch_size=1)
+            result, errors = api.fetch_licenses_data(
+                server.api_url, 'api_key', license_keys, cache=cache)
+
+        assert [] == errors
+        assert dict(zip(license_keys, licenses)) == result
+        assert 4 == len(server.requests)
+        assert 2 == server.not_modified
+
+    def test_fetch_licenses_data_revalidates_stale_cache_with_last_modified(self):
+        licenses = get_fake_licenses(2)
+        license_keys = [lic['key'] for lic in licenses]
+        cache = api.LicenseCache(get_temp_dir(), ttl=0)
+        with FakeLicenseApiServer(licenses) as server:
+            server.last_modified = 'Wed, 21 Oct 2015 07:28:00 GMT'
+            api.fetch_licenses_data(
+                server.api_url, 'api_key', license_keys, cache=cache, batch_size=1)
+            entry = cache.get(server.api_url, 'lic-0')
+            expected = {'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+            assert expected == cache.get_conditional_headers(entry)
+
+            result, errors = api.fetch_licenses_data(
+                server.api_url, 'api_key', license_keys, cache=cache)
+
+        assert [] == errors
+        assert dict(zip(license_keys, licenses)) == result
+        assert 4 == len(server.requests)
+        assert 2 == server.not_modified
+
+    def test_fetch_licenses_data_offline_uses_only_the_cache(self):
+        licenses = get_fake_licenses(2)
+        cache = api.LicenseCache(get_temp_dir(), ttl=0)
+        with FakeLicenseApiServer(licenses) as server:
+            api.fetch_licenses_data(server.api_url, 'api_key', ['lic-0'], cache=cache)
+            result, errors = api.fetch_licenses_data(
+                server.api_url, 'api_key', ['lic-0', 'lic-1'], cache=cache, offline=True)
+            assert 1 == len(server.requests)
+
+        assert {'lic-0': licenses[0]} == result
+        expected = [Error(ERROR, 'License not found in the offline license cache: lic-1')]
+        assert expected == errors
+
+    def test_license_cache_is_keyed_by_api_url_and_license_key(self):
+        cache = api.LicenseCache(get_temp_dir())
+        cache.put('http://one.url/api/', 'mit', {'key': 'mit'}, etag='"1"')
+        entry = cache.get('http://one.url/api', 'mit')
+        assert {'key': 'mit'} == entry['data']
+        assert {'If-None-Match': '"1"'} == cache.get_conditional_headers(entry)
+        assert cache.is_fresh(entry)
+        assert None == cache.get('http://two.url/api', 'mit')
+        assert None == cache.get('http://one.url/api', 'apache-2.0')
+
+
+class BatchLicensesTest(unittest.TestCase):
+
+    def test_request_licenses_data_follows_pagination(self):
+        licenses = get_fake_licenses(5)
+        license_keys = [lic['key'] for lic in licenses]
+        with FakeLicenseApiServer(licenses) as server:
+            result, errors = api.request_licenses_data(
+                server.api_url, 'api_key', license_keys)
+
+        assert {} == errors
+        assert dict(zip(license_keys, licenses)) == result
+        # 3 pages of 2 licenses
+        assert 3 == len(server.requests)
+
+    def test_request_licenses_data_reports_errors_per_key(self):
+        licenses = get_fake_licenses(3)
+        with FakeLicenseApiServer(licenses) as server:
+            result, errors = api.request_licenses_data(
+                server.api_url, 'api_key', ['lic-0', 'foo', 'lic-2', 'bar'])
+
+        assert ['lic-0', 'lic-2'] == sorted(result)
+        expected = {
+            'foo': [Error(ERROR, "Invalid 'license': foo")],
+            'bar': [Error(ERROR, "Invalid 'license': bar")],
+        }
+        assert expected == errors
+
+    def test_request_licenses_data_falls_back_to_one_request_per_key_on_failure(self):
+        licenses = get_fake_licenses(3)
+        with FakeLicenseApiServer(licenses) as server:
+            server.batch_status = 400
+            result, errors = api.request_licenses_data(
+                server.api_url, 'api_key', ['lic-0', 'foo', 'lic-2'])
+
+        assert ['lic-0', 'lic-2'] == sorted(result)
+        assert {'foo': [Error(ERROR, "Invalid 'license': foo")]} == errors
+        assert 4 == len(server.requests)
+
+    def test_request_licenses_data_falls_back_if_list_filter_is_not_supported(self):
+        licenses = get_fake_licenses(6)
+        with FakeLicenseApiServer(licenses) as server:
+            server.supports_key_in = False
+            result, errors = api.request_licenses_data(
+                server.api_url, 'api_key', ['lic-0', 'lic-1'])
+
+        assert {} == errors
+        assert {'lic-0': licenses[0], 'lic-1': licenses[1]} == result
+        assert 3 == len(server.requests)
+
+    def test_request_licenses_data_with_authorization_denied(self):
+        with FakeLicenseApiServer(get_fake_licenses(3)) as server:
+            result, errors = api.request_licenses_data(
+                server.api_url, 'bad_key', ['lic-0', 'lic-1'])
+
+        assert {} == result
+        auth_error = [Error(ERROR, api.AUTH_DENIED_MESSAGE)]
+        assert {'lic-0': auth_error, 'lic-1': auth_error} == errors
+        assert 1 == len(server.requests)
+
+    def test_fetch_licenses_data_uses_few_round_trips(self):
+        licenses = get_fake_licenses(40)
+        license_keys = [lic['key'] for lic in licenses]
+        with FakeLicenseApiServer(licenses) as server:
+            server.page_size = 100
+            result, errors = api.fetch_licenses_data(
+                server.api_url, 'api_key', license_keys + ['unknown'], batch_size=10)
+
+        assert dict(zip(license_keys, licenses)) == result
+        assert [Error(ERROR, "Invalid 'license': unknown")] == errors
+        assert 5 == len(server.requests)
+
+
+class ResilientHttpClientTest(unittest.TestCase):
+
+    def get_client(self, **kwargs):
+        return api.HttpClient(backoff_factor=0, **kwargs)
+
+    def test_http_client_retries_transient_server_errors(self):
+        licenses = get_fake_licenses(2)
+        client = self.get_client()
+        with FakeLicenseApiServer(licenses) as server:
+            server.failures = [503, 502]
+            result, errors = api.fetch_licenses_data(
+                server.api_url, 'api_key', ['lic-0', 'lic-1'], client=client)
+            client.close()
+
+        assert [] == errors
+        assert dict(zip(['lic-0', 'lic-1'], licenses)) == result
+        assert 3 == len(server.requests)
+
+    def test_http_client_gives_up_after_retries(self):
+        client = self.get_client(retries=2)
+        with FakeLicenseApiServer(get_fake_licenses(2)) as server:
+            server.failures = [503] * 10
+            result, errors = api.request_license_data(
+                server.api_url, 'api_key', 'lic-0', client=client)
+            client.close()
+
+        assert {} == result
+        assert [Error(ERROR, api.NETWORK_PROBLEM_MESSAGE)] == errors
+        assert 3 == len(server.requests)
+
+    def test_http_client_does_not_retry_client_errors(self):
+        client = self.get_client()
+        with FakeLicenseApiServer(get_fake_licenses(2)) as server:
+            result, errors = api.request_license_data(
+                server.api_url, 'bad_key', 'lic-0', client=client)
+            client.close()
+
+        assert [Error(ERROR, api.AUTH_DENIED_MESSAGE)] == errors
+        assert 1 == len(server.requests)
+
+    def test_fetch_licenses_data_reports_invalid_api_url(self):
+        client = self.get_client()
+        with FakeLicenseApiServer(get_fake_licenses(4)) as server:
+            server.failures = [404]
+            result, errors = api.fetch_licenses_data(
+                server.api_url, 'api_key', ['lic-0', 'lic-1'], client=client)
+            client.close()
+
+        assert {} == result
+        assert [Error(ERROR, api.INVALID_API_URL_MESSAGE)] == errors
+        assert 1 == len(server.requests)
+
+    def test_fetch_licenses_data_reports_network_problems_and_fails_fast(self):
+        with FakeLicenseApiServer([]) as server:
+            api_url = server.api_url
+        # the server is now closed and its port refuses connections
+        breaker = api.CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        client = self.get_client(retries=5, circuit_breaker=breaker)
+        result, errors = api.fetch_licenses_data(
+            api_url, 'api_key', ['lic-0', 'lic-1'], max_workers=1, batch_size=1, client=client)
+
+        assert {} == result
+        assert [Error(ERROR, api.NETWORK_PROBLEM_MESSAGE)] == errors
+        assert breaker.is_open
+        assert 2 == breaker.failures
+
+    def test_circuit_breaker_allows_a_trial_request_after_reset_timeout(self):
+        breaker = api.CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.is_open
+        assert breaker.allow()
+        breaker.record_success()
+        assert not breaker.is_open
+
+        breaker = api.CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        breaker.record_failure()
+        assert not breaker.allow()
@@ -14,14 +14,22 @@
 #  limitations under the License.
 # ============================================================================
 
+import csv
 import io
+import json
 import os
 import unittest
 
+import mock
+
+from testing_utils import get_temp_dir
 from testing_utils import get_test_loc
 from testing_utils import get_temp_file
 
 from attributecode import attrib
+from attributecode import attrib_util
+from attributecode import CRITICAL
+from attributecode import Error
 from attributecode import model
 
 
@@ -61,6 +69,8 @@ class TemplateTest(unittest.TestCase):
         builtin_templates_dir = os.path.dirname(attrib.DEFAULT_TEMPLATE_FILE)
         for template in os.listdir(builtin_templates_dir):
             template_loc = os.path.join(builtin_templates_dir, template)
+            if not os.path.isfile(template_loc):
+                continue
             with io.open(template_loc, 'r', encoding='utf-8') as tmpl:
                 template = tmpl.read()
             try:
@@ -68,6 +78,132 @@ class TemplateTest(unittest.TestCase):
             except:
                 raise Exception(template_loc)
 
+    def test_check_template_does_not_change_global_filters(self):
+        import jinja2
+        assert None == attrib.check_template('{{ abouts|multi_sort(attributes=["name"]) }}')
+        assert 'multi_sort' not in jinja2.filters.FILTERS
+
+    def test_load_template_compiles_a_template_text_once(self):
+        template = '{% for about in abouts|unique_together(attributes=["name"]) %}{{ about }}{% endfor %}'
+        assert attrib_util.load_template(template) is attrib_util.load_template(template)
+
+    def test_bytecode_cache_is_reused_across_environments(self):
+        import jinja2
+        cache_dir = get_temp_dir()
+        template = '{{ "compiled" }}'
+        loader = attrib_util.TemplateTextLoader()
+        name = loader.add(template)
+        env = jinja2.Environment(loader=loader, bytecode_cache=attrib_util.get_bytecode_cache(cache_dir))
+        assert 'compiled' == env.get_template(name).render()
+        assert 1 == len(os.listdir(cache_dir))
+
+        other_env = jinja2.Environment(loader=loader, bytecode_cache=attrib_util.get_bytecode_cache(cache_dir))
+        with mock.patch.object(other_env, 'compile') as compile_template:
+            assert 'compiled' == other_env.get_template(name).render()
+        assert not compile_template.called
+
+    def test_bytecode_cache_is_relocated_with_an_environment_variable(self):
+        cache_dir = get_temp_dir()
+        with mock.patch.dict(os.environ, {attrib_util.TEMPLATE_CACHE_DIR_ENV: cache_dir}):
+            cache = attrib_util.get_bytecode_cache()
+        assert cache_dir == cache.directory
+
+    def test_bytecode_cache_is_disabled_with_an_empty_environment_variable(self):
+        with mock.patch.dict(os.environ, {attrib_util.TEMPLATE_CACHE_DIR_ENV: ''}):
+            assert None == attrib_util.get_bytecode_cache()
+
+    def test_bytecode_cache_is_in_the_user_cache_directory_by_default(self):
+        cache_home = get_temp_dir()
+        with mock.patch.dict(os.environ, {'XDG_CACHE_HOME': cache_home}):
+            os.environ.pop(attrib_util.TEMPLATE_CACHE_DIR_ENV, None)
+            cache = attrib_util.get_bytecode_cache()
+        assert cache.directory.startswith(cache_home)
+
+    def test_bytecode_cache_prune_removes_old_and_least_recently_used_templates(self):
+        import time
+        cache_dir = get_temp_dir()
+        now = time.time()
+        for index in range(5):
+            location = os.path.join(cache_dir, '__jinja2_%d.cache' % index)
+            with open(location, 'wb') as cached:
+                cached.write(b'')
+            os.utime(location, (now - index, now - index))
+        old = os.path.join(cache_dir, '__jinja2_old.cache')
+        with open(old, 'wb') as cached:
+            cached.write(b'')
+        os.utime(old, (now - 31 * 24 * 60 * 60, now - 31 * 24 * 60 * 60))
+        other = os.path.join(cache_dir, 'other')
+        with open(other, 'wb') as cached:
+            cached.write(b'')
+
+        cache = attrib_util.TemplateBytecodeCache(cache_dir)
+        cache.max_entries = 3
+        cache.prune()
+        expected = ['__jinja2_0.cache', '__jinja2_1.cache', '__jinja2_2.cache', 'other']
+        assert expected == sorted(os.listdir(cache_dir))
+
+    def test_bytecode_cache_marks_loaded_templates_as_recently_used(self):
+        import jinja2
+        cache_dir = get_temp_dir()
+        loader = attrib_util.TemplateTextLoader()
+        name = loader.add('{{ "used" }}')
+        env = jinja2.Environment(loader=loader, bytecode_cache=attrib_util.get_bytecode_cache(cache_dir))
+        env.get_template(name)
+        location = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+        last_used = os.path.getmtime(location) - 1000
+        os.utime(location, (last_used, last_used))
+
+        other_env = jinja2.Environment(loader=loader, bytecode_cache=attrib_util.get_bytecode_cache(cache_dir))
+        with mock.patch.object(other_env, 'compile') as compile_template:
+            assert 'used' == other_env.get_template(name).render()
+        assert not compile_template.called
+        assert os.path.getmtime(location) > last_used
+
+    def test_compiled_builtin_templates_are_loaded_without_compiling(self):
+        compiled_dir = get_temp_dir()
+        names = attrib_util.compile_builtin_templates(compiled_dir)
+        assert 3 == len(names)
+        assert 3 == len([n for n in os.listdir(compiled_dir) if n.endswith('.py')])
+        assert attrib_util.jinja_version == attrib_util.get_compiled_templates_version(compiled_dir)
+
+        loader = attrib_util.TemplateTextLoader(compiled_dir)
+        name = loader.add(attrib.read_template())
+        assert name in names
+        env = attrib_util.create_environment(loader)
+        with mock.patch.object(env, 'compile') as compile_template:
+            template = env.get_template(name)
+        assert not compile_template.called
+        assert 'Open Source Software Information' in template.render(abouts=[], license_text_by_hash={})
+
+    def test_compiled_templates_are_not_used_with_another_jinja_version(self):
+        compiled_dir = get_temp_dir()
+        attrib_util.compile_builtin_templates(compiled_dir)
+        assert attrib_util.TemplateTextLoader(compiled_dir).module_loader
+
+        version_location = os.path.join(compiled_dir, attrib_util.COMPILED_TEMPLATES_VERSION_FILE)
+        with io.open(version_location, 'w', encoding='utf-8') as version_file:
+            version_file.write(u'2.0')
+        loader = attrib_util.TemplateTextLoader(compiled_dir)
+        assert None == loader.module_loader
+        name = loader.add(attrib.read_template())
+        env = attrib_util.create_environment(loader)
+        template = env.get_template(name)
+        assert 'Open Source Software Information' in template.render(abouts=[], license_text_by_hash={})
+
+    def test_compiled_templates_without_version_are_not_used(self):
+        compiled_dir = get_temp_dir()
+        attrib_util.compile_builtin_templates(compiled_dir)
+        os.remove(os.path.join(compiled_dir, attrib_util.COMPILED_TEMPLATES_VERSION_FILE))
+        assert None == attrib_util.TemplateTextLoader(compiled_dir).module_loader
+
+    def test_compiled_templates_are_not_used_for_a_changed_template(self):
+        compiled_dir = get_temp_dir()
+        attrib_util.compile_builtin_templates(compiled_dir)
+        loader = attrib_util.TemplateTextLoader(compiled_dir)
+        name = loader.add(attrib.read_template() + 'changed')
+        env = attrib_util.create_environment(loader)
+        assert env.get_template(name).render(abouts=[], license_text_by_hash={}).endswith('changed')
+
 
 class GenerateTest(unittest.TestCase):
 
@@ -122,6 +258,347 @@ class GenerateTest(unittest.TestCase):
 
         assert f1 == f2
 
+    def test_generate_to_file_streams_the_default_template(self):
+        test_file = get_test_loc('test_attrib/gen_default_template/attrib.ABOUT')
+        errors, abouts = model.collect_inventory(test_file)
+        output_file = get_temp_file()
+
+        error = attrib.generate_to_file(abouts, output_file, attrib.read_template())
+        assert not error
+
+        _error, expected = attrib.generate_from_file(abouts)
+        with io.open(output_file, encoding='utf-8') as of:
+            result = of.read()
+        assert remove_timestamp(expected) == remove_timestamp(result)
+
+    def test_generate_and_save_in_stream_mode_does_not_return_the_text(self):
+        test_file = get_test_loc('test_attrib/gen_license_key_name_check/test.ABOUT')
+        expected = get_test_loc('test_attrib/gen_license_key_name_check/expected/expected.html')
+        template_loc = get_test_loc('test_attrib/gen_license_key_name_check/custom.template')
+        output_file = get_temp_file()
+
+        _errors, abouts = model.collect_inventory(test_file)
+        errors, rendered = attrib.generate_and_save(abouts, output_file, template_loc, stream=True)
+        assert [] == errors
+        assert None == rendered
+        with open(output_file) as of, open(expected) as ef:
+            assert ef.read() == of.read()
+
+    def test_generate_to_file_does_not_write_output_on_rendering_error(self):
+        output_file = get_temp_file()
+        template = 'start {{ abouts|multi_sort }}'
+        error = attrib.generate_to_file([], output_file, template)
+        assert 'Template processing error' in error.message
+        assert not os.path.exists(output_file)
+        assert [] == os.listdir(os.path.dirname(output_file))
+
+    def test_generate_and_save_many_renders_all_templates(self):
+        test_file = get_test_loc('test_attrib/gen_default_template/attrib.ABOUT')
+        _errors, abouts = model.collect_inventory(test_file)
+        html = get_temp_file('attribution.html')
+        json_output = get_temp_file('attribution.json')
+        output_templates = [
+            (html, attrib.DEFAULT_TEMPLATE_FILE),
+            (json_output, attrib.get_builtin_template('default_json.template')),
+        ]
+        errors, generated = attrib.generate_and_save_many(abouts, output_templates)
+        assert [] == errors
+        assert [html, json_output] == generated
+
+        with io.open(json_output, encoding='utf-8') as jf:
+            assert 'Apache HTTP Server' == json.load(jf)['ossAttribution']['entries'][0]['name']
+
+    def test_generate_and_save_many_renders_each_template_with_its_own_filter_memo(self):
+        test_file = get_test_loc('test_attrib/gen_default_template/attrib.ABOUT')
+        _errors, abouts = model.collect_inventory(test_file)
+        template = get_temp_file('sorted.template')
+        with io.open(template, 'w', encoding='utf-8') as tf:
+            tf.write(u'{% for about in abouts|multi_sort(attributes=["name"]) %}{{ about.name.value }}{% endfor %}')
+        outputs = [get_temp_file('sorted%d.txt' % i) for i in range(4)]
+        output_templates = [(output, template) for output in outputs]
+        with mock.patch.object(attrib, 'render_to_file', wraps=attrib.render_to_file) as render:
+            errors, generated = attrib.generate_and_save_many(abouts, output_templates, max_workers=4)
+        assert [] == errors
+        assert outputs == generated
+
+        memos = [call_args[0][1][attrib_util.FILTER_MEMO] for call_args in render.call_args_list]
+        assert 4 == len(set(id(memo) for memo in memos))
+        for output in outputs:
+            with io.open(output, encoding='utf-8') as of:
+                assert 'Apache HTTP Server' == of.read()
+
+    def test_generate_and_save_many_reports_errors_per_template(self):
+        test_file = get_test_loc('test_attrib/gen_default_template/attrib.ABOUT')
+        _errors, abouts = model.collect_inventory(test_file)
+        template = get_temp_file('invalid.template')
+        with io.open(template, 'w', encoding='utf-8') as tf:
+            tf.write(u'{{ abouts|multi_sort }}')
+        html = get_temp_file('attribution.html')
+        output_templates = [(html, None), (get_temp_file('invalid.html'), template)]
+        errors, generated = attrib.generate_and_save_many(abouts, output_templates)
+        assert 1 == len(errors)
+        assert [html] == generated
+
+    def test_save_attribution_data_as_json(self):
+        about = model.About()
+        about.name.value = 'foo "quoted"'
+        about.version.value = '1.0'
+        about.license_expression.value = 'mit'
+        other = model.About()
+        other.name.value = 'bar'
+        output = get_temp_file('attribution.json')
+        assert [] == attrib.save_attribution_data([about, other], output, 'json')
+
+        with io.open(output, encoding='utf-8') as of:
+            result = json.load(of)
+        expected = {
+            'ossAttribution': {
+                'title': 'Open Source Software Information',
+                'entries': [
+                    {'name': 'foo "quoted"', 'version': '1.0', 'license_expression': 'mit'},
+                    {'name': 'bar'},
+                ]
+            }
+        }
+        assert expected == result
+
+    def test_save_attribution_data_as_csv(self):
+        about = model.About()
+        about.name.value = 'foo, "quoted"'
+        about.license_name.value = ['MIT License', 'Apache 2.0']
+        output = get_temp_file('attribution.csv')
+        assert [] == attrib.save_attribution_data([about], output, 'csv')
+
+        with io.open(output, encoding='utf-8', newline='') as of:
+            rows = list(csv.DictReader(of))
+        assert 1 == len(rows)
+        assert 'foo, "quoted"' == rows[0]['name']
+        assert 'MIT License\nApache 2.0' == rows[0]['license_name']
+        assert '' == rows[0]['version']
+
+    def test_save_attribution_data_does_not_replace_output_on_error(self):
+        output = get_temp_file('attribution.json')
+        with io.open(output, 'w', encoding='utf-8') as of:
+            of.write(u'previous')
+        with mock.patch.object(attrib, 'write_json_attribution', side_effect=Exception('failed')):
+            errors = attrib.save_attribution_data([model.About()], output, 'json')
+        assert [Error(CRITICAL, 'Cannot write the attribution: failed')] == errors
+        with io.open(output, encoding='utf-8') as of:
+            assert 'previous' == of.read()
+        assert ['attribution.json'] == os.listdir(os.path.dirname(output))
+
+    def test_get_builtin_template(self):
+        assert attrib.get_builtin_template('default_html.template')
+        assert None == attrib.get_builtin_template('unknown.template')
+        assert None == attrib.get_builtin_template('../templates/default_html.template')
+
+    def test_generate_and_save_many_with_fragment_cache_reuses_unchanged_components(self):
+        test_file = get_test_loc('test_attrib/gen_license_key_name_check/test.ABOUT')
+        _errors, abouts = model.collect_inventory(test_file)
+        other = model.About()
+        other.name.value = 'other'
+        abouts.append(other)
+
+        fragment_cache = attrib.FragmentCache(get_temp_dir())
+        output = get_temp_file('attribution.html')
+        output_templates = [(output, attrib.DEFAULT_TEMPLATE_FILE)]
+        errors, _generated = attrib.generate_and_save_many(
+            abouts, output_templates, fragment_cache=fragment_cache)
+        assert [] == errors
+        assert (0, 2) == (fragment_cache.hits, fragment_cache.misses)
+        with io.open(output, encoding='utf-8') as of:
+            first = remove_timestamp(of.read())
+
+        other.version.value = '1.0'
+        errors, _generated = attrib.generate_and_save_many(
+            abouts, output_templates, fragment_cache=fragment_cache)
+        assert [] == errors
+        assert (1, 3) == (fragment_cache.hits, fragment_cache.misses)
+        with io.open(output, encoding='utf-8') as of:
+            second = remove_timestamp(of.read())
+        assert 'other\n                1.0' in second
+
+        # the result is the same as without cache
+        _error, expected = attrib.generate_from_file(abouts)
+        assert remove_timestamp(expected) == second
+        assert first != second
+
+    def test_fragment_cache_key_depends_on_the_global_license_mappings_of_the_component(self):
+        fragment_cache = attrib.FragmentCache(get_temp_dir())
+        template = attrib_util.load_template(
+            '{% for about_object in abouts %}{% block component scoped %}'
+            '{{ about_object.license_expression.value in common_licenses }}'
+            '{% endblock %}{% endfor %}')
+        about = model.About()
+        about.license_expression.value = 'mit'
+        context = dict(abouts=[about], common_licenses=['mit'])
+        assert 'True' == ''.join(fragment_cache.generate(template, context))
+        assert 'True' == ''.join(fragment_cache.generate(template, context))
+        assert (1, 1) == (fragment_cache.hits, fragment_cache.misses)
+
+        context['common_licenses'] = ['gpl-2.0']
+        assert 'False' == ''.join(fragment_cache.generate(template, context))
+        assert (1, 2) == (fragment_cache.hits, fragment_cache.misses)
+
+    def test_fragment_cache_key_does_not_depend_on_the_licenses_of_other_components(self):
+        fragment_cache = attrib.FragmentCache(get_temp_dir())
+        template = attrib_util.load_template(
+            '{% for about_object in abouts %}{% block component scoped %}'
+            '{% for lic_file_name in about_object.license_file.value %}'
+            '{{ license_file_key_and_license_key[license_file_name_and_license_file_key[lic_file_name]] }}'
+            '{% endfor %}{% endblock %}{% endfor %}')
+        about = model.About()
+        about.license_expression.value = 'mit'
+        about.license_file.value = {'mit.LICENSE': 'MIT text'}
+        about.license_file_hashes = {'mit.LICENSE': attrib.get_license_text_hash('MIT text')}
+        context = dict(
+            abouts=[about],
+            common_licenses=['mit'],
+            license_file_key_and_license_key={'mit.LICENSE': 'mit'},
+            license_file_name_and_license_file_key={'mit.LICENSE': 'mit.LICENSE'},
+            license_text_hash_and_common_license_key={},
+        )
+        assert 'mit' == ''.join(fragment_cache.generate(template, context))
+
+        context['common_licenses'].append('gpl-2.0')
+        context['license_file_key_and_license_key']['gpl-2.0.LICENSE'] = 'gpl-2.0'
+        context['license_file_name_and_license_file_key']['gpl-2.0.LICENSE'] = 'gpl-2.0.LICENSE'
+        context['license_text_hash_and_common_license_key']['0' * 40] = 'gpl-2.0.LICENSE'
+        assert 'mit' == ''.join(fragment_cache.generate(template, context))
+        assert (1, 1) == (fragment_cache.hits, fragment_cache.misses)
+
+        context['license_file_key_and_license_key']['mit.LICENSE'] = 'mit-0'
+        assert 'mit-0' == ''.join(fragment_cache.generate(template, context))
+        assert (1, 2) == (fragment_cache.hits, fragment_cache.misses)
+
+    def test_fragment_cache_renders_templates_without_component_block(self):
+        fragment_cache = attrib.FragmentCache(get_temp_dir())
+        template = attrib_util.load_template('{% for about in abouts %}{{ about }}{% endfor %}')
+        assert '12' == ''.join(fragment_cache.generate(template, dict(abouts=[1, 2])))
+        assert (0, 0) == (fragment_cache.hits, fragment_cache.misses)
+
+    def test_generate_with_grouping_indexes(self):
+        abouts = []
+        for name, owner, expression in [
+                ('b', 'Owner 1', 'mit'), ('a', 'Owner 2', 'mit AND gpl-2.0'), ('c', '', 'gpl-2.0')]:
+            about = model.About()
+            about.name.value = name
+            about.owner.value = owner
+            about.license_expression.value = expression
+            abouts.append(about)
+
+        template = (
+            '{% for key, group in abouts_by_license_key.items() %}'
+            '{{ key }}:{% for about in group %}{{ about.name.value }}{% endfor %};'
+            '{% endfor %}|'
+            '{% for owner in abouts_by_owner %}{{ owner }};{% endfor %}|'
+            '{{ license_keys_sorted|join(",") }}|'
+            '{% for about in abouts_sorted_by_name %}{{ about.name.value }}{% endfor %}')
+        error, result = attrib.generate(abouts, template)
+        assert not error
+        assert 'gpl-2.0:ac;mit:ba;|Owner 1;Owner 2;|gpl-2.0,mit|abc' == result
+
+    def test_multi_sort_and_unique_together_are_memoized_within_a_rendering(self):
+        abouts = []
+        for name in ['b', 'a', 'b']:
+            about = model.About()
+            about.name.value = name
+            abouts.append(about)
+
+        template = (
+            '{% for i in range(3) %}'
+            '{% for about in abouts|multi_sort(attributes=["name.value"]) %}{{ about.name.value }}{% endfor %}'
+            '{% for about in abouts|unique_together(attributes=["name.value"]) %}{{ about.name.value }}{% endfor %}'
+            '{% endfor %}')
+        with mock.patch.object(attrib_util, '_multi_sort', wraps=attrib_util._multi_sort) as ms:
+            with mock.patch.object(attrib_util, '_unique_together', wraps=attrib_util._unique_together) as ut:
+                error, result = attrib.generate(abouts, template)
+                assert 1 == ms.call_count
+                assert 1 == ut.call_count
+        assert not error
+        assert 'abbba' * 3 == result
+
+
+class LicenseIndexTest(unittest.TestCase):
+
+    def get_about(self, license_expression, license_names, license_files):
+        about = model.About()
+        about.license_expression.value = license_expression
+        about.license_name.value = license_names
+        about.license_file.value = dict(license_files)
+        about.license_file.present = True
+        return about
+
+    def test_license_index_maps_keys_names_and_files(self):
+        index = attrib.LicenseIndex()
+        abouts = [
+            self.get_about('mit', ['MIT License'], [('mit.LICENSE', 'MIT text')]),
+            self.get_about(
+                'mit AND apache-2.0', ['MIT License', 'Apache 2.0'],
+                [('mit.LICENSE', 'other MIT text'), ('apache-2.0.LICENSE', 'Apache text')]),
+        ]
+        for about in abouts:
+            index.add_license_files(about)
+            index.add_license_names(about, about.license_expression.value.split(' AND '))
+
+        context = index.get_context()
+        # the first text of a license file is kept and sorted by file key
+        expected = [('apache-2.0', 'Apache text'), ('mit', 'MIT text')]
+        assert expected == list(context['license_file_key_and_context'].items())
+        assert 'Apache 2.0' == context['license_key_and_license_name']['apache-2.0']
+        assert 'mit' == context['license_name_and_license_key']['MIT License']
+        assert 'mit.LICENSE' == context['license_key_and_license_file_name']['mit']
+        assert 'apache-2.0' == context['license_file_key_and_license_key']['apache-2.0']
+        assert 'mit' == context['license_file_name_and_license_file_key']['mit.LICENSE']
+        expected = 'MIT License AND Apache 2.0'
+        assert expected == index.get_license_name_expression('mit AND apache-2.0')
+
+    def test_license_index_indexes_license_texts_by_hash(self):
+        index = attrib.LicenseIndex()
+        abouts = [
+            self.get_about('custom', ['Custom'], [('custom.LICENSE', 'Custom text')]),
+            self.get_about('custom', ['Custom'], [('custom.LICENSE', 'Custom text')]),
+            self.get_about('mit', ['MIT License'], [('mit.LICENSE', 'MIT text')]),
+        ]
+        for about in abouts:
+            index.add_license_files(about)
+
+        context = index.get_context()
+        custom_hash = attrib.get_license_text_hash('Custom text')
+        mit_hash = attrib.get_license_text_hash('MIT text')
+        expected = {custom_hash: 'Custom text', mit_hash: 'MIT text'}
+        assert expected == context['license_text_by_hash']
+        assert {mit_hash: 'mit'} == context['license_text_hash_and_common_license_key']
+        assert {'custom.LICENSE': custom_hash} == abouts[1].license_file_hashes
+        expected = {custom_hash: ['custom.LICENSE'], mit_hash: ['mit.LICENSE']}
+        assert expected == context['license_text_hash_and_license_file_names']
+
+    def test_generate_with_default_template_outputs_each_license_text_once(self):
+        abouts = []
+        for i in range(3):
+            about = self.get_about(
+                'custom AND mit', ['Custom', 'MIT License'],
+                [('custom.LICENSE', 'Custom text'), ('mit.LICENSE', 'MIT text')])
+            about.name.value = 'component %d' % i
+            abouts.append(about)
+
+        error, result = attrib.generate_from_file(abouts)
+        assert not error
+        assert 1 == result.count('Custom text')
+        assert 1 == result.count('MIT text')
+        custom_hash = attrib.get_license_text_hash('Custom text')
+        assert 3 == result.count('href="#license-text-%s"' % custom_hash)
+        assert 1 == result.count('id="license-text-%s"' % custom_hash)
+        assert 1 == result.count('Other Licenses Used in This Product')
+        assert 'custom: custom.LICENSE</h3>' in result
+
+    def test_generate_with_default_template_and_only_common_licenses(self):
+        about = self.get_about('mit', ['MIT License'], [('mit.LICENSE', 'MIT text')])
+        error, result = attrib.generate_from_file([about])
+        assert not error
+        assert 1 == result.count('MIT text')
+        assert 'Other Licenses Used in This Product' not in result
+
 
 def remove_timestamp(html_text):
     """
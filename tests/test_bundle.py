@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# ============================================================================
+#  Copyright (c) nexB Inc. http://www.nexb.com/ - All rights reserved.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# ============================================================================
+
+import io
+import os
+import unittest
+
+from testing_utils import FakeLicenseApiServer
+from testing_utils import get_fake_licenses
+from testing_utils import get_temp_dir
+from testing_utils import get_temp_file
+from testing_utils import get_test_loc
+from testing_utils import run_about_command_test_click
+
+from attributecode import api
+from attributecode import attrib
+from attributecode import bundle
+from attributecode import ERROR
+from attributecode import Error
+from attributecode import gen
+from attributecode import model
+
+
+class LicenseBundleTest(unittest.TestCase):
+
+    def test_export_from_reference(self):
+        reference_dir = get_test_loc('test_bundle/reference')
+        output = get_temp_file('licenses.bundle')
+        count, errors = bundle.export_from_reference(output, reference_dir)
+        assert 2 == count
+        assert [] == errors
+
+        with bundle.LicenseBundle(output) as lb:
+            assert ['apache-2.0', 'mit'] == lb.keys()
+            assert 'mit' in lb
+            assert 'gpl-2.0' not in lb
+            expected = ['mit', 'Permission is hereby granted, free of charge...\n', '']
+            assert expected == lb.get('mit')
+            assert None == lb.get('gpl-2.0')
+            assert '' == lb.metadata['api_url']
+
+    def test_export_from_reference_with_license_keys(self):
+        reference_dir = get_test_loc('test_bundle/reference')
+        output = get_temp_file('licenses.bundle')
+        count, errors = bundle.export_from_reference(output, reference_dir, ['mit', 'gpl-2.0'])
+        assert 1 == count
+        expected = [Error(ERROR, 'License not found in the reference directory: gpl-2.0')]
+        assert expected == errors
+
+    def test_export_from_api_exports_the_whole_library(self):
+        licenses = get_fake_licenses(5)
+        output = get_temp_file('licenses.bundle')
+        with FakeLicenseApiServer(licenses) as server:
+            count, errors = bundle.export_from_api(output, server.api_url, 'api_key')
+            api_url = server.api_url
+
+        assert 5 == count
+        assert [] == errors
+        with bundle.LicenseBundle(output) as lb:
+            assert api_url == lb.metadata['api_url']
+            name, text, url = lb.get('lic-3')
+            assert 'License 3' == name
+            assert 'Text 3' == text
+            assert url.endswith('/urn/?urn=urn:dje:license:lic-3')
+
+    def test_export_from_api_with_license_keys(self):
+        licenses = get_fake_licenses(5)
+        output = get_temp_file('licenses.bundle')
+        with FakeLicenseApiServer(licenses) as server:
+            count, errors = bundle.export_from_api(
+                output, server.api_url, 'api_key', ['lic-1', 'lic-4', 'foo'])
+
+        assert 2 == count
+        assert [Error(ERROR, "Invalid 'license': foo")] == errors
+
+    def test_export_from_api_with_authorization_denied(self):
+        output = get_temp_file('licenses.bundle')
+        with FakeLicenseApiServer(get_fake_licenses(2)) as server:
+            count, errors = bundle.export_from_api(output, server.api_url, 'bad_key')
+        assert 0 == count
+        assert [Error(ERROR, api.AUTH_DENIED_MESSAGE)] == errors
+
+    def test_import_to_cache_can_be_used_offline(self):
+        reference_dir = get_test_loc('test_bundle/reference')
+        output = get_temp_file('licenses.bundle')
+        bundle.export_from_reference(output, reference_dir)
+
+        cache = api.LicenseCache(get_temp_dir())
+        count, errors = bundle.import_to_cache(output, cache, 'http://fake.url/api/')
+        assert 2 == count
+        assert [] == errors
+
+        result, errors = api.fetch_licenses_data(
+            'http://fake.url/api/', 'api_key', ['mit'], cache=cache, offline=True)
+        assert [] == errors
+        assert 'Permission is hereby granted, free of charge...\n' == result['mit']['full_text']
+
+    def test_import_to_cache_requires_an_api_url(self):
+        reference_dir = get_test_loc('test_bundle/reference')
+        output = get_temp_file('licenses.bundle')
+        bundle.export_from_reference(output, reference_dir)
+        cache = api.LicenseCache(get_temp_dir())
+        count, errors = bundle.import_to_cache(output, cache)
+        assert 0 == count
+        assert 1 == len(errors)
+
+    def test_open_bundle_does_not_modify_the_bundle(self):
+        output = get_temp_file('licenses.bundle')
+        bundle.export_from_reference(output, get_test_loc('test_bundle/reference'))
+        with io.open(output, 'rb') as bf:
+            expected = bf.read()
+
+        lb, errors = bundle.open_bundle(output)
+        assert [] == errors
+        with lb:
+            assert ['apache-2.0', 'mit'] == lb.keys()
+        with io.open(output, 'rb') as bf:
+            assert expected == bf.read()
+
+    def test_open_bundle_reports_an_invalid_bundle(self):
+        output = get_temp_file('licenses.bundle')
+        with io.open(output, 'w', encoding='utf-8') as bf:
+            bf.write(u'This is not a license bundle')
+
+        lb, errors = bundle.open_bundle(output)
+        assert None == lb
+        assert 1 == len(errors)
+        assert errors[0].message.startswith('Not a valid license bundle: ')
+        with io.open(output, encoding='utf-8') as bf:
+            assert u'This is not a license bundle' == bf.read()
+
+    def test_open_bundle_reports_a_missing_bundle(self):
+        output = os.path.join(get_temp_dir(), 'licenses.bundle')
+        lb, errors = bundle.open_bundle(output)
+        assert None == lb
+        assert errors[0].message.startswith('Cannot open the license bundle: ')
+        assert not os.path.exists(output)
+
+    def test_get_inventory_license_keys(self):
+        location = get_test_loc('test_bundle/inventory.csv')
+        assert (['mit', 'apache-2.0'], []) == bundle.get_inventory_license_keys(location)
+
+    def test_get_inventory_license_keys_from_json(self):
+        location = get_temp_file('inventory.json')
+        with io.open(location, 'w', encoding='utf-8') as inventory:
+            inventory.write(u'[{"about_resource": "a", "license_expression": "mit"}, '
+                            u'{"about_resource": "b", "license_expression": "mit AND apache-2.0"}]')
+        assert (['mit', 'apache-2.0'], []) == bundle.get_inventory_license_keys(location)
+
+
+class LicenseBundleUsageTest(unittest.TestCase):
+
+    def get_bundle(self):
+        output = get_temp_file('licenses.bundle')
+        bundle.export_from_reference(output, get_test_loc('test_bundle/reference'))
+        return bundle.LicenseBundle(output)
+
+    def test_generate_with_license_bundle(self):
+        location = get_test_loc('test_bundle/inventory.csv')
+        base_dir = get_temp_dir()
+        with self.get_bundle() as lb:
+            errors, abouts = gen.generate(location, base_dir, license_bundle=lb)
+
+        assert not [e for e in errors if e.severity >= ERROR]
+        with io.open(os.path.join(base_dir, 'apache-2.0.LICENSE'), encoding='utf-8') as lic:
+            assert 'Apache License\nVersion 2.0, January 2004\n' == lic.read()
+        bar = [a for a in abouts if a.name.value == 'bar'][0]
+        assert 'license_expression: mit AND apache-2.0' in bar.dumps()
+        assert 'file: apache-2.0.LICENSE' in bar.dumps()
+
+    def test_add_licenses_from_bundle_and_generate_attribution(self):
+        location = get_test_loc('test_bundle/project')
+        _errors, abouts = model.collect_inventory(location)
+        with self.get_bundle() as lb:
+            errors = model.add_licenses_from_bundle(abouts, lb)
+
+        expected = [Error(ERROR, 'License not found in the license bundle: gpl-2.0')]
+        assert expected == errors
+
+        foo = [a for a in abouts if a.name.value == 'foo'][0]
+        assert ['mit'] == foo.license_key.value
+        assert ['mit'] == foo.license_name.value
+
+        template = (
+            '{% for about in abouts %}{{ about.name.value }}:'
+            '{% for text in about.license_file.value.values() %}{{ text }}{% endfor %}'
+            '{% endfor %}')
+        error, result = attrib.generate(abouts, template)
+        assert not error
+        assert 'foo:Permission is hereby granted' in result
+
+    def test_gen_command_with_an_invalid_license_bundle(self):
+        location = get_test_loc('test_bundle/inventory.csv')
+        license_bundle = get_temp_file('licenses.bundle')
+        with io.open(license_bundle, 'w', encoding='utf-8') as bf:
+            bf.write(u'This is not a license bundle')
+        output = get_temp_dir()
+        result = run_about_command_test_click(
+            ['gen', '--license-bundle', license_bundle, location, output], expected_rc=1)
+        assert 'Not a valid license bundle: ' in result.output
+        assert [] == os.listdir(output)
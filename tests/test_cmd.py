@@ -15,6 +15,10 @@
 # ============================================================================
 
 import io
+import json
+import os
+import subprocess
+import sys
 import unittest
 
 from attributecode import CRITICAL
@@ -403,6 +407,65 @@ def test_about_attrib_command_can_run_minimally_without_error():
     run_about_command_test_click(['attrib', test_dir, result])
 
 
+def test_about_attrib_command_can_generate_multiple_outputs():
+    test_dir = get_test_loc('test_cmd/repository-mini')
+    result_dir = get_temp_dir()
+    html = os.path.join(result_dir, 'attribution.html')
+    json_output = os.path.join(result_dir, 'attribution.json')
+    run_about_command_test_click(
+        ['attrib', test_dir, html,
+         '--output-template', json_output + ':default_json.template'])
+    assert os.path.exists(html)
+    assert os.path.exists(json_output)
+
+
+def test_about_attrib_command_can_write_json_and_csv_formats():
+    test_dir = get_test_loc('test_cmd/repository-mini')
+    json_output = get_temp_file('attribution.json')
+    run_about_command_test_click(['attrib', test_dir, json_output, '--format', 'json'])
+    with io.open(json_output, encoding='utf-8') as jf:
+        assert json.load(jf)['ossAttribution']['entries']
+
+    csv_output = get_temp_file('attribution.csv')
+    run_about_command_test_click(['attrib', test_dir, csv_output, '--format', 'csv'])
+    with io.open(csv_output, encoding='utf-8') as cf:
+        assert cf.readline().startswith('name,version,license_expression')
+
+
+def test_about_attrib_command_format_cannot_use_a_template():
+    test_dir = get_test_loc('test_cmd/repository-mini')
+    template = get_test_loc('test_cmd/attrib_inventory/inventory.csv')
+    result = run_about_command_test_click(
+        ['attrib', test_dir, get_temp_file(), '--format', 'json', '--template', template],
+        expected_rc=2)
+    assert 'cannot be used with --format json' in result.output
+
+
+def test_about_attrib_command_can_use_an_inventory_with_reference():
+    inventory_dir = get_test_loc('test_cmd/attrib_inventory')
+    reference = get_test_loc('test_bundle/reference')
+    for inventory in ('inventory.csv', 'inventory.jsonl'):
+        result = get_temp_file('attribution.html')
+        run_about_command_test_click(
+            ['attrib', os.path.join(inventory_dir, inventory), result, '--reference', reference])
+        with io.open(result, encoding='utf-8') as rf:
+            attribution = rf.read()
+        assert 'Permission is hereby granted, free of charge...' in attribution
+        assert 'Apache License' in attribution
+    # the reference files are not copied next to the inventory
+    expected = ['inventory.csv', 'inventory.jsonl']
+    assert expected == sorted(os.listdir(inventory_dir))
+
+
+def test_split_output_template():
+    assert ('out.html', 'tpl.template') == cmd.split_output_template('out.html:tpl.template')
+    assert ('/tmp/out.html', '/tmp/tpl') == cmd.split_output_template('/tmp/out.html:/tmp/tpl')
+    expected = ('C:\\out.html', 'C:\\tpl')
+    assert expected == cmd.split_output_template('C:\\out.html:C:\\tpl')
+    assert None == cmd.split_output_template('out.html')
+    assert None == cmd.split_output_template('out.html:')
+
+
 def test_about_transform_command_can_run_minimally_without_error():
     test_file = get_test_loc('test_cmd/transform.csv')
     result = get_temp_file('file_name.csv')
@@ -419,3 +482,41 @@ def test_about_transform_expanded_help_text():
     check_about_stdout(
         ['transform', '--help-format'],
         'test_cmd/help/about_transform_config_help.txt', regen=False)
+
+
+# modules that must not be imported by the `about` command line startup: these
+# are imported only by the subcommands that need them
+LAZY_IMPORTS = [
+    'attr',
+    'attributecode.api',
+    'attributecode.attrib',
+    'attributecode.bundle',
+    'attributecode.gen',
+    'attributecode.model',
+    'attributecode.transform',
+    'email',
+    'http.client',
+    'jinja2',
+    'license_expression',
+    'packageurl',
+    'saneyaml',
+    'sqlite3',
+]
+
+
+def get_imported_modules(module):
+    """
+    Return a set of the names of all the modules loaded in a new Python
+    process after importing `module`.
+    """
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(cmd.__file__)))
+    env = dict(os.environ, PYTHONPATH=src_dir)
+    code = 'import sys; import %s; print(chr(10).join(sys.modules))' % module
+    stdout = subprocess.check_output([sys.executable, '-c', code], env=env)
+    return set(stdout.decode('utf-8').splitlines())
+
+
+def test_about_command_startup_does_not_import_lazy_modules():
+    modules = get_imported_modules('attributecode.cmd')
+    assert 'attributecode.cmd' in modules
+    assert [] == [name for name in LAZY_IMPORTS if name in modules]
@@ -14,9 +14,13 @@
 #  limitations under the License.
 # ============================================================================
 
+import io
 import unittest
 
+import mock
+
 from testing_utils import get_temp_dir
+from testing_utils import get_temp_file
 from testing_utils import get_test_loc
 
 from attributecode import ERROR
@@ -24,6 +28,7 @@ from attributecode import INFO
 from attributecode import CRITICAL
 from attributecode import Error
 from attributecode import gen
+from attributecode import util
 from unittest.case import skip
 
 
@@ -103,6 +108,34 @@ custom1: |
         result = [a.dumps() for a in abouts]
         assert expected == result[0]
 
+    def test_load_inventory_reads_json_entries_one_at_a_time(self):
+        location = get_temp_file('inventory.json')
+        with io.open(location, 'w', encoding='utf-8') as inventory:
+            inventory.write(u'[{"about_resource": "a.c", "name": "a"}, '
+                            u'{"about_resource": "b.c", "name": "b"}]')
+        base_dir = get_temp_dir()
+        with mock.patch.object(util, 'load_json') as load_json:
+            errors, abouts = gen.load_inventory(location, base_dir)
+        assert not load_json.called
+        assert [] == [e for e in errors if e.severity > INFO]
+        assert ['a', 'b'] == [a.name.value for a in abouts]
+
+    def test_load_inventory_reports_duplicated_json_entries(self):
+        location = get_temp_file('inventory.json')
+        with io.open(location, 'w', encoding='utf-8') as inventory:
+            inventory.write(u'[{"about_resource": "a.c", "name": "a"}, '
+                            u'{"about_resource": "a.c", "name": "b"}]')
+        errors, abouts = gen.load_inventory(location, get_temp_dir())
+        assert 1 == len(errors)
+        assert [] == abouts
+
+    def test_load_inventory_raises_on_invalid_json(self):
+        location = get_temp_file('inventory.json')
+        with io.open(location, 'w', encoding='utf-8') as inventory:
+            inventory.write(u'[{"about_resource": "a.c", "name": "a"},')
+        with self.assertRaises(ValueError):
+            gen.load_inventory(location, get_temp_dir())
+
     def test_load_inventory_with_errors(self):
         location = get_test_loc('test_gen/inv4.csv')
         base_dir = get_temp_dir()
@@ -24,6 +24,7 @@ import unittest
 import mock
 import saneyaml
 
+from attributecode import api
 from attributecode import CRITICAL
 from attributecode import ERROR
 from attributecode import INFO
@@ -1251,6 +1252,82 @@ class CollectorTest(unittest.TestCase):
         for file in expected_file:
             assert file in copied_files
 
+    @unittest.skipIf(on_windows, 'Links require extra privileges on Windows')
+    def test_copy_redist_src_with_structure_and_links(self):
+        test_loc = get_test_loc('test_model/redistribution/')
+        this = get_test_loc('test_model/redistribution/this.c')
+        copy_list = [this, get_test_loc('test_model/redistribution/test/subdir')]
+        for link_mode in ('hardlink', 'symlink'):
+            output = get_temp_dir()
+            err = model.copy_redist_src(copy_list, test_loc, output, True, link_mode=link_mode)
+            assert err == []
+
+            copied = os.path.join(output, 'this.c')
+            test_c = os.path.join(output, 'test', 'subdir', 'test.c')
+            assert os.path.samefile(this, copied)
+            assert os.path.isfile(test_c)
+            assert (link_mode == 'symlink') == os.path.islink(copied)
+
+            # linking again keeps the same links
+            err = model.copy_redist_src(copy_list, test_loc, output, True, link_mode=link_mode)
+            assert all(e.severity == WARNING for e in err)
+            assert os.path.samefile(this, copied)
+
+    def test_archive_redist_src_with_structure(self):
+        test_loc = get_test_loc('test_model/redistribution/')
+        copy_list = [get_test_loc('test_model/redistribution/this.c'), get_test_loc('test_model/redistribution/test/subdir')]
+        output = get_temp_file('redist.zip')
+        err = model.archive_redist_src(copy_list, test_loc, output, with_structure=True)
+        assert err == []
+
+        import zipfile
+        with zipfile.ZipFile(output) as archive:
+            expected = ['this.c', 'test/subdir/', 'test/subdir/test.ABOUT', 'test/subdir/test.c']
+            assert expected == archive.namelist()
+            assert zipfile.ZIP_DEFLATED == archive.getinfo('this.c').compress_type
+
+    def test_copy_and_archive_redist_src_write_the_same_manifest(self):
+        test_loc = get_test_loc('test_model/redistribution/')
+        copy_list = [get_test_loc('test_model/redistribution/this.c'), get_test_loc('test_model/redistribution/test/subdir')]
+        manifest = get_temp_file('manifest.json')
+        err = model.copy_redist_src(copy_list, test_loc, get_temp_dir(), True, manifest=manifest)
+        assert err == []
+        with io.open(manifest, encoding='utf-8') as mf:
+            copied = json.load(mf)
+        assert ['test/subdir/test.ABOUT', 'test/subdir/test.c', 'this.c'] == sorted(copied)
+        assert 'e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855' == copied['this.c']['sha256']
+
+        archive_manifest = get_temp_file('manifest.json')
+        err = model.archive_redist_src(
+            copy_list, test_loc, get_temp_file('redist.zip'), True, manifest=archive_manifest)
+        assert err == []
+        with io.open(archive_manifest, encoding='utf-8') as mf:
+            assert copied == json.load(mf)
+
+    def test_archive_redist_src_no_structure_as_tar(self):
+        test_loc = get_test_loc('test_model/redistribution/')
+        this = get_test_loc('test_model/redistribution/this.c')
+        copy_list = [this, get_test_loc('test_model/redistribution/test/subdir'), this]
+        output = get_temp_file('redist.tar.xz')
+        err = model.archive_redist_src(copy_list, test_loc, output, with_structure=False)
+        # the same source listed twice does not replace anything
+        assert [] == err
+
+        import tarfile
+        with tarfile.open(output) as archive:
+            expected = ['subdir', 'subdir/test.ABOUT', 'subdir/test.c', 'this.c']
+            assert expected == archive.getnames()
+
+    def test_archive_redist_src_reports_replaced_archive_members(self):
+        test_loc = get_test_loc('test_model/redistribution/')
+        this = get_test_loc('test_model/redistribution/this.c')
+        other = os.path.join(get_temp_dir(), 'this.c')
+        with open(other, 'w') as of:
+            of.write('other')
+        output = get_temp_file('redist.zip')
+        err = model.archive_redist_src([this, other], test_loc, output, with_structure=False)
+        assert [Error(WARNING, 'this.c is already existed and is replaced by ' + other)] == err
+
     def test_get_copy_list(self):
         location = get_test_loc('test_model/redistribution/')
         result = get_temp_file()
@@ -1267,25 +1344,52 @@ class CollectorTest(unittest.TestCase):
             assert copy_list == expected
 
 
-class FetchLicenseTest(unittest.TestCase):
+    def test_get_copy_list_summarizes_nested_paths(self):
+        location = get_temp_dir()
+        for path in ('foo/sub', 'foobar'):
+            os.makedirs(os.path.join(location, path))
+        for path in ('foo/sub/a.c', 'foo/b.c', 'foobar/c.c', 'root.c'):
+            with open(os.path.join(location, path), 'w') as f:
+                f.write('x')
 
-    @mock.patch.object(model, 'urlopen')
-    def test_valid_api_url(self, mock_data):
-        mock_data.return_value = ''
-        assert model.valid_api_url('non_valid_url') is False
-
-    @mock.patch('attributecode.util.have_network_connection')
-    @mock.patch('attributecode.model.valid_api_url')
-    def test_pre_process_and_fetch_license_dict(self, have_network_connection, valid_api_url):
-        have_network_connection.return_value = True
-
-        valid_api_url.return_value = False
-        error_msg = (
-            'Network problem. Please check your Internet connection. '
-            'License generation is skipped.')
-        expected = ({}, [Error(ERROR, error_msg)])
-        assert model.pre_process_and_fetch_license_dict([], '', '') == expected
+        abouts = []
+        for path in ('foo/sub/a.c', 'foobar/c.c', 'foo/sub', 'root.c', 'foo', 'foo/b.c'):
+            about = model.About()
+            about.redistribute.value = True
+            about.about_resource.value = {path: os.path.join(location, path)}
+            abouts.append(about)
+
+        copy_list, errors = model.get_copy_list(abouts, location)
+        assert [] == errors
+        expected = [
+            os.path.join(location, 'root.c'),
+            os.path.join(location, 'foo'),
+            os.path.join(location, 'foobar', 'c.c'),
+        ]
+        assert expected == copy_list
 
-        valid_api_url.return_value = True
+    def test_add_copy_path(self):
+        trie = {}
+        model.add_copy_path(trie, ['a', 'b', 'c.c'], False)
+        model.add_copy_path(trie, ['a', 'b'], True)
+        model.add_copy_path(trie, ['a', 'b', 'd.c'], False)
+        model.add_copy_path(trie, ['ab', 'e.c'], False)
+        expected = [(('a', 'b'), True), (('ab', 'e.c'), False)]
+        assert expected == list(model.iter_copy_paths(trie))
+
+
+class FetchLicenseTest(unittest.TestCase):
+
+    def test_pre_process_and_fetch_license_dict_without_licenses(self):
         expected = ({}, [])
         assert model.pre_process_and_fetch_license_dict([], '', '') == expected
+
+    @mock.patch.object(api, 'fetch_licenses_data')
+    def test_pre_process_and_fetch_license_dict_reports_network_problems(self, fetch_licenses_data):
+        error = Error(ERROR, api.NETWORK_PROBLEM_MESSAGE)
+        fetch_licenses_data.return_value = {}, [error]
+        about = model.About()
+        about.license_expression.value = 'mit'
+        about.license_expression.present = True
+        expected = ({}, [error])
+        assert model.pre_process_and_fetch_license_dict([about], 'http://fake.url/', '') == expected
@@ -15,17 +15,31 @@
 # ============================================================================
 
 from collections import OrderedDict
+import io
+import json
+import os
 import unittest
 
+from testing_utils import get_temp_file
 from testing_utils import get_test_loc
 
+from attributecode import CRITICAL
+from attributecode import Error
+
 from attributecode.transform import check_duplicate_fields
+from attributecode.transform import get_csv_chunks
+from attributecode.transform import read_csv_chunk_rows
+from attributecode.transform import read_csv_rows
 from attributecode.transform import read_json
+from attributecode.transform import transform_csv_rows
+from attributecode.transform import transform_csv_to_csv
 from attributecode.transform import transform_data
+from attributecode.transform import transform_rows
 from attributecode.transform import normalize_dict_data
 from attributecode.transform import strip_trailing_fields_csv
 from attributecode.transform import strip_trailing_fields_json
 from attributecode.transform import Transformer
+from attributecode.transform import write_json
 
 
 class TransformTest(unittest.TestCase):
@@ -157,3 +171,177 @@ class TransformTest(unittest.TestCase):
         expected = [OrderedDict([(u'about_resource', u'/this.c'), (u'name', u'this.c'), (u'version', u'0.11.0')])]
         result = strip_trailing_fields_json(test)
         assert result == expected
+
+    def test_transform_rows_is_lazy_and_collects_errors(self):
+        consumed = []
+
+        def rows():
+            for i, version in enumerate(['1', None, '3']):
+                consumed.append(i)
+                yield {'Component': 'c%d' % i, 'Confirmed Version': version, 'temp': 'x'}
+
+        transformer = Transformer(
+            field_renamings={'name': 'Component', 'version': 'Confirmed Version'},
+            required_fields=['version'],
+            exclude_fields=['temp'],
+        )
+        transformer.essential_fields = []
+        errors = []
+        transformed = transform_rows(rows(), transformer, errors)
+        assert [] == consumed
+
+        assert {'name': 'c0', 'version': '1'} == next(transformed)
+        assert [0] == consumed
+        assert [] == errors
+
+        assert 2 == len(list(transformed))
+        expected = [Error(CRITICAL, 'Row 1 is missing required values for fields: version')]
+        assert expected == errors
+
+    def test_transform_csv_to_csv_does_not_write_output_on_errors(self):
+        location = get_temp_file('input.csv')
+        with io.open(location, 'w', encoding='utf-8') as inp:
+            inp.write(u'about_resource,name\n/a.c,a\n/b.c,\n')
+        output = get_temp_file('output.csv')
+        transformer = Transformer(required_fields=['name'])
+        errors = transform_csv_to_csv(location, output, transformer)
+        expected = [Error(CRITICAL, 'Row 1 is missing required values for fields: name')]
+        assert expected == errors
+        assert not os.path.exists(output)
+        assert [] == os.listdir(os.path.dirname(output))
+
+    def test_transform_csv_to_csv_reports_duplicated_fields(self):
+        location = get_temp_file('input.csv')
+        with io.open(location, 'w', encoding='utf-8') as inp:
+            inp.write(u'about_resource,name,Name\n/a.c,a,b\n')
+        errors = transform_csv_to_csv(location, get_temp_file('output.csv'), Transformer.default())
+        assert [Error(CRITICAL, 'Duplicated field name: name')] == errors
+
+    def test_write_json_streams_a_formatted_list(self):
+        data = [OrderedDict([('name', 'a'), ('files', ['x', {'y': None}])]), OrderedDict([('name', 'b')])]
+        output = get_temp_file('output.json')
+        write_json(output, iter(data))
+        with io.open(output, encoding='utf-8') as result:
+            assert json.dumps(data, indent=3) == result.read()
+
+        write_json(output, iter([]))
+        with io.open(output, encoding='utf-8') as result:
+            assert '[]' == result.read()
+
+    def test_get_projection_compiles_renamings_and_filters(self):
+        transformer = Transformer(
+            field_renamings={'about_resource': 'Directory/Filename', 'path': 'Directory/Filename', 'name': 'Component'},
+            field_filters=['about_resource', 'path', 'name', 'temp'],
+            exclude_fields=['temp'],
+        )
+        field_names = ['Component', 'Directory/Filename', 'notes', 'temp']
+        expected = [('name', 0), ('about_resource', 1), ('path', 1)]
+        assert expected == transformer.get_projection(field_names)
+
+    def test_transform_csv_rows(self):
+        projection = [('name', 0), ('about_resource', 1), ('path', 1)]
+        rows = [['a', '/a.c', 'x'], ['b']]
+        expected = [['a', '/a.c', '/a.c'], ['b', None, None]]
+        assert expected == list(transform_csv_rows(iter(rows), projection))
+
+    def test_transform_csv_rows_with_renamings_only_keeps_the_rows(self):
+        projection = [('name', 0), ('about_resource', 1)]
+        row = ['a', '/a.c']
+        rows = list(transform_csv_rows(iter([row, ['b'], ['c', '/c.c', 'extra']]), projection))
+        assert row is rows[0]
+        assert [['a', '/a.c'], ['b', None], ['c', '/c.c']] == rows
+
+    def test_transform_csv_to_csv_renames_the_header(self):
+        location = get_temp_file('input.csv')
+        with io.open(location, 'w', encoding='utf-8') as inp:
+            inp.write(u'Directory/Filename,Component,temp\n/a.c,a,x\n')
+        output = get_temp_file('output.csv')
+        transformer = Transformer(
+            field_renamings={'about_resource': 'Directory/Filename', 'name': 'Component'},
+            exclude_fields=['temp'],
+        )
+        assert [] == transform_csv_to_csv(location, output, transformer)
+        with io.open(output, encoding='utf-8') as result:
+            assert u'about_resource,name\n/a.c,a\n' == result.read()
+
+    def test_get_csv_chunks_split_on_records_boundaries(self):
+        location = get_temp_file('input.csv')
+        with io.open(location, 'w', encoding='utf-8') as inp:
+            inp.write(u'about_resource,"name\nand title"\n')
+            for i in range(20):
+                inp.write(u'/%(i)d.c,"a ""quoted""\n, multiline\nname"\n' % locals())
+        for count in (1, 2, 3, 7, 50):
+            chunks = get_csv_chunks(location, count)
+            assert count >= len(chunks)
+            rows = []
+            for start, end, first_row in chunks:
+                assert len(rows) == first_row
+                rows.extend(read_csv_chunk_rows(location, start, end))
+            assert 20 == len(rows)
+            assert ['/19.c', 'a "quoted"\n, multiline\nname'] == rows[-1]
+
+    def test_get_csv_chunks_with_a_quote_in_an_unquoted_value(self):
+        location = get_temp_file('input.csv')
+        with io.open(location, 'w', encoding='utf-8') as inp:
+            inp.write(u'about_resource,name,description\n')
+            inp.write(u'/floppy.c,floppy,5" floppy\n')
+            for i in range(200):
+                inp.write(u'/%(i)d.c,name%(i)d,"multi\nline, ""quoted""\ndescription"\n' % locals())
+        expected = list(read_csv_rows(location))[1:]
+        for count in (2, 4, 7):
+            rows = []
+            for start, end, first_row in get_csv_chunks(location, count):
+                assert len(rows) == first_row
+                rows.extend(read_csv_chunk_rows(location, start, end))
+            assert expected == rows
+
+        transformer = Transformer(required_fields=['name'])
+        expected_output = get_temp_file('expected.csv')
+        assert [] == transform_csv_to_csv(location, expected_output, transformer)
+        output = get_temp_file('output.csv')
+        assert [] == transform_csv_to_csv(location, output, transformer, processes=4)
+        with io.open(output, encoding='utf-8') as result:
+            with io.open(expected_output, encoding='utf-8') as expected:
+                assert expected.read() == result.read()
+
+    def test_transform_csv_to_csv_with_processes_and_old_mac_newlines(self):
+        location = get_temp_file('input.csv')
+        with io.open(location, 'wb') as inp:
+            inp.write(b'about_resource,name\r')
+            for i in range(20):
+                inp.write(b'/%d.c,name%d\r' % (i, i))
+        # the file cannot be split on its lines: use a single process
+        assert [] == get_csv_chunks(location, 4)
+
+        transformer = Transformer(required_fields=['name'])
+        output = get_temp_file('output.csv')
+        assert [] == transform_csv_to_csv(location, output, transformer, processes=4)
+        with io.open(output, encoding='utf-8') as result:
+            assert 21 == len(result.read().splitlines())
+
+    def test_transform_csv_to_csv_with_processes_keeps_rows_order_and_numbers(self):
+        location = get_temp_file('input.csv')
+        with io.open(location, 'w', encoding='utf-8') as inp:
+            inp.write(u'Directory/Filename,Component,version\n')
+            for i in range(500):
+                version = u'' if i in (3, 421) else u'1.%(i)d' % locals()
+                inp.write(u'/%(i)d.c,"multi\nline",%(version)s\n' % locals())
+        transformer = Transformer(
+            field_renamings={'about_resource': 'Directory/Filename', 'name': 'Component'},
+            required_fields=['version'],
+        )
+        output = get_temp_file('output.csv')
+        errors = transform_csv_to_csv(location, output, transformer, processes=3)
+        expected = [
+            Error(CRITICAL, u'Row 3 is missing required values for fields: version'),
+            Error(CRITICAL, u'Row 421 is missing required values for fields: version'),
+        ]
+        assert expected == errors
+
+        transformer.required_fields = []
+        expected_output = get_temp_file('expected.csv')
+        assert [] == transform_csv_to_csv(location, expected_output, transformer)
+        assert [] == transform_csv_to_csv(location, output, transformer, processes=3)
+        with io.open(output, encoding='utf-8') as result:
+            with io.open(expected_output, encoding='utf-8') as expected:
+                assert expected.read() == result.read()
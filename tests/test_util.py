@@ -14,19 +14,25 @@
 #  limitations under the License.
 # ============================================================================
 
+import io
+import json
+import os
 import string
 import unittest
 
+import mock
 import saneyaml
 
 from testing_utils import extract_test_loc
 from testing_utils import get_test_loc
 from testing_utils import get_temp_dir
+from testing_utils import get_temp_file
 from testing_utils import on_posix
 from testing_utils import on_windows
 
 from attributecode import CRITICAL
 from attributecode import Error
+from attributecode import WARNING
 from attributecode import model
 from attributecode import util
 
@@ -386,6 +392,12 @@ class TestJson(unittest.TestCase):
         result = util.load_json(test_file)
         assert expected == result
 
+    def test_load_jsonl(self):
+        test_file = get_test_loc('test_cmd/attrib_inventory/inventory.jsonl')
+        result = util.load_jsonl(test_file)
+        assert ['foo', 'bar'] == [r['name'] for r in result]
+        assert 'mit.LICENSE' == result[0]['license_file']
+
     def test_load_non_list_json(self):
         test_file = get_test_loc('test_util/json/not_a_list_need_mapping.json')
         # FIXME: why this dict nesting??
@@ -468,6 +480,55 @@ class TestJson(unittest.TestCase):
         result = util.load_json(test_file)
         assert expected == result
 
+    def test_iter_json_entries_reads_entries_across_chunks(self):
+        test_file = get_test_loc('test_util/json/scancode_info.json')
+        with io.open(test_file, encoding='utf-8') as inp:
+            expected = json.load(inp)['files']
+        for chunk_size in (1, 7, 1024 * 1024):
+            result = list(util.iter_json_entries(
+                test_file, util.is_inventory_entries, chunk_size=chunk_size))
+            assert expected == result
+
+    def test_iter_json_entries_of_a_top_level_array(self):
+        test_file = get_temp_file('inventory.json')
+        with io.open(test_file, 'w', encoding='utf-8') as out:
+            out.write(u' [ {"name": "b", "size": 12}, \n{"name": "\u540d", "size": 1e3} ] \n')
+        result = list(util.iter_json_entries(test_file, chunk_size=2))
+        assert [{'name': 'b', 'size': 12}, {'name': u'\u540d', 'size': 1000.0}] == result
+
+    def test_iter_json_entries_with_numbers_split_across_chunks(self):
+        documents = [
+            u'{"a": -25000000000.0, "b": []}',
+            u'[1.5, 2e10, -3.25E-2, 10, 0.125, 123456789.123456789]',
+            u'{"n": 12.5e+3, "files": [{"size": 1.25}, {"size": -0}]}',
+            u'42',
+        ]
+        test_file = get_temp_file('inventory.json')
+        for document in documents:
+            with io.open(test_file, 'w', encoding='utf-8') as out:
+                out.write(document)
+            expected = list(util.iter_json_entries(test_file))
+            for chunk_size in range(1, 12):
+                result = list(util.iter_json_entries(test_file, chunk_size=chunk_size))
+                assert expected == result, (document, chunk_size)
+
+    def test_iter_json_entries_with_format_member_after_the_entries(self):
+        test_file = get_temp_file('inventory.json')
+        with io.open(test_file, 'w', encoding='utf-8') as out:
+            out.write(u'{"components": [{"name": "a"}], "aboutcode_manager_notice": ""}')
+        result = list(util.iter_json_entries(test_file, util.is_inventory_entries))
+        assert [{'name': 'a'}] == result
+
+    def test_iter_json_entries_raise_on_invalid_json(self):
+        test_file = get_temp_file('inventory.json')
+        with io.open(test_file, 'w', encoding='utf-8') as out:
+            out.write(u'[{"name": "a"} {"name": "b"}]')
+        try:
+            list(util.iter_json_entries(test_file))
+            self.fail('Exception not raised')
+        except ValueError:
+            pass
+
     def test_format_about_dict_for_json_output(self):
         about = [dict([
             (u'about_file_path', u'/input/about1.ABOUT'),
@@ -658,3 +719,175 @@ description: sample
         assert len(licenses) == len(files_list)
         for license in licenses:
             assert license in files_list
+
+    def test_copy_files_skips_identical_files(self):
+        test_dir = get_test_loc('test_util/licenses/')
+        des = get_temp_dir()
+        copy_tasks, err = util.get_copy_tasks(test_dir, des)
+        assert err == ''
+        assert 3 == len(copy_tasks)
+        assert [] == util.copy_files(copy_tasks, threads=2)
+
+        for from_path, to_path in copy_tasks:
+            with open(from_path, 'rb') as source, open(to_path, 'rb') as target:
+                assert source.read() == target.read()
+            assert util.is_same_file(from_path, to_path)
+
+        with mock.patch.object(util, 'copy_file_content') as copy_file_content:
+            assert [] == util.copy_files(copy_tasks, threads=2)
+        assert not copy_file_content.called
+
+        # an existing directory is only reported if some files are replaced
+        _copy_tasks, err = util.get_copy_tasks(test_dir, des)
+        assert '' == err
+        from_path, to_path = copy_tasks[0]
+        with open(to_path, 'a') as target:
+            target.write('changed')
+        _copy_tasks, err = util.get_copy_tasks(test_dir, des)
+        assert WARNING == err.severity
+
+    def test_get_copy_tasks_does_not_report_existing_links_in_link_mode(self):
+        test_dir = get_test_loc('test_util/licenses/')
+        des = get_temp_dir()
+        copy_tasks, _err = util.get_copy_tasks(test_dir, des, link_mode='hardlink')
+        assert [] == util.copy_files(copy_tasks, link_mode='hardlink')
+        _copy_tasks, err = util.get_copy_tasks(test_dir, des, link_mode='hardlink')
+        assert '' == err
+        # the links are replaced by copies
+        _copy_tasks, err = util.get_copy_tasks(test_dir, des)
+        assert WARNING == err.severity
+
+    def test_copy_files_replaces_links_with_copies(self):
+        test_dir = get_test_loc('test_util/licenses/')
+        source_dir = get_temp_dir()
+        des = get_temp_dir()
+        copy_tasks, _err = util.get_copy_tasks(test_dir, source_dir)
+        assert [] == util.copy_files(copy_tasks)
+        sources = os.path.join(source_dir, 'licenses')
+
+        copy_tasks, _err = util.get_copy_tasks(sources, des)
+        assert [] == util.copy_files(copy_tasks, link_mode='hardlink')
+        assert [] == util.copy_files(copy_tasks)
+        for from_path, to_path in copy_tasks:
+            assert not os.path.samefile(from_path, to_path)
+            assert 1 == os.stat(from_path).st_nlink
+            assert util.is_same_file(from_path, to_path)
+
+        if on_windows:
+            return
+        assert [] == util.copy_files(copy_tasks, link_mode='symlink')
+        assert [] == util.copy_files(copy_tasks)
+        for from_path, to_path in copy_tasks:
+            assert not os.path.islink(to_path)
+            with open(from_path, 'rb') as source, open(to_path, 'rb') as target:
+                content = source.read()
+                assert content
+                assert content == target.read()
+
+    def test_write_archive_with_stored_compression(self):
+        test_file = get_test_loc('test_util/licenses/mit.LICENSE')
+        output = get_temp_file('archive.zip')
+        members = [(test_file, 'licenses/mit.LICENSE')]
+        assert [] == util.write_archive(output, members, compression='stored')
+
+        import zipfile
+        with zipfile.ZipFile(output) as archive:
+            info = archive.getinfo('licenses/mit.LICENSE')
+            assert zipfile.ZIP_STORED == info.compress_type
+            with open(test_file, 'rb') as tf:
+                assert tf.read() == archive.read(info)
+
+    def test_write_archive_with_files_modified_before_1980(self):
+        test_file = get_temp_file('old.LICENSE')
+        with open(test_file, 'w') as tf:
+            tf.write('old')
+        os.utime(test_file, (0, 0))
+        output = get_temp_file('archive.zip')
+        assert [] == util.write_archive(output, [(test_file, 'old.LICENSE')])
+
+        import zipfile
+        with zipfile.ZipFile(output) as archive:
+            assert b'old' == archive.read('old.LICENSE')
+            assert 1980 == archive.getinfo('old.LICENSE').date_time[0]
+
+    def test_write_archive_reports_an_ignored_compression_level(self):
+        test_file = get_test_loc('test_util/licenses/mit.LICENSE')
+        members = [(test_file, 'mit.LICENSE')]
+        errors = util.write_archive(
+            get_temp_file('archive.zip'), members, compression='stored', compresslevel=9)
+        expected = [Error(WARNING, 'The compression level is ignored for a stored zip archive.')]
+        assert expected == errors
+
+        errors = util.write_archive(get_temp_file('archive.tar'), members, compresslevel=9)
+        expected = [Error(WARNING, 'The compression level is ignored for a tar archive.')]
+        assert expected == errors
+
+        assert [] == util.write_archive(get_temp_file('archive.zip'), members, compresslevel=9)
+        assert [] == util.write_archive(get_temp_file('archive.tgz'), members, compresslevel=9)
+
+    def test_get_archive_format(self):
+        assert 'zip' == util.get_archive_format('/some/sources.ZIP')
+        assert 'gztar' == util.get_archive_format('sources.tgz')
+        assert 'xztar' == util.get_archive_format('sources.tar.xz')
+        assert None == util.get_archive_format('sources.rar')
+
+    def test_copy_files_computes_checksums_while_copying(self):
+        test_dir = get_test_loc('test_util/licenses/')
+        copy_tasks, _err = util.get_copy_tasks(test_dir, get_temp_dir())
+        checksums = {}
+        with mock.patch.object(util, 'get_file_checksums') as get_file_checksums:
+            assert [] == util.copy_files(copy_tasks, threads=2, checksums=checksums)
+        assert not get_file_checksums.called
+
+        import hashlib
+        assert sorted(to_path for _, to_path in copy_tasks) == sorted(checksums)
+        for from_path, to_path in copy_tasks:
+            with open(from_path, 'rb') as source:
+                content = source.read()
+            expected = dict(
+                size=len(content),
+                md5=hashlib.md5(content).hexdigest(),
+                sha1=hashlib.sha1(content).hexdigest(),
+                sha256=hashlib.sha256(content).hexdigest(),
+            )
+            assert expected == checksums[to_path]
+
+        # the checksums of already copied files are computed from the copy
+        checksums = {}
+        assert [] == util.copy_files(copy_tasks, threads=2, checksums=checksums)
+        assert 3 == len(checksums)
+
+    def test_write_manifest_as_csv(self):
+        output = get_temp_file('manifest.csv')
+        checksums = {
+            'b/c.txt': dict(size=1, md5='m2', sha1='s2', sha256='h2'),
+            'a.txt': dict(size=0, md5='m1', sha1='s1', sha256='h1'),
+        }
+        util.write_manifest(output, checksums)
+        with open(output) as manifest:
+            expected = [
+                'path,size,md5,sha1,sha256',
+                'a.txt,0,m1,s1,h1',
+                'b/c.txt,1,m2,s2,h2',
+            ]
+            assert expected == manifest.read().splitlines()
+
+    def test_copy_file_content_without_fast_copy(self):
+        test_file = get_test_loc('test_util/licenses/mit.LICENSE')
+        target = get_temp_file()
+        with mock.patch.object(util, 'FAST_COPY_FUNCTIONS', []):
+            util.copy_file_content(test_file, target)
+        with open(test_file, 'rb') as source, open(target, 'rb') as copied:
+            assert source.read() == copied.read()
+
+    def test_copy_file_content_falls_back_when_fast_copy_fails(self):
+        test_file = get_test_loc('test_util/licenses/mit.LICENSE')
+        target = get_temp_file()
+
+        def unsupported(*args):
+            raise OSError('not supported')
+
+        with mock.patch.object(util, 'FAST_COPY_FUNCTIONS', [unsupported]):
+            util.copy_file_content(test_file, target)
+        with open(test_file, 'rb') as source, open(target, 'rb') as copied:
+            assert source.read() == copied.read()
@@ -14,6 +14,13 @@
 #  limitations under the License.
 # ============================================================================
 
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs
+from urllib.parse import urlencode
+from urllib.parse import urlsplit
+import json
 import logging
 import ntpath
 import os
@@ -22,6 +29,7 @@ import stat
 import subprocess
 import sys
 import tempfile
+import threading
 import zipfile
 
 from attributecode.util import add_unc
@@ -204,3 +212,134 @@ def get_opts(options):
             return b' '.join(options)
         except:
             return b' '.join(map(repr, options))
+
+
+class FakeLicenseApiHandler(BaseHTTPRequestHandler):
+    """
+    A stand-in for the DejaCode license API serving the `licenses` of its
+    server and recording the client connections.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.requests.append(self.path)
+            status = server.failures.pop(0) if server.failures else None
+
+        if status:
+            return self.send_json(status, {})
+
+        if self.path.startswith('/redirect/'):
+            self.send_response(301)
+            self.send_header('Location', self.path[len('/redirect'):])
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if self.headers.get('Authorization') != 'Token api_key':
+            return self.send_json(403, {'detail': 'Invalid token.'})
+
+        query = parse_qs(urlsplit(self.path).query)
+        if 'key' not in query:
+            return self.send_page(query)
+
+        key = query.get('key', [''])[0]
+        results = [lic for lic in server.licenses if lic['key'] == key]
+        # the server validators are either an ETag or a Last-Modified date
+        if server.last_modified:
+            validators = {'Last-Modified': server.last_modified}
+            not_modified = self.headers.get('If-Modified-Since') == server.last_modified
+        else:
+            validators = {'ETag': '"%s"' % key}
+            not_modified = self.headers.get('If-None-Match') == validators['ETag']
+        if not_modified:
+            with server.lock:
+                server.not_modified += 1
+            self.send_response(304)
+            for name, value in validators.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_json(200, {'count': len(results), 'results': results}, validators)
+
+    def send_page(self, query):
+        """
+        Send a page of the licenses list, filtered with the "key__in" filter.
+        """
+        server = self.server
+        if server.batch_status != 200:
+            return self.send_json(server.batch_status, {})
+
+        if server.supports_key_in and 'key__in' in query:
+            keys = query['key__in'][0].split(',')
+            results = [lic for lic in server.licenses if lic['key'] in keys]
+        else:
+            results = server.licenses
+
+        page = int(query.get('page', ['1'])[0])
+        start = (page - 1) * server.page_size
+        data = {
+            'count': len(results),
+            'next': None,
+            'results': results[start:start + server.page_size],
+        }
+        if start + server.page_size < len(results):
+            next_query = dict((k, v[0]) for k, v in query.items())
+            next_query['page'] = page + 1
+            data['next'] = server.api_url + '?' + urlencode(next_query)
+        self.send_json(200, data)
+
+    def send_json(self, status, data, validators=None):
+        content = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in (validators or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args, **kwargs):
+        pass
+
+
+class FakeLicenseApiServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, licenses, handler=FakeLicenseApiHandler):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), handler)
+        self.licenses = licenses
+        self.lock = threading.Lock()
+        self.connections = set()
+        self.requests = []
+        self.not_modified = 0
+        # send a Last-Modified date rather than an ETag if set
+        self.last_modified = None
+        # settings of the "key__in" list filter responses
+        self.page_size = 2
+        self.supports_key_in = True
+        self.batch_status = 200
+        # statuses of the error responses sent first to any request
+        self.failures = []
+
+    @property
+    def api_url(self):
+        return 'http://127.0.0.1:%d/api/v2/licenses/' % self.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, args=(0.01,), daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+def get_fake_licenses(count):
+    return [
+        {'key': 'lic-%d' % i, 'name': 'License %d' % i, 'full_text': 'Text %d' % i}
+        for i in range(count)
+    ]